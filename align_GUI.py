@@ -1,20 +1,175 @@
 # main.py (Updated with full requested functionalities)
 import os
 import json
-from statistics import median
+import sqlite3
+import threading
+from collections import OrderedDict
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QFileDialog, QVBoxLayout, QGridLayout, QCheckBox,
     QTableWidget, QTableWidgetItem, QPushButton, QLabel, QSpinBox, QHeaderView, QSplitter,
-    QMenu, QAction, QScrollArea, QWidget, QMessageBox, QHBoxLayout, QInputDialog
-)
-from PyQt5.QtGui import QPixmap
-from PyQt5.QtCore import Qt
-from simple_filter import (
-    only_text, simple, only_phien_am, simple_chinese
+    QMenu, QAction, QScrollArea, QWidget, QMessageBox, QHBoxLayout, QInputDialog, QProgressDialog, QLineEdit,
+    QListWidget, QListWidgetItem
 )
+from PyQt5.QtGui import QPixmap, QColor
+from PyQt5.QtCore import Qt, QThread, pyqtSignal, QFileSystemWatcher, QTimer
+from align_core import group_by_label, filter_label, write_csv, load_shards, RecordTail, LiveLabels
+from aligner import LOW_CONFIDENCE
+from perf_stats import span, instrument, create_perf_dock
+from thumb_cache import cached_thumbnail
+from page_pack import open_pack, page_ref
+from label_manifest import find_manifest, open_manifest, image_name
+from edit_store import EditStore
+from project_store import ProjectStore, PROJECT_SUFFIX
+from text_index import TextIndex
 
 GUI_HEIGHT = 800
 GUI_WIDTH = 1200
+FILTER_CACHE_SIZE = 8  # Filtered tables kept for recently visited / speculatively filtered labels
+LIVE_POLL_MS = 1000  # Fallback polling of a followed OCR stream (file watchers miss appends on some file systems)
+SEARCH_DELAY_MS = 250  # Search once typing pauses
+
+
+class ShardLoaderThread(QThread):
+    """Parse a directory of OCR shards in worker processes without blocking the GUI."""
+    progress = pyqtSignal(int, int)
+    loaded = pyqtSignal(list)
+    failed = pyqtSignal(str)
+
+    def __init__(self, folder):
+        super().__init__()
+        self.folder = folder
+
+    def run(self):
+        try:
+            sources = load_shards(self.folder, progress=self.progress.emit)
+            self.loaded.emit(sources)
+        except Exception as e:
+            self.failed.emit(str(e))
+
+
+class ThumbnailThread(QThread):
+    """Decode (or read from the thumbnail cache) the current label's images, then warm the cache for the next label."""
+    thumbnail_ready = pyqtSignal(int, int, object)  # generation, image position, QImage
+
+    def __init__(self, generation, image_paths, width, prefetch_paths=()):
+        super().__init__()
+        self.generation = generation
+        self.image_paths = image_paths
+        self.width = width
+        self.prefetch_paths = prefetch_paths
+
+    def run(self):
+        for idx, image_path in enumerate(self.image_paths):
+            if self.isInterruptionRequested():
+                return
+            self.thumbnail_ready.emit(self.generation, idx, cached_thumbnail(image_path, self.width))
+
+        # Prefetch: only fills the on-disk cache so the next label shows up immediately
+        for image_path in self.prefetch_paths:
+            if self.isInterruptionRequested():
+                return
+            cached_thumbnail(image_path, self.width)
+
+
+class FilterWorker(QThread):
+    """
+    Run filter_label off the GUI thread. Only the newest request for the current label is kept;
+    speculative requests (the next label) run when nothing else is waiting.
+    """
+    filtered = pyqtSignal(int, object, object, object, str)  # generation, cache key, table, confidences, error
+
+    def __init__(self):
+        super().__init__()
+        self._condition = threading.Condition()
+        self._current = None
+        self._speculative = None
+        self._stopped = False
+
+    def request(self, generation, key, label_datas, align, speculative=False):
+        with self._condition:
+            job = (generation, key, label_datas, align)
+            if speculative:
+                self._speculative = job
+            else:
+                self._current = job
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and self._current is None and self._speculative is None:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                if self._current is not None:
+                    job, self._current = self._current, None
+                else:
+                    job, self._speculative = self._speculative, None
+
+            generation, key, label_datas, align = job
+            try:
+                with span("align_GUI.filter_label"):
+                    table, confidences = filter_label(label_datas, align=align)
+                self.filtered.emit(generation, key, table, confidences, "")
+            except Exception as e:
+                self.filtered.emit(generation, key, None, None, str(e))
+
+
+class IndexWorker(QThread):
+    """Add loaded OCR sources to the text index in the background, one page at a time so searches stay responsive."""
+    indexed = pyqtSignal(int)  # Lines indexed so far
+
+    def __init__(self, text_index):
+        super().__init__()
+        self.text_index = text_index
+        self._condition = threading.Condition()
+        self._jobs = []
+        self._stopped = False
+
+    def add(self, source, records):
+        with self._condition:
+            self._jobs.append((source, records))
+            self._condition.notify()
+
+    def clear(self):
+        """Drop queued sources and empty the index."""
+        with self._condition:
+            self._jobs = [None]
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and not self._jobs:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                job = self._jobs.pop(0)
+
+            if job is None:
+                self.text_index.clear()
+                self.indexed.emit(0)
+                continue
+            source, records = job
+            with span("align_GUI.index_records"):
+                for start in range(0, len(records), 64):
+                    if self._stopped or (self._jobs and self._jobs[0] is None):
+                        break
+                    self.text_index.add_records(records[start:start + 64], source=source)
+            self.indexed.emit(len(self.text_index))
+
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -24,11 +179,40 @@ class MainWindow(QMainWindow):
 
         # Initialize variables
         self.images = {}  # {"label_index": [list of file paths]}
+        self.image_pages = {}  # {"label_index": {"page_index"}} of the loaded images, expected pages of a live stream
         self.current_label_index = None
         self.ocr_data = []
-        self.edited_data = {}
+        self.ocr_indexes = []  # One {label_index: records} dict per OCR source, built on load
+        self.ocr_source_names = []  # Name of each OCR source (JSON file, shard label name), as stored in a project
+        self.edits = EditStore()  # Filter baseline + operation log per edited/saved label
+        self.edits.on_change = self.persist_label
+        self.project = None  # ProjectStore shared with label_GUI, batch_align and other annotators
         self.column_names = []
+        self.review_labels = set()  # Flagged labels from a batch_align review file
         self.num_columns = 2  # Default number of image columns
+        self.image_labels = []  # QLabel per image of the current label, filled by ThumbnailThread
+        self.thumbnail_generation = 0
+        self.thumbnail_threads = set()
+        self.filter_generation = 0  # Results of older generations belong to labels the user has left
+        self.filter_cache = OrderedDict()  # {(data version, label, align): (table, confidences)}
+        self.ocr_version = 0  # Bumped whenever OCR data is loaded, invalidates filter_cache keys
+        self.filter_worker = FilterWorker()
+        self.filter_worker.filtered.connect(self.filter_finished)
+        self.filter_worker.start()
+        self.text_index = TextIndex()  # Every loaded OCR line, for the search box
+        self.index_worker = IndexWorker(self.text_index)
+        self.index_worker.indexed.connect(self.index_progress)
+        self.index_worker.start()
+
+        # Live OCR stream (ocr_runner --stream) followed with a file watcher and a polling timer
+        self.live = None
+        self.live_tail = None
+        self.live_records = []
+        self.live_watcher = QFileSystemWatcher(self)
+        self.live_watcher.fileChanged.connect(self.poll_live_stream)
+        self.live_timer = QTimer(self)
+        self.live_timer.setInterval(LIVE_POLL_MS)
+        self.live_timer.timeout.connect(self.poll_live_stream)
 
         self.init_ui()
 
@@ -41,8 +225,38 @@ class MainWindow(QMainWindow):
         # Buttons for loading data
         self.load_folder_button = QPushButton("Load Folder")
         self.load_folder_button.clicked.connect(self.load_images_from_folder)
+        self.load_pack_button = QPushButton("Load Pack")
+        self.load_pack_button.clicked.connect(self.load_images_from_pack)
         self.load_json_button = QPushButton("Load JSON")
         self.load_json_button.clicked.connect(self.load_json_data)
+        self.load_shards_button = QPushButton("Load JSON Shards")
+        self.load_shards_button.clicked.connect(self.load_json_shards)
+        self.live_button = QPushButton("Follow OCR Stream")
+        self.live_button.clicked.connect(self.toggle_live_stream)
+        self.load_review_button = QPushButton("Load Review")
+        self.load_review_button.clicked.connect(self.load_review_data)
+        self.project_button = QPushButton("Open Project")
+        self.project_button.clicked.connect(self.open_project)
+
+        # Full-text search over every loaded OCR line (text_index.py)
+        search_layout = QHBoxLayout()
+        self.search_box = QLineEdit()
+        self.search_box.setPlaceholderText("Search OCR text (Hán or quốc ngữ, with or without diacritics)...")
+        self.search_box.textChanged.connect(self.search_timer_restart)
+        self.search_box.returnPressed.connect(self.run_search)
+        search_layout.addWidget(QLabel("Search:"))
+        search_layout.addWidget(self.search_box)
+        layout.addLayout(search_layout)
+        self.search_results = QListWidget()
+        self.search_results.setMaximumHeight(160)
+        self.search_results.itemActivated.connect(self.jump_to_search_hit)
+        self.search_results.itemClicked.connect(self.jump_to_search_hit)
+        self.search_results.hide()
+        layout.addWidget(self.search_results)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DELAY_MS)
+        self.search_timer.timeout.connect(self.run_search)
 
         splitter = QSplitter(Qt.Vertical)
 
@@ -80,6 +294,7 @@ class MainWindow(QMainWindow):
         self.ocr_table.setSelectionBehavior(self.ocr_table.SelectItems)
         self.ocr_table.setSelectionMode(self.ocr_table.ExtendedSelection)
         self.ocr_table.setHorizontalHeaderLabels(["Text"])
+        self.ocr_table.itemChanged.connect(self.cell_edited)
         splitter.addWidget(self.ocr_table)
 
         splitter.setSizes([int(GUI_HEIGHT * 2/3), int(GUI_HEIGHT/3)])
@@ -91,12 +306,22 @@ class MainWindow(QMainWindow):
         layout.addWidget(self.save_button)
 
         self.checkbox = QCheckBox("Save this file")
+        self.align_checkbox = QCheckBox("Auto align")
+        controls_layout.addWidget(self.align_checkbox)
         controls_layout.addWidget(self.checkbox)
         controls_layout.addWidget(self.back_button)
         controls_layout.addWidget(self.next_button)
         layout.addLayout(controls_layout)
         layout.addWidget(self.load_folder_button)
+        layout.addWidget(self.load_pack_button)
         layout.addWidget(self.load_json_button)
+        layout.addWidget(self.load_shards_button)
+        layout.addWidget(self.live_button)
+        layout.addWidget(self.load_review_button)
+        layout.addWidget(self.project_button)
+
+        # Performance panel (only when NLP_MINITOOLS_PERF is set)
+        self.perf_dock = create_perf_dock(self)
         
 
     def load_images_from_folder(self):
@@ -104,18 +329,45 @@ class MainWindow(QMainWindow):
         if not folder:
             return
 
+        # Thư mục có labels_manifest.json (label_GUI "Save Manifest"): ảnh gốc được dùng trực tiếp
+        manifest = find_manifest(folder)
+        if manifest is not None:
+            try:
+                self.set_images(list(open_manifest(manifest).items()))
+            except (OSError, ValueError, KeyError) as e:
+                QMessageBox.critical(self, "Error", f"Failed to read label manifest: {e}")
+            return
+
+        self.set_images([(file_name, os.path.join(folder, file_name)) for file_name in sorted(os.listdir(folder))])
+
+    def load_images_from_pack(self):
+        """Load labeled pages from a page pack (page names like ORI_1_39, see page_pack.py)."""
+        pack_path, _ = QFileDialog.getOpenFileName(self, "Select Page Pack", "", "Page Pack (*.pack)")
+        if not pack_path:
+            return
+
+        try:
+            names = open_pack(pack_path).names()
+        except (OSError, ValueError) as e:
+            QMessageBox.critical(self, "Error", f"Failed to open pack: {e}")
+            return
+        self.set_images([(name, page_ref(pack_path, name)) for name in sorted(names)])
+
+    def set_images(self, files):
+        """Group (file name, path or pack reference) pairs named <label>_<label_index>_<page_index> by label index."""
         self.images.clear()
-        for file_name in sorted(os.listdir(folder)):
+        self.image_pages.clear()
+        for file_name, file_path in files:
             parts = file_name.split('_')
             if len(parts) >= 3:
                 label = parts[1]
                 page = parts[2].split('.')[0]
                 try:
                     label_index = int(label)
-                    file_path = os.path.join(folder, file_name)
                     if label_index not in self.images:
                         self.images[label_index] = []
                     self.images[label_index].append((int(page), file_path))
+                    self.image_pages.setdefault(str(label_index), set()).add(str(int(page)))
                 except ValueError:
                     continue
 
@@ -127,6 +379,7 @@ class MainWindow(QMainWindow):
         self.current_label_index = min(self.images.keys(), default=None)
         self.display_current_label_images()
 
+    @instrument("align_GUI.display_current_label_images")
     def display_current_label_images(self):
         """Update the image grid layout based on the current label index and number of columns."""
         if self.current_label_index is None:
@@ -149,21 +402,47 @@ class MainWindow(QMainWindow):
         if not images:
             return
 
-        # Add images to the grid
+        # Add placeholders to the grid; thumbnails arrive from a background thread
+        self.image_labels = []
         for idx, image_path in enumerate(images):
             row, col = divmod(idx, num_columns)
-            pixmap = QPixmap(image_path).scaled(image_width, image_width, Qt.KeepAspectRatio)
-            image_label = QLabel()
-            image_label.setPixmap(pixmap)
+            image_label = QLabel("Loading...")
+            image_label.setAlignment(Qt.AlignCenter)
             self.image_grid_layout.addWidget(image_label, row, col)
+            self.image_labels.append(image_label)
 
         self.image_container.adjustSize()
+        self.start_thumbnail_thread(images, image_width)
+
+    def start_thumbnail_thread(self, images, image_width):
+        # Stop the previous label's thread; its results are ignored through the generation number
+        for thread in self.thumbnail_threads:
+            thread.requestInterruption()
+        self.thumbnail_generation += 1
+
+        keys = self.navigation_keys()
+        position = keys.index(self.current_label_index) if self.current_label_index in keys else -1
+        prefetch = self.images.get(keys[position + 1], []) if 0 <= position < len(keys) - 1 else []
+
+        thread = ThumbnailThread(self.thumbnail_generation, list(images), image_width, list(prefetch))
+        thread.thumbnail_ready.connect(self.set_thumbnail)
+        thread.finished.connect(lambda thread=thread: self.thumbnail_threads.discard(thread))
+        self.thumbnail_threads.add(thread)
+        thread.start()
+
+    def set_thumbnail(self, generation, idx, image):
+        if generation != self.thumbnail_generation or idx >= len(self.image_labels):
+            return
+        with span("align_GUI.image_convert"):
+            pixmap = QPixmap.fromImage(image)
+        self.image_labels[idx].setPixmap(pixmap)
+        self.image_container.adjustSize()
 
     def show_next_label(self):
         if not self.images:
             return
         
-        keys = sorted(self.images.keys())
+        keys = self.navigation_keys()
         current_index = keys.index(self.current_label_index)
 
         self.update_edited_data()
@@ -171,18 +450,13 @@ class MainWindow(QMainWindow):
         if current_index + 1 < len(keys):
             self.current_label_index = keys[current_index + 1]
             self.display_current_label_images()
-        if f"{self.current_label_index}" in self.edited_data:
-            self.show_edited_data()
-            self.checkbox.setChecked(self.edited_data[f"{self.current_label_index}"]["is_save"])
-        else:
-            self.populate_table()
-            self.checkbox.setChecked(False)
+        self.show_label_table()
 
     def show_previous_label(self):
         if not self.images:
             return
 
-        keys = sorted(self.images.keys())
+        keys = self.navigation_keys()
         current_index = keys.index(self.current_label_index)
 
         self.update_edited_data()
@@ -191,13 +465,53 @@ class MainWindow(QMainWindow):
             self.current_label_index = keys[current_index - 1]
             self.display_current_label_images()
         
-        if f"{self.current_label_index}" in self.edited_data:
+        self.show_label_table()
+
+    def show_label_table(self):
+        """Show the stored edits of the current label, or filter its OCR data if it has none."""
+        self.load_project_label()
+        if f"{self.current_label_index}" in self.edits:
             self.show_edited_data()
-            self.checkbox.setChecked(self.edited_data[f"{self.current_label_index}"]["is_save"])
+            self.checkbox.setChecked(self.edits.is_saved(self.current_label_index))
         else:
             self.populate_table()
             self.checkbox.setChecked(False)
 
+    def navigation_keys(self):
+        """Label indices to navigate through (only flagged labels when a review file is loaded)."""
+        keys = sorted(self.images.keys())
+        if self.review_labels:
+            keys = [key for key in keys if str(key) in self.review_labels or key == self.current_label_index]
+        if self.live is not None:
+            # While following an OCR stream, only labels whose pages have all arrived
+            keys = [key for key in keys if self.live.is_ready(key) or key == self.current_label_index]
+        return keys
+
+    def load_review_data(self):
+        """Load a review file written by batch_align.py and navigate only through flagged labels."""
+        file_name, _ = QFileDialog.getOpenFileName(self, "Open Review File", "", "JSON Files (*.json)")
+        if not file_name:
+            return
+
+        try:
+            with open(file_name, "r", encoding="utf-8") as file:
+                review = json.load(file)
+            self.edits.load(review["edited_data"])
+            self.column_names = review["column_names"]
+            self.review_labels = set(review["flagged"])
+        except (json.JSONDecodeError, KeyError) as e:
+            QMessageBox.critical(self, "Error", f"Failed to load review file: {e}")
+            return
+
+        flagged = [key for key in sorted(self.images.keys()) if str(key) in self.review_labels]
+        if flagged:
+            self.current_label_index = flagged[0]
+            self.display_current_label_images()
+        if f"{self.current_label_index}" in self.edits:
+            self.show_edited_data()
+            self.checkbox.setChecked(self.edits.is_saved(self.current_label_index))
+        QMessageBox.information(self, "Review", f"{len(self.review_labels)} labels flagged for review.")
+
     def load_json_data(self):
         """Load OCR data from a JSON file and populate the table."""
         file_name, _ = QFileDialog.getOpenFileName(self, "Open JSON File", "", "JSON Files (*.json)")
@@ -207,30 +521,292 @@ class MainWindow(QMainWindow):
         try:
             with open(file_name, "r", encoding="utf-8") as file:
                 self.ocr_data.append(json.load(file))
+                self.ocr_indexes.append(group_by_label(self.ocr_data[-1]))
+                self.ocr_source_names.append(os.path.basename(file_name))
+                self.ocr_version += 1
+                self.add_project_records(self.ocr_source_names[-1], self.ocr_data[-1])
+                self.index_worker.add(self.ocr_source_names[-1], self.ocr_data[-1])
                 self.populate_table()
         except (json.JSONDecodeError, KeyError) as e:
             QMessageBox.critical(self, "Error", f"Failed to load JSON: {e}")
             self.ocr_data = []
+            self.ocr_indexes = []
+            self.ocr_source_names = []
+            self.index_worker.clear()
+
+    def load_json_shards(self):
+        """Load a directory of OCR shards (JSON, JSONL or gzip) in parallel; each label_name becomes a column source."""
+        folder = QFileDialog.getExistingDirectory(self, "Select OCR Shard Folder")
+        if not folder:
+            return
+
+        self.load_shards_button.setEnabled(False)
+        self.shard_progress = QProgressDialog("Loading OCR shards...", None, 0, 0, self)
+        self.shard_progress.setWindowTitle("Loading JSON Shards")
+        self.shard_progress.setWindowModality(Qt.ApplicationModal)
+        self.shard_progress.show()
+
+        self.shard_thread = ShardLoaderThread(folder)
+        self.shard_thread.progress.connect(self.update_shard_progress)
+        self.shard_thread.loaded.connect(self.add_shard_sources)
+        self.shard_thread.failed.connect(self.shard_loading_failed)
+        self.shard_thread.start()
+
+    def update_shard_progress(self, done, total):
+        self.shard_progress.setMaximum(total)
+        self.shard_progress.setValue(done)
+        self.shard_progress.setLabelText(f"Loaded {done}/{total} shards...")
+
+    def add_shard_sources(self, sources):
+        self.shard_progress.close()
+        self.load_shards_button.setEnabled(True)
+        for label_name, records in sources:
+            self.ocr_data.append(records)
+            self.ocr_indexes.append(group_by_label(records))
+            self.ocr_source_names.append(label_name or "(no label name)")
+            self.add_project_records(self.ocr_source_names[-1], records)
+            self.index_worker.add(self.ocr_source_names[-1], records)
+        self.ocr_version += 1
+        QMessageBox.information(self, "Shards Loaded", "\n".join(
+            f"{label_name or '(no label name)'}: {len(records)} pages" for label_name, records in sources
+        ) or "No OCR records found.")
+        self.populate_table()
+
+    def index_progress(self, lines):
+        self.statusBar().showMessage(f"Search index: {lines} OCR lines")
+        if self.search_results.isVisible():
+            self.run_search()  # Results grow while sources are still being indexed
+
+    def search_timer_restart(self):
+        self.search_timer.start()
+
+    def run_search(self):
+        """List the OCR lines matching the search box, best first."""
+        self.search_timer.stop()
+        query = self.search_box.text().strip()
+        self.search_results.clear()
+        if not query:
+            self.search_results.hide()
+            return
+        with span("align_GUI.search"):
+            hits = self.text_index.search(query)
+        for label_index, page_index, line, text, score in hits:
+            item = QListWidgetItem(f"Label {label_index}, page {page_index}, line {line + 1} ({score:.0%}): {text}")
+            item.setData(Qt.UserRole, label_index)
+            self.search_results.addItem(item)
+        if not hits:
+            self.search_results.addItem(QListWidgetItem(f"No OCR line matches \"{query}\""))
+        self.search_results.show()
+
+    def jump_to_search_hit(self, item):
+        """Show the label of the selected search hit."""
+        label_index = item.data(Qt.UserRole)
+        if label_index is None:
+            return
+        key = int(label_index) if label_index.isdigit() else label_index
+        if self.images and key not in self.images:
+            self.statusBar().showMessage(f"Label {label_index} has no loaded images")
+            return
+        if key == self.current_label_index:
+            return
+        self.update_edited_data()
+        self.current_label_index = key
+        self.display_current_label_images()
+        self.show_label_table()
+
+    def toggle_live_stream(self):
+        """Follow a JSONL file written by `ocr_runner.py --stream` while OCR is running, or stop following it."""
+        if self.live is not None:
+            self.stop_live_stream()
+            return
+
+        file_name, _ = QFileDialog.getOpenFileName(self, "Follow OCR Stream", "", "JSON Lines (*.jsonl)")
+        if not file_name:
+            return
+
+        self.live = LiveLabels(self.image_pages)
+        self.live_tail = RecordTail(file_name)
+        self.live_records = []
+        self.ocr_data.append(self.live_records)
+        self.ocr_indexes.append(self.live.index)
+        self.ocr_source_names.append(os.path.basename(file_name))
+        self.ocr_version += 1
+        self.live_watcher.addPath(file_name)
+        self.live_timer.start()
+        self.live_button.setText("Stop Following")
+        self.poll_live_stream()
+        if self.current_label_index is not None and not self.live.is_ready(self.current_label_index):
+            self.populate_table()
+
+    def poll_live_stream(self):
+        """Add the records appended to the followed stream; show the current label once all its pages arrived."""
+        if self.live is None:
+            return
+        # Watchers drop a file that is replaced; watch it again
+        if self.live_tail.path not in self.live_watcher.files() and os.path.exists(self.live_tail.path):
+            self.live_watcher.addPath(self.live_tail.path)
+
+        records = self.live_tail.read_new()
+        if not records:
+            return
+        self.live_records.extend(records)
+        self.add_project_records(os.path.basename(self.live_tail.path), records)
+        self.index_worker.add(os.path.basename(self.live_tail.path), records)
+        newly_ready = self.live.add(records)
+        if self.live.revised:
+            self.ocr_version += 1  # A label that was already shown got new pages: drop its cached table
+        self.statusBar().showMessage(
+            f"Live OCR: {self.live.count} pages received, {len(self.live.ready)} labels ready"
+        )
+        current = f"{self.current_label_index}"
+        if current in newly_ready or current in self.live.revised:
+            self.show_label_table()
+        elif newly_ready:
+            self.prefetch_next_label()
+
+    def stop_live_stream(self):
+        """Stop following the stream; labels received so far all become navigable."""
+        self.poll_live_stream()
+        self.live_timer.stop()
+        if self.live_watcher.files():
+            self.live_watcher.removePaths(self.live_watcher.files())
+        waiting = self.current_label_index is not None and not self.live.is_ready(self.current_label_index)
+        self.live = None
+        self.live_tail = None
+        self.live_button.setText("Follow OCR Stream")
+        if waiting:
+            self.show_label_table()
+
+    def shard_loading_failed(self, message):
+        self.shard_progress.close()
+        self.load_shards_button.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to load JSON shards: {message}")
+
+    def open_project(self):
+        """
+        Open (or create) a project store (project_store.py). OCR sources and page assignments stored in it are
+        loaded, OCR sources already loaded here are added to it, and from now on every edit is written to it.
+        """
+        file_name, _ = QFileDialog.getSaveFileName(self, "Open or Create Project", "",
+                                                   f"Project Files (*{PROJECT_SUFFIX})",
+                                                   options=QFileDialog.DontConfirmOverwrite)
+        if not file_name:
+            return
+
+        try:
+            project = ProjectStore(file_name)
+            stored_sources = project.ocr_sources()
+            for name, records in zip(self.ocr_source_names, self.ocr_data):
+                if name not in stored_sources:
+                    project.add_ocr_records(name, records)
+            for name in stored_sources:
+                if name not in self.ocr_source_names:
+                    self.ocr_data.append(project.ocr_records(name))
+                    self.ocr_indexes.append(group_by_label(self.ocr_data[-1]))
+                    self.ocr_source_names.append(name)
+                    self.index_worker.add(name, self.ocr_data[-1])
+            assignments = project.assignments()
+            column_names = project.get_meta("column_names")
+        except (OSError, sqlite3.Error) as e:
+            QMessageBox.critical(self, "Error", f"Failed to open project: {e}")
+            return
+
+        if self.project is not None:
+            self.project.close()
+        self.project = project
+        self.ocr_version += 1
+        if column_names:
+            self.column_names = column_names
+        if assignments and not self.images:
+            self.set_images([(image_name(record), record["source_path"]) for record in assignments])
+        if self.current_label_index is not None:
+            self.show_label_table()
+        self.statusBar().showMessage(
+            f"Project {os.path.basename(file_name)}: {len(self.ocr_source_names)} OCR sources, "
+            f"{len(project.labels())} edited labels"
+        )
+
+    def add_project_records(self, name, records):
+        """Add OCR records of a source to the open project."""
+        if self.project is None or not records:
+            return
+        try:
+            self.project.add_ocr_records(name, records)
+        except sqlite3.Error as e:
+            print(f"Error writing OCR records to project: {e}")
+
+    def load_project_label(self):
+        """
+        Take the current label from the project unless it has unsaved local edits, so that edits of other
+        annotators and of batch_align show up.
+        """
+        if self.project is None or self.current_label_index is None:
+            return
+        if self.edits.is_dirty(self.current_label_index):
+            return
+        try:
+            stored = self.project.load_label(self.current_label_index)
+        except sqlite3.Error as e:
+            print(f"Error reading label from project: {e}")
+            return
+        if stored is not None:
+            columns, is_save = stored[:2]
+            self.edits.put(self.current_label_index, columns, is_save)
+
+    def save_project_columns(self):
+        """Store the column names in the open project (shared by all labels)."""
+        if self.project is None:
+            return
+        try:
+            self.project.set_meta("column_names", self.column_names)
+        except sqlite3.Error as e:
+            print(f"Error writing column names to project: {e}")
+
+    def persist_label(self, label_index, group):
+        """Write a changed label to the open project (only the edited rows when cells were changed)."""
+        if self.project is None:
+            return
+        rows = None
+        if group and all(op[0] == "set" for op in group):
+            rows = [op[1] for op in group]
+        try:
+            self.project.save_label(label_index, self.edits.table(label_index), self.edits.is_saved(label_index),
+                                    rows=rows)
+        except sqlite3.Error as e:
+            print(f"Error writing label {label_index} to project: {e}")
+            self.statusBar().showMessage(f"Failed to save label {label_index} to project: {e}")
 
     def show_edited_data(self):
         """Show the edited data in the table."""
-        if not self.edited_data:
+        if f"{self.current_label_index}" not in self.edits:
             return
 
-        self.ocr_table.clear()
-        self.ocr_table.setRowCount(len(self.edited_data[f"{self.current_label_index}"]["data"][0]))
-        self.ocr_table.setColumnCount(len(self.edited_data[f"{self.current_label_index}"]["data"]))
+        self.filter_generation += 1  # A pending filter result must not replace the stored edits
+        self.fill_table(self.edits.open(self.current_label_index))
 
-        for col_idx, column_data in enumerate(self.edited_data[f"{self.current_label_index}"]["data"]):
-            for row_idx, value in enumerate(column_data):
-                item = QTableWidgetItem(str(value))
-                self.ocr_table.setItem(row_idx, col_idx, item)
+    def fill_table(self, columns):
+        """Show a table (list of columns) without recording the cells as edits."""
+        self.ocr_table.blockSignals(True)
+        try:
+            self.ocr_table.clear()
+            self.ocr_table.setRowCount(len(columns[0]) if columns else 0)
+            self.ocr_table.setColumnCount(len(columns))
+            self.ocr_table.setHorizontalHeaderLabels(self.column_names)
 
+            for col_idx, column_data in enumerate(columns):
+                for row_idx, value in enumerate(column_data):
+                    item = QTableWidgetItem(str(value))
+                    self.ocr_table.setItem(row_idx, col_idx, item)
+        finally:
+            self.ocr_table.blockSignals(False)
+
+    @instrument("align_GUI.populate_table")
     def populate_table(self):
         """Populate the table with OCR data based on the current label index."""
         try:
             # Clear the table before populating
             self.ocr_table.clear()
+            self.edits.close()
 
             # Ensure label index exists
             if self.current_label_index is None:
@@ -238,41 +814,81 @@ class MainWindow(QMainWindow):
                 return
 
             # Find data matching the current label index
-            label_datas = []
-            for data in self.ocr_data:
-                label_datas.append([
-                    item for item in data if str(item["label_index"]) == str(self.current_label_index)
-                ])
+            label_datas = [index.get(str(self.current_label_index), []) for index in self.ocr_indexes]
 
             if not label_datas:
                 QMessageBox.warning(self, "No Data", f"No data found for label index {self.current_label_index}.")
                 return
-            
-            full_table = []
-
-            # Iterate through label data and collect relevant text
-            for col, data in enumerate(label_datas): # Tự thay đổi và tùy chỉnh cho phù hợp ngữ liệu
-                #full_table.extend(only_text(data))
-                if col == 0:
-                    full_table.extend(simple_chinese(data))
-                elif col == 1:
-                    if len(full_table[0]) > 0:
-                        med = median([len(text) for text in full_table[2]])
-                        leng = len(full_table[2])
-                    else:
-                        med = float("inf")
-                        leng = float("inf")
-                    full_table.extend(only_phien_am(data, med=med, leng=leng))
-
-            # Ensure consistent column lengths
-            max_length = max(len(col) for col in full_table)
-            for col in full_table:
-                while len(col) < max_length:
-                    col.append("")
-
-            # Populate the table with data
-            self.ocr_table.setRowCount(max_length)
-            self.ocr_table.setColumnCount(len(full_table))
+
+            # Results for labels the user has already left are ignored through the generation number
+            self.filter_generation += 1
+            if self.live is not None and not self.live.is_ready(self.current_label_index):
+                self.show_placeholder("Waiting for OCR of this label...")
+                return
+            key = self.filter_key(self.current_label_index)
+            if key in self.filter_cache:
+                self.filter_cache.move_to_end(key)
+                self.show_filtered_table(*self.filter_cache[key])
+                self.prefetch_next_label()
+                return
+
+            self.show_placeholder("Filtering...")
+            self.filter_worker.request(self.filter_generation, key, label_datas, key[2])
+
+        except Exception as e:
+            print(str(e))
+            QMessageBox.critical(self, "Error", f"An error occurred while populating the table: {str(e)}")
+
+    def filter_key(self, label_index):
+        return (self.ocr_version, f"{label_index}", self.align_checkbox.isChecked())
+
+    def show_placeholder(self, text):
+        self.ocr_table.blockSignals(True)
+        self.ocr_table.setRowCount(1)
+        self.ocr_table.setColumnCount(1)
+        item = QTableWidgetItem(text)
+        item.setFlags(Qt.ItemIsEnabled)
+        self.ocr_table.setItem(0, 0, item)
+        self.ocr_table.blockSignals(False)
+
+    def filter_finished(self, generation, key, table, confidences, error):
+        """Cache the filtered table and show it if the user is still on that label."""
+        is_current = generation == self.filter_generation and key == self.filter_key(self.current_label_index)
+        if error:
+            if is_current:
+                print(error)
+                self.show_placeholder("")
+                QMessageBox.critical(self, "Error", f"An error occurred while populating the table: {error}")
+            return
+
+        self.filter_cache[key] = (table, confidences)
+        self.filter_cache.move_to_end(key)
+        while len(self.filter_cache) > FILTER_CACHE_SIZE:
+            self.filter_cache.popitem(last=False)
+
+        if is_current:
+            self.show_filtered_table(table, confidences)
+            self.prefetch_next_label()
+
+    def prefetch_next_label(self):
+        """Speculatively filter the next label in the background so "Next Label" is instant."""
+        keys = self.navigation_keys()
+        if self.current_label_index not in keys:
+            return
+        position = keys.index(self.current_label_index)
+        if position + 1 >= len(keys):
+            return
+        next_label = keys[position + 1]
+        key = self.filter_key(next_label)
+        if key in self.filter_cache or f"{next_label}" in self.edits:
+            return
+        label_datas = [index.get(str(next_label), []) for index in self.ocr_indexes]
+        self.filter_worker.request(self.filter_generation, key, label_datas, key[2], speculative=True)
+
+    def show_filtered_table(self, full_table, confidences):
+        """Show a filtered table of the current label and highlight rows with low alignment confidence."""
+        try:
+            confidences = confidences or []
 
             if len(self.column_names) == 0:
                 self.column_names = [f"Label {i + 1}" for i in range(len(full_table))]
@@ -281,33 +897,64 @@ class MainWindow(QMainWindow):
             elif len(self.column_names) < len(full_table):
                 self.column_names.extend([f"Label {i + 1}" for i in range(len(self.column_names), len(full_table))])
             
-            self.ocr_table.setHorizontalHeaderLabels(self.column_names)
+            # The filtered table becomes the baseline that later edits are recorded against
+            self.fill_table(self.edits.open(self.current_label_index, full_table))
 
-            for col_idx, column_data in enumerate(full_table):
-                for row_idx, value in enumerate(column_data):
-                    # Ensure value is a string
-                    item = QTableWidgetItem(str(value))
-                    self.ocr_table.setItem(row_idx, col_idx, item)
+            # Highlight rows the aligner is unsure about
+            self.ocr_table.blockSignals(True)
+            for row_idx, confidence in enumerate(confidences):
+                if confidence >= LOW_CONFIDENCE:
+                    continue
+                for col_idx in range(len(full_table)):
+                    item = self.ocr_table.item(row_idx, col_idx)
+                    item.setBackground(QColor(255, 220, 220))
+                    item.setToolTip(f"Alignment confidence: {confidence:.2f}")
+            self.ocr_table.blockSignals(False)
 
         except Exception as e:
             print(str(e))
             QMessageBox.critical(self, "Error", f"An error occurred while populating the table: {str(e)}")
 
+    @instrument("align_GUI.update_edited_data")
     def update_edited_data(self):
-        current_data = {}
-        current_data["is_save"] = self.checkbox.isChecked()
-        current_data["data"] = [[] for _ in range(self.ocr_table.columnCount())]
-
-        for row in range(self.ocr_table.rowCount()):
-            for col in range(self.ocr_table.columnCount()):
-                item = self.ocr_table.item(row, col)
-                if item:
-                    current_data["data"][col].append(item.text())
-                else:
-                    current_data["data"][col].append("")
-        
-        self.edited_data[f"{self.current_label_index}"] = current_data
+        """Record the save checkbox of the current label (cell edits are recorded as they happen)."""
+        if self.current_label_index is not None:
+            self.edits.set_saved(self.current_label_index, self.checkbox.isChecked())
+
+    def cell_edited(self, item):
+        """Record a cell edit made by the user in the edit log."""
+        columns = self.edits.columns
+        if columns is None:
+            return
+        row, col = item.row(), item.column()
+        if col < len(columns) and row < len(columns[col]):
+            self.edits.set_cell(row, col, item.text())
 
+    def undo_edit(self):
+        group = self.edits.undo()
+        if group is None:
+            return
+        for op in reversed(group):
+            if op[0] == "insert_column":
+                self.column_names.pop(op[1])
+            elif op[0] == "remove_column":
+                self.column_names.insert(op[1], op[3])
+        self.save_project_columns()
+        self.fill_table(self.edits.columns)
+
+    def redo_edit(self):
+        group = self.edits.redo()
+        if group is None:
+            return
+        for op in group:
+            if op[0] == "insert_column":
+                self.column_names.insert(op[1], op[2])
+            elif op[0] == "remove_column":
+                self.column_names.pop(op[1])
+        self.save_project_columns()
+        self.fill_table(self.edits.columns)
+
+    @instrument("align_GUI.save_csv_data")
     def save_csv_data(self):
         """Save OCR data to a CSV file based on the current table."""
         try:
@@ -317,20 +964,12 @@ class MainWindow(QMainWindow):
             
             self.update_edited_data()
 
-            with open(output_file, "w", encoding="utf-8-sig") as file:
-                # Write header
-                header = ",".join(["index"] + self.column_names)
-                file.write(header + "\n")
-
-                # Write data
-                for label_index, data in self.edited_data.items():
-                    if not data["is_save"]:
-                        continue
-
-                    for row in range(len(data[f"data"][0])):
-                        row_data = [row + 1] + [data["data"][col][row] for col in range(len(data["data"]))]
-                        row_data = [str(item).replace(",", "") for item in row_data]
-                        file.write(",".join(row_data) + "\n")
+            if self.project is not None:
+                # The project holds every saved label, including those of other annotators
+                self.save_project_columns()
+                self.project.export_csv(output_file, self.column_names)
+            else:
+                write_csv(output_file, self.column_names, self.edits)
 
             QMessageBox.information(self, "Success", "Data saved successfully!")
         except Exception as e:
@@ -413,17 +1052,19 @@ class MainWindow(QMainWindow):
         current_row = self.ocr_table.currentRow()
         current_col = self.ocr_table.currentColumn()
 
-        for r_offset, row_data in enumerate(rows):
-            columns = row_data.split("\t")
-            for c_offset, text in enumerate(columns):
-                target_row = current_row + r_offset
-                target_col = current_col + c_offset
-                if target_row < self.ocr_table.rowCount() and target_col < self.ocr_table.columnCount():
-                    item = self.ocr_table.item(target_row, target_col)
-                    if not item:
-                        item = QTableWidgetItem()
-                        self.ocr_table.setItem(target_row, target_col, item)
-                    item.setText(text)
+        # One undo step for the whole paste
+        with self.edits.group():
+            for r_offset, row_data in enumerate(rows):
+                columns = row_data.split("\t")
+                for c_offset, text in enumerate(columns):
+                    target_row = current_row + r_offset
+                    target_col = current_col + c_offset
+                    if target_row < self.ocr_table.rowCount() and target_col < self.ocr_table.columnCount():
+                        item = self.ocr_table.item(target_row, target_col)
+                        if not item:
+                            item = QTableWidgetItem()
+                            self.ocr_table.setItem(target_row, target_col, item)
+                        item.setText(text)
 
     def keyPressEvent(self, event):
         """Override keyPressEvent to handle copy-paste shortcuts."""
@@ -432,26 +1073,38 @@ class MainWindow(QMainWindow):
                 self.copy_selected()
             elif event.key() == Qt.Key_V:
                 self.paste_selected()
+            elif event.key() == Qt.Key_Z:
+                self.undo_edit()
+            elif event.key() == Qt.Key_Y:
+                self.redo_edit()
         super().keyPressEvent(event)
     
     def add_row(self):
         """Add a new empty row to the table."""
+        if self.edits.columns is not None:
+            self.edits.insert_row(self.ocr_table.rowCount())
         self.ocr_table.insertRow(self.ocr_table.rowCount())
         
 
     def delete_row(self):
         """Delete the selected row from the table."""
         selected_rows = set(index.row() for index in self.ocr_table.selectedIndexes())
-        for row in sorted(selected_rows, reverse=True):
-            self.ocr_table.removeRow(row)
+        with self.edits.group():
+            for row in sorted(selected_rows, reverse=True):
+                if self.edits.columns is not None:
+                    self.edits.remove_row(row)
+                self.ocr_table.removeRow(row)
         
 
     def add_column(self):
         """Add a new column to the table."""
         current_column_count = self.ocr_table.columnCount()
+        if self.edits.columns is not None:
+            self.edits.insert_column(current_column_count, f"Column {current_column_count + 1}")
         self.ocr_table.insertColumn(current_column_count)
         self.ocr_table.setHorizontalHeaderItem(current_column_count, QTableWidgetItem(f"Column {current_column_count + 1}"))
         self.column_names.append(f"Column {current_column_count + 1}")
+        self.save_project_columns()
 
 
     def delete_column(self):
@@ -463,8 +1116,11 @@ class MainWindow(QMainWindow):
             return
         current_column = self.ocr_table.currentColumn()
         if current_column >= 0:
+            if self.edits.columns is not None:
+                self.edits.remove_column(current_column, self.column_names[current_column])
             self.ocr_table.removeColumn(current_column)
             self.column_names.pop(current_column)
+            self.save_project_columns()
 
     def rename_column(self):
         """Rename the currently selected column."""
@@ -475,6 +1131,19 @@ class MainWindow(QMainWindow):
             if ok and new_name.strip():
                 self.ocr_table.setHorizontalHeaderItem(current_column, QTableWidgetItem(new_name))
                 self.column_names[current_column] = new_name
+                self.save_project_columns()
+
+    def closeEvent(self, event):
+        self.live_timer.stop()
+        self.filter_worker.stop()
+        self.index_worker.stop()
+        for thread in list(self.thumbnail_threads):
+            thread.requestInterruption()
+            thread.wait()
+        if self.project is not None:
+            self.update_edited_data()
+            self.project.close()
+        event.accept()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,289 @@
+"""
+Phần xử lý không phụ thuộc GUI của align_GUI: đọc kết quả OCR, gom record theo label,
+lọc/căn chỉnh từng label và xuất CSV.
+
+Module này không import PyQt5; các module nặng (simple_filter, aligner, fuzzywuzzy) chỉ được import
+khi cần nên các worker của multiprocessing và các tool dòng lệnh khởi động nhanh.
+"""
+import os
+import gzip
+import json
+
+SHARD_EXTENSIONS = (".json", ".jsonl", ".json.gz", ".jsonl.gz")
+
+
+def load_ocr_file(path):
+    """Load a list of OCR records from a JSON file."""
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def list_shards(directory):
+    """List the OCR shard files (JSON, JSONL, optionally gzip-compressed) of a directory, sorted by name."""
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(SHARD_EXTENSIONS)
+    )
+
+
+def load_shard(path):
+    """
+    Load the OCR records of one shard file.
+    JSON shards hold a list of records (or one record), JSONL shards one record per line.
+    """
+    opener = gzip.open if path.lower().endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as file:
+        if path.lower().endswith((".jsonl", ".jsonl.gz")):
+            return [json.loads(line) for line in file if line.strip()]
+        data = json.load(file)
+    return data if isinstance(data, list) else [data]
+
+
+def record_key(record):
+    """
+    Key identifying one OCR page: (label_name, label_index, page_index) as strings.
+    The same label/page can be labeled with several names (e.g. Han_1_3 and PA_1_3), each is its own page.
+    """
+    return str(record.get("label_name", "")), str(record["label_index"]), str(record["page_index"])
+
+
+def merge_records(shards):
+    """
+    Merge the records of several shards, one record per (label_name, label_index, page_index).
+    Duplicates keep the record with the most OCR lines (the later shard on a tie).
+    :param shards: Iterable of record lists, in shard order.
+    :return: Dict {(label_name, label_index, page_index): record}.
+    """
+    merged = {}
+    for records in shards:
+        for record in records:
+            key = record_key(record)
+            current = merged.get(key)
+            if current is None or (len(record.get("result", {}).get("lines", []))
+                                   >= len(current.get("result", {}).get("lines", []))):
+                merged[key] = record
+    return merged
+
+
+def split_sources(merged):
+    """
+    Split merged records into column sources by label_name. Columns keep the order in which each label_name
+    first appears in the shards (the insertion order of merge_records), like loading the files one by one.
+    :return: List of (label_name, records sorted by label and page).
+    """
+    sources = {key[0]: [] for key in merged}
+    for key in sorted(merged, key=lambda key: (label_sort_key(key[1]), label_sort_key(key[2]))):
+        sources[key[0]].append(merged[key])
+    return list(sources.items())
+
+
+def load_shards(directory, workers=None, progress=None):
+    """
+    Parse all shards of a directory in worker processes and merge them.
+    :param workers: Number of worker processes (default: cpu_count()).
+    :param progress: Optional callback progress(done, total) called after each shard.
+    :return: List of (label_name, records) column sources, see split_sources.
+    """
+    from multiprocessing import Pool, cpu_count
+
+    paths = list_shards(directory)
+    results = [None] * len(paths)
+    workers = min(workers or cpu_count(), len(paths))
+    if workers <= 1:
+        # Một CPU hoặc một shard: parse trực tiếp, tránh chi phí pickle record giữa các process
+        loaded = map(_load_shard_at, enumerate(paths))
+        pool = None
+    else:
+        pool = Pool(processes=workers)
+        loaded = pool.imap_unordered(_load_shard_at, enumerate(paths))
+    try:
+        for done, (position, records) in enumerate(loaded, 1):
+            # Giữ thứ tự shard để xử lý trùng lặp ổn định dù worker trả về theo thứ tự bất kỳ
+            results[position] = records
+            if progress:
+                progress(done, len(paths))
+    finally:
+        if pool is not None:
+            pool.terminate()
+    return split_sources(merge_records(results))
+
+
+def _load_shard_at(args):
+    position, path = args
+    return position, load_shard(path)
+
+
+def group_by_label(records):
+    """Group OCR records by label_index (as string, like populate_table compares them)."""
+    groups = {}
+    for item in records:
+        groups.setdefault(str(item["label_index"]), []).append(item)
+    return groups
+
+
+def label_sort_key(label_index):
+    """Sort numeric label indices numerically, others after them."""
+    label_index = str(label_index)
+    return (0, int(label_index), "") if label_index.isdigit() else (1, 0, label_index)
+
+
+class RecordTail:
+    """
+    Read the records appended to a growing JSONL file (ocr_runner --stream) since the last call.
+    Only lines terminated by a newline are parsed; a line still being written is kept for the next read.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.offset = 0
+        self._partial = b""
+
+    def read_new(self):
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return []
+        if size < self.offset:
+            # The file was truncated or recreated: read it again from the start
+            self.offset = 0
+            self._partial = b""
+        if size == self.offset:
+            return []
+        with open(self.path, "rb") as file:
+            file.seek(self.offset)
+            data = file.read(size - self.offset)
+        self.offset += len(data)
+
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        records = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                print(f"Skipping invalid line in {self.path}: {e}")
+        return records
+
+
+class LiveLabels:
+    """
+    Incremental label index of an OCR record stream, tracking which labels have received all their pages.
+
+    A label is ready when every expected page (from the loaded images) has arrived, or when a record of a later
+    label has arrived (ocr_runner processes images sorted by label and page), or after finish().
+    """
+    def __init__(self, expected_pages=None):
+        self.index = {}  # {label_index: records sorted by page}, same shape as group_by_label
+        self.expected_pages = expected_pages if expected_pages is not None else {}  # {label_index: {page_index}}
+        self.ready = set()
+        self.revised = set()  # Ready labels that received records in the last add()
+        self._records = {}  # {label_index: {(label_name, page_index): record}}
+        self._last_label = None
+        self.count = 0
+
+    def add(self, records):
+        """Add new records; return the labels that just became ready, in label order."""
+        touched = set()
+        for record in records:
+            label_name, label_index, page_index = record_key(record)
+            pages = self._records.setdefault(label_index, {})
+            if (label_name, page_index) not in pages:
+                self.count += 1
+            pages[label_name, page_index] = record
+            touched.add(label_index)
+            if self._last_label is None or label_sort_key(label_index) > label_sort_key(self._last_label):
+                self._last_label = label_index
+        for label_index in touched:
+            pages = self._records[label_index]
+            self.index[label_index] = [pages[key] for key in sorted(pages, key=lambda key: (label_sort_key(key[1]), key[0]))]
+        self.revised = touched & self.ready
+
+        newly_ready = [label_index for label_index in self._records
+                       if label_index not in self.ready and self._is_complete(label_index)]
+        self.ready.update(newly_ready)
+        return sorted(newly_ready, key=label_sort_key)
+
+    def _is_complete(self, label_index):
+        expected = self.expected_pages.get(label_index)
+        if expected and expected <= {page_index for _, page_index in self._records[label_index]}:
+            return True
+        return label_sort_key(label_index) < label_sort_key(self._last_label)
+
+    def is_ready(self, label_index):
+        """Ready labels, and labels the stream has already passed without any record for them."""
+        label_index = str(label_index)
+        if label_index in self.ready:
+            return True
+        return self._last_label is not None and label_sort_key(label_index) < label_sort_key(self._last_label)
+
+    def finish(self):
+        """The stream has ended: every label received so far is ready."""
+        self.ready.update(self._records)
+
+
+def filter_label(label_datas, align=True):
+    """
+    Lọc (và căn chỉnh) dữ liệu OCR của một label như populate_table.
+    :param label_datas: Một list record cho mỗi nguồn OCR (cột).
+    :return: Tuple (table, confidences), confidences là None nếu không căn chỉnh.
+    """
+    from simple_filter import label_table
+
+    table = label_table(label_datas)
+    if not align:
+        return table, None
+
+    from aligner import align_table
+    return align_table(table)
+
+
+def flag_table(table, confidences=None):
+    """
+    Return the reasons a filtered table needs manual review (empty list if it looks fine).
+    :param confidences: Per-row alignment confidences from aligner.align_table, if the table was aligned.
+    """
+    reasons = []
+    if len(table) < 4:
+        reasons.append("missing columns")
+        return reasons
+
+    han_lines = [text for text in table[2] if text]
+    phien_am_lines = [text for text in table[3] if text]
+    if not han_lines:
+        reasons.append("no Han lines")
+    if not phien_am_lines:
+        reasons.append("no phien am lines")
+    if not han_lines or not phien_am_lines:
+        return reasons
+
+    if confidences is not None:
+        from aligner import LOW_CONFIDENCE
+
+        low_rows = sum(1 for confidence in confidences if confidence < LOW_CONFIDENCE)
+        if low_rows:
+            reasons.append(f"low alignment confidence ({low_rows} rows)")
+    elif len(han_lines) != len(phien_am_lines):
+        reasons.append(f"line count mismatch ({len(han_lines)} vs {len(phien_am_lines)})")
+    return reasons
+
+
+def write_csv(output_file, column_names, edited_data, skip_labels=()):
+    """
+    Write edited data to CSV in the format of align_GUI.save_csv_data.
+    :param skip_labels: Label indices to leave out (e.g. duplicates found by dedupe.find_duplicates).
+    """
+    with open(output_file, "w", encoding="utf-8-sig") as file:
+        # Write header
+        header = ",".join(["index"] + column_names)
+        file.write(header + "\n")
+
+        # Write data
+        for label_index, data in edited_data.items():
+            if not data["is_save"] or not data["data"] or label_index in skip_labels:
+                continue
+
+            for row in range(len(data["data"][0])):
+                row_data = [row + 1] + [data["data"][col][row] for col in range(len(data["data"]))]
+                row_data = [str(item).replace(",", "") for item in row_data]
+                file.write(",".join(row_data) + "\n")
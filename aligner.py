@@ -0,0 +1,178 @@
+"""
+Căn chỉnh dòng Hán và dòng phiên âm bằng quy hoạch động có giới hạn băng (banded DP).
+
+Mỗi chữ Hán ứng với một âm tiết phiên âm, nên chi phí ghép hai dòng dựa trên độ chênh lệch
+giữa số chữ Hán và số âm tiết. Ngoài ghép 1:1 còn hỗ trợ bỏ dòng (1:0, 0:1) và gộp dòng (2:1, 1:2)
+khi OCR tách/gộp sai dòng. DP chỉ xét các ô nằm trong một băng đi theo đường căn chỉnh tốt nhất
+nên chi phí là O(n * band) thay vì O(n * m).
+"""
+import re
+from language_helper import get_reading_index, reading_match_scores
+
+DEFAULT_BAND = 8
+SKIP_COST = 1.0
+MERGE_PENALTY = 0.15
+LOW_CONFIDENCE = 0.6
+
+# (số dòng Hán, số dòng phiên âm) được dùng trong một bước
+MOVES = ((1, 1), (1, 0), (0, 1), (2, 1), (1, 2))
+
+_han_pattern = re.compile(r'[\u4e00-\u9fff]')
+_syllable_pattern = re.compile(r'\w')
+
+
+def han_length(text: str) -> int:
+    """
+    Đếm số chữ Hán trong dòng.
+    """
+    return len(_han_pattern.findall(text))
+
+
+def syllable_count(text: str) -> int:
+    """
+    Đếm số âm tiết trong dòng phiên âm (bỏ qua các token chỉ gồm dấu câu).
+    """
+    return sum(1 for word in text.split() if _syllable_pattern.search(word))
+
+
+def pair_cost(han_count: int, syllable_total: int) -> float:
+    """
+    Chi phí ghép một nhóm dòng Hán với một nhóm dòng phiên âm, trong khoảng [0, 1].
+    """
+    longest = max(han_count, syllable_total)
+    if longest == 0:
+        return 0.0
+    return abs(han_count - syllable_total) / longest
+
+
+def _move_cost(move, h, v, i, j, match=None):
+    if move == (1, 1):
+        if match is not None:
+            return (pair_cost(h[i - 1], v[j - 1]) + match(i - 1, j - 1)) / 2
+        return pair_cost(h[i - 1], v[j - 1])
+    if move == (2, 1):
+        return pair_cost(h[i - 2] + h[i - 1], v[j - 1]) + MERGE_PENALTY
+    if move == (1, 2):
+        return pair_cost(h[i - 1], v[j - 2] + v[j - 1]) + MERGE_PENALTY
+    return SKIP_COST
+
+
+def align_lines(han_lines, viet_lines, band=DEFAULT_BAND, index=None):
+    """
+    Căn chỉnh danh sách dòng Hán với danh sách dòng phiên âm.
+    :param han_lines: Các dòng Hán (không rỗng).
+    :param viet_lines: Các dòng phiên âm (không rỗng).
+    :param band: Nửa độ rộng băng, tính theo số dòng phiên âm.
+    :param index: language_helper.ReadingIndex; nếu có, chi phí ghép 1:1 tính thêm độ khớp âm Hán-Việt.
+    :return: List các tuple (han_ids, viet_ids, confidence), han_ids/viet_ids là list chỉ số dòng
+             (rỗng nếu dòng bên kia bị bỏ), confidence trong khoảng [0, 1].
+    """
+    n, m = len(han_lines), len(viet_lines)
+    if n == 0 or m == 0:
+        return [([i], [], 0.0) for i in range(n)] + [([], [j], 0.0) for j in range(m)]
+
+    h = [han_length(text) for text in han_lines]
+    v = [syllable_count(text) for text in viet_lines]
+    band = max(band, 2, m // n + 2)
+
+    match = None
+    if index is not None:
+        scores = {}
+
+        def match(han_id, viet_id):
+            key = (han_id, viet_id)
+            if key not in scores:
+                # Tính theo cả lô các ô trong băng của hàng hiện tại
+                pairs = [(han_lines[han_id], viet_lines[j]) for j in range(max(0, viet_id - band), min(m, viet_id + band + 1))]
+                for offset, score in enumerate(reading_match_scores(pairs, index=index)):
+                    scores[(han_id, max(0, viet_id - band) + offset)] = 1.0 - score / 100
+            return scores[key]
+
+    # Hàng i chỉ lưu các cột j trong [low[i], high[i]]. Băng đi theo ô tốt nhất của hàng trước
+    # (cộng thêm độ dốc m / n) nên vẫn bám được đường căn chỉnh khi lỗi OCR làm lệch khỏi đường chéo.
+    step = m / n
+    low = []
+    high = []
+    inf = float("inf")
+    cost = []
+    back = []
+    for i in range(n + 1):
+        if i == 0:
+            center = 0
+        else:
+            prev_cost = cost[i - 1]
+            center = low[i - 1] + prev_cost.index(min(prev_cost)) + round(step)
+        low.append(max(0, min(center, m) - band))
+        high.append(m if i == n else min(m, center + band))
+
+        row_cost = [inf] * (high[i] - low[i] + 1)
+        row_back = bytearray(len(row_cost))
+        for j in range(low[i], high[i] + 1):
+            if i == 0 and j == 0:
+                row_cost[0] = 0.0
+                continue
+            best = inf
+            best_move = 0
+            for move_id, move in enumerate(MOVES):
+                pi, pj = i - move[0], j - move[1]
+                if pi < 0 or pj < low[pi] or pj > high[pi]:
+                    continue
+                prev = cost[pi][pj - low[pi]] if pi < i else row_cost[pj - low[i]]
+                if prev == inf:
+                    continue
+                total = prev + _move_cost(move, h, v, i, j, match)
+                if total < best:
+                    best = total
+                    best_move = move_id
+            row_cost[j - low[i]] = best
+            row_back[j - low[i]] = best_move
+        cost.append(row_cost)
+        back.append(row_back)
+
+    # Truy vết từ (n, m) về (0, 0)
+    rows = []
+    i, j = n, m
+    while i > 0 or j > 0:
+        move = MOVES[back[i][j - low[i]]]
+        pi, pj = i - move[0], j - move[1]
+        if move[0] and move[1]:
+            confidence = max(0.0, 1.0 - _move_cost(move, h, v, i, j, match))
+        else:
+            confidence = 0.0
+        rows.append((list(range(pi, i)), list(range(pj, j)), round(confidence, 3)))
+        i, j = pi, pj
+
+    rows.reverse()
+    return rows
+
+
+def align_table(table, band=DEFAULT_BAND):
+    """
+    Căn chỉnh lại bảng của simple_filter.label_table (page, box, Hán, phiên âm).
+    Dùng index âm Hán-Việt mặc định (language_helper.get_reading_index) nếu đã được nạp.
+    :return: Tuple (aligned_table, confidences), confidences có một giá trị cho mỗi hàng.
+    """
+    if len(table) < 4:
+        return table, [1.0] * max((len(col) for col in table), default=0)
+
+    han_rows = [idx for idx, text in enumerate(table[2]) if text]
+    viet_lines = [text for text in table[3] if text]
+    han_lines = [table[2][idx] for idx in han_rows]
+
+    aligned = [[] for _ in table]
+    confidences = []
+    for han_ids, viet_ids, confidence in align_lines(han_lines, viet_lines, band=band, index=get_reading_index()):
+        if han_ids:
+            first = han_rows[han_ids[0]]
+            aligned[0].append(table[0][first])
+            aligned[1].append(table[1][first])
+        else:
+            aligned[0].append("")
+            aligned[1].append("")
+        aligned[2].append(" ".join(han_lines[idx] for idx in han_ids))
+        aligned[3].append(" ".join(viet_lines[idx] for idx in viet_ids))
+        for col in range(4, len(table)):
+            aligned[col].append("")
+        confidences.append(confidence)
+
+    return aligned, confidences
@@ -0,0 +1,163 @@
+"""
+Chạy bộ lọc Hán/phiên âm của align_GUI cho toàn bộ label mà không cần mở GUI.
+
+Usage:
+    python batch_align.py han.json phienam.json -o output.csv [--review review.json] [--workers 4]
+    python batch_align.py [han.json ...] --project book.project.sqlite -o output.csv
+
+Mỗi file JSON là một nguồn OCR (một cột, giống mỗi lần "Load JSON" trong align_GUI).
+Các label không có vấn đề được đánh dấu lưu sẵn, các label bị gắn cờ được để lại
+trong file review để kiểm tra bằng align_GUI ("Load Review").
+
+Với --project, các file JSON được thêm vào project (không có file JSON thì dùng các nguồn OCR đã có trong
+project), kết quả được ghi vào project cho các label chưa có ai sửa (label do lần chạy trước của batch_align ghi
+được ghi lại, vd: sau khi OCR lại) và CSV được xuất từ project.
+"""
+import os
+import json
+import time
+import argparse
+from multiprocessing import Pool, cpu_count
+from align_core import load_ocr_file, group_by_label, label_sort_key, filter_label, flag_table, write_csv
+
+
+def process_label(args):
+    """
+    Run the per-label filtering (and alignment) of populate_table.
+    :param args: Tuple (label_index, label_datas, align), label_datas has one record list per OCR source.
+    :return: Tuple (label_index, table, reasons, seconds).
+    """
+    label_index, label_datas, align = args
+    start = time.perf_counter()
+    try:
+        table, confidences = filter_label(label_datas, align=align)
+        reasons = flag_table(table, confidences)
+    except Exception as e:
+        table = []
+        reasons = [f"error: {e}"]
+    return label_index, table, reasons, time.perf_counter() - start
+
+
+def run_batch(json_files, output_csv, review_json=None, workers=None, align=True, dedupe_threshold=None,
+              project=None):
+    """
+    Filter every label of the given OCR sources in a process pool and export the results.
+    :param json_files: OCR JSON files, one per column source (same order as in align_GUI).
+    :param output_csv: CSV file for the labels that passed all checks.
+    :param review_json: Session file for align_GUI (all labels, flagged ones not marked for saving).
+    :param workers: Number of worker processes (default: cpu_count()).
+    :param align: Align Han and phien am rows with aligner.align_table.
+    :param dedupe_threshold: If set, collapse near-duplicate labels (dedupe.find_duplicates) in the CSV.
+    :param project: project_store.ProjectStore to read OCR sources from and write results to; labels already in
+        the project (edited by an annotator) are kept and the CSV is exported from the project.
+    :return: Dict {label_index: reasons} of flagged labels.
+    """
+    if project is not None:
+        for path in json_files:
+            project.add_ocr_records(os.path.basename(path), load_ocr_file(path))
+        names = [os.path.basename(path) for path in json_files] or project.ocr_sources()
+        sources = [group_by_label(project.ocr_records(name)) for name in names]
+    else:
+        sources = [group_by_label(load_ocr_file(path)) for path in json_files]
+    label_indices = sorted(set().union(*sources), key=label_sort_key)
+    tasks = [
+        (label_index, [source.get(label_index, []) for source in sources], align)
+        for label_index in label_indices
+    ]
+
+    print(f"Processing {len(tasks)} labels from {len(sources)} OCR source(s)...")
+    start = time.perf_counter()
+
+    results = {}
+    with Pool(processes=workers or cpu_count()) as pool:
+        for label_index, table, reasons, seconds in pool.imap_unordered(process_label, tasks):
+            results[label_index] = (table, reasons)
+            status = f"FLAGGED: {'; '.join(reasons)}" if reasons else "ok"
+            print(f"Label {label_index}: {len(table[0]) if table else 0} rows in {seconds * 1000:.1f} ms ({status})")
+
+    num_columns = max((len(table) for table, _ in results.values()), default=0)
+    column_names = [f"Label {i + 1}" for i in range(num_columns)]
+
+    edited_data = {}
+    flagged = {}
+    for label_index in label_indices:
+        table, reasons = results[label_index]
+        edited_data[label_index] = {"is_save": not reasons, "data": table}
+        if reasons:
+            flagged[label_index] = reasons
+
+    skip_labels = set()
+    if dedupe_threshold:
+        from dedupe import find_duplicates, duplicate_keys, table_entries
+
+        clusters = find_duplicates(table_entries(edited_data), threshold=dedupe_threshold, workers=workers)
+        skip_labels = duplicate_keys(clusters)
+        for cluster in clusters:
+            print(f"Duplicate labels: {', '.join(cluster)} (keeping {cluster[0]})")
+
+    if project is not None:
+        written = project.save_labels(edited_data, overwrite=False)
+        print(f"Wrote {written} labels to project '{project.path}' "
+              f"({len(edited_data) - written} already edited there were kept)")
+        column_names = project.get_meta("column_names") or column_names
+        project.set_meta("column_names", column_names)
+        project.export_csv(output_csv, column_names, skip_labels=skip_labels)
+    else:
+        write_csv(output_csv, column_names, edited_data, skip_labels=skip_labels)
+    if review_json:
+        with open(review_json, "w", encoding="utf-8") as file:
+            json.dump({
+                "column_names": column_names,
+                "flagged": flagged,
+                "edited_data": edited_data
+            }, file, ensure_ascii=False)
+
+    elapsed = time.perf_counter() - start
+    print(f"Done in {elapsed:.2f}s: {len(tasks) - len(flagged)} labels saved to '{output_csv}', "
+          f"{len(flagged)} flagged for review" + (f" in '{review_json}'." if review_json else "."))
+    return flagged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch Han/phien am extraction over OCR JSON files.")
+    parser.add_argument("json_files", nargs="*", help="OCR JSON files, one per column source.")
+    parser.add_argument("-o", "--output", default="output.csv", help="Output CSV file.")
+    parser.add_argument("--review", default=None,
+                        help="Review session file for align_GUI (default: <output>_review.json).")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes.")
+    parser.add_argument("--readings", default=None,
+                        help="Han-Viet reading table used to score alignment (compiled to an index once).")
+    parser.add_argument("--dedupe", type=float, default=None, metavar="THRESHOLD",
+                        help="Collapse near-duplicate labels with estimated Jaccard >= THRESHOLD.")
+    parser.add_argument("--no-align", action="store_true", help="Keep the padded rows instead of aligning them.")
+    parser.add_argument("--project", default=None,
+                        help="Project store (*.project.sqlite) shared with the GUIs: read/add OCR sources, write results.")
+    args = parser.parse_args()
+    if not args.json_files and not args.project:
+        parser.error("give OCR JSON files, a --project with OCR sources, or both")
+
+    if args.readings:
+        from language_helper import READING_TABLE_ENV, load_reading_index
+
+        # Biên dịch index một lần, các worker chỉ cần mmap file index
+        start = time.perf_counter()
+        index = load_reading_index(args.readings)
+        print(f"Loaded {len(index)} Han-Viet readings in {(time.perf_counter() - start) * 1000:.1f} ms")
+        os.environ[READING_TABLE_ENV] = args.readings
+
+    project = None
+    if args.project:
+        from project_store import ProjectStore, BATCH_EDITOR
+        project = ProjectStore(args.project, editor=BATCH_EDITOR)
+
+    review = args.review or os.path.splitext(args.output)[0] + "_review.json"
+    try:
+        run_batch(args.json_files, args.output, review_json=review, workers=args.workers, align=not args.no_align,
+                  dedupe_threshold=args.dedupe, project=project)
+    finally:
+        if project is not None:
+            project.close()
+
+
+if __name__ == "__main__":
+    main()
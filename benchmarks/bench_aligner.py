@@ -0,0 +1,95 @@
+"""
+Benchmark aligner.align_lines trên một ngữ liệu tổng hợp.
+
+Usage (từ thư mục gốc của repo):
+    python -m benchmarks.bench_aligner [--lines 100000] [--band 8]
+
+Sinh các cặp dòng Hán/phiên âm (5 hoặc 7 chữ), sau đó gộp/tách/xóa ngẫu nhiên một số dòng
+giống lỗi OCR, rồi đo thời gian căn chỉnh và tỉ lệ hàng được căn đúng so với đáp án.
+"""
+import time
+import random
+import argparse
+from aligner import align_lines
+
+SYLLABLES = ["thiên", "địa", "nhân", "hòa", "xuân", "thu", "nguyệt", "minh", "sơn", "thủy", "vân", "phong"]
+
+
+def synthetic_pairs(num_lines, seed=0, error_rate=0.05):
+    """
+    Sinh ngữ liệu tổng hợp.
+    :return: Tuple (han_lines, viet_lines, truth), truth là tập các cặp (han_ids, viet_ids) đúng.
+    """
+    rng = random.Random(seed)
+    han_lines, viet_lines, truth = [], [], set()
+    i = 0
+    while i < num_lines:
+        length = rng.choice((5, 7))
+        han = "".join(chr(rng.randint(0x4e00, 0x9fff)) for _ in range(length))
+        viet = " ".join(rng.choice(SYLLABLES) for _ in range(length)).capitalize()
+        error = rng.random()
+        if error < error_rate / 2 and han_lines:
+            # OCR gộp hai dòng phiên âm thành một
+            viet_lines[-1] = viet_lines[-1] + " " + viet
+            han_lines.append(han)
+            truth.discard(((len(han_lines) - 2,), (len(viet_lines) - 1,)))
+            truth.add(((len(han_lines) - 2, len(han_lines) - 1), (len(viet_lines) - 1,)))
+        elif error < error_rate:
+            # OCR bỏ sót một dòng Hán
+            viet_lines.append(viet)
+            truth.add(((), (len(viet_lines) - 1,)))
+        else:
+            han_lines.append(han)
+            viet_lines.append(viet)
+            truth.add(((len(han_lines) - 1,), (len(viet_lines) - 1,)))
+        i += 1
+    return han_lines, viet_lines, truth
+
+
+def run(num_lines, band, poem_lines=None):
+    """Align the synthetic corpus, either as one long text or as separate poems of poem_lines lines."""
+    if poem_lines:
+        poems = [synthetic_pairs(poem_lines, seed=seed) for seed in range(num_lines // poem_lines)]
+    else:
+        poems = [synthetic_pairs(num_lines)]
+
+    start = time.perf_counter()
+    aligned = [align_lines(han_lines, viet_lines, band=band) for han_lines, viet_lines, _ in poems]
+    elapsed = time.perf_counter() - start
+
+    total_lines = sum(len(han_lines) + len(viet_lines) for han_lines, viet_lines, _ in poems)
+    total_rows = sum(len(rows) for rows in aligned)
+    correct = sum(
+        1
+        for rows, (_, _, truth) in zip(aligned, poems)
+        for han_ids, viet_ids, _ in rows
+        if (tuple(han_ids), tuple(viet_ids)) in truth
+    )
+    return {
+        "lines": total_lines,
+        "rows": total_rows,
+        "seconds": elapsed,
+        "lines_per_second": total_lines / elapsed if elapsed else float("inf"),
+        "row_accuracy": correct / total_rows if total_rows else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the banded DP aligner.")
+    parser.add_argument("--lines", type=int, default=100000, help="Number of synthetic lines.")
+    parser.add_argument("--band", type=int, default=8, help="Band half-width.")
+    args = parser.parse_args()
+
+    # Kiểm tra chi phí gần tuyến tính: thời gian mỗi dòng gần như không đổi theo kích thước
+    for size in (args.lines // 100, args.lines // 10, args.lines):
+        result = run(size, args.band)
+        print(f"{size:>8} lines (one text): {result['seconds']:.2f}s, "
+              f"{result['lines_per_second']:.0f} lines/s, row accuracy {result['row_accuracy']:.3f}")
+
+    result = run(args.lines, args.band, poem_lines=8)
+    print(f"{args.lines:>8} lines (8-line poems): {result['seconds']:.2f}s, "
+          f"{result['lines_per_second']:.0f} lines/s, row accuracy {result['row_accuracy']:.3f}")
+
+
+if __name__ == "__main__":
+    main()
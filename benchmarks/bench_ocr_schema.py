@@ -0,0 +1,71 @@
+"""
+So sánh dung lượng file và thời gian đọc giữa schema OCR đầy đủ và schema slim (ocr_schema.py).
+
+Usage (từ thư mục gốc của repo):
+    python -m benchmarks.bench_ocr_schema [--input ocr_results.json] [--labels 500] [--repeat 5]
+
+Mặc định đo trên demo.json và một cuốn sách tổng hợp (benchmarks.synthetic_ocr, có dữ liệu từng từ như Azure).
+"Load + filter" là json.loads rồi chạy simple_filter.label_table cho mọi label như align_GUI.
+"""
+import time
+import json
+import argparse
+from align_core import group_by_label
+from simple_filter import label_table
+from ocr_schema import slim_records
+from benchmarks.synthetic_ocr import generate_records
+
+
+def best_time(func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def load_and_filter(text):
+    for label_datas in group_by_label(json.loads(text)).values():
+        label_table([label_datas])
+
+
+def report(name, records, repeat):
+    variants = [
+        ("full (indent=2)", json.dumps(records, ensure_ascii=False, indent=2)),
+        ("full (compact)", json.dumps(records, ensure_ascii=False, separators=(",", ":"))),
+        ("slim + words", json.dumps(slim_records(records, words=True), ensure_ascii=False, separators=(",", ":"))),
+        ("slim", json.dumps(slim_records(records), ensure_ascii=False, separators=(",", ":"))),
+    ]
+    base_size = len(variants[0][1].encode("utf-8"))
+    base_parse = base_filter = None
+    print(f"\n{name}: {len(records)} records, {sum(len(r['result']['lines']) for r in records)} lines")
+    print(f"{'schema':<18}{'size':>12}{'ratio':>8}{'json.loads':>14}{'load + filter':>16}")
+    for variant, text in variants:
+        size = len(text.encode("utf-8"))
+        parse = best_time(lambda: json.loads(text), repeat)
+        filtered = best_time(lambda: load_and_filter(text), repeat)
+        base_parse = base_parse or parse
+        base_filter = base_filter or filtered
+        print(f"{variant:<18}{size / 1024:>9.1f} KB{size / base_size:>7.2f}x"
+              f"{parse * 1000:>10.2f} ms{filtered * 1000:>12.1f} ms"
+              f"  ({base_parse / parse:.1f}x / {base_filter / filtered:.1f}x faster)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare full and slim OCR schema size and parse time.")
+    parser.add_argument("--input", default=None, help="OCR JSON file (default: demo.json + synthetic book).")
+    parser.add_argument("--labels", type=int, default=500, help="Labels in the synthetic book.")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    inputs = [args.input] if args.input else ["demo.json"]
+    for path in inputs:
+        with open(path, "r", encoding="utf-8") as file:
+            report(path, json.load(file), args.repeat)
+    if not args.input:
+        report(f"synthetic book ({args.labels} labels)", generate_records(args.labels), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
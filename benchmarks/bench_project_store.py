@@ -0,0 +1,69 @@
+"""
+So sánh chi phí lưu một chỉnh sửa giữa ghi lại cả file CSV (align_core.write_csv) và upsert một hàng vào project
+store (project_store.py), và thời gian xuất CSV từ project.
+
+Usage (từ thư mục gốc của repo):
+    python -m benchmarks.bench_project_store [--labels 2000] [--edits 200]
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+from align_core import write_csv
+from project_store import ProjectStore
+
+
+def synthetic_tables(num_labels, rows=12, columns=3, seed=0):
+    rng = random.Random(seed)
+    return {
+        str(label_index): {
+            "is_save": True,
+            "data": [["".join(chr(rng.randint(0x4E00, 0x9FFF)) for _ in range(7)) for _ in range(rows)]
+                     for _ in range(columns)]
+        }
+        for label_index in range(1, num_labels + 1)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-edit save cost: full CSV rewrite vs project store upsert.")
+    parser.add_argument("--labels", type=int, default=2000)
+    parser.add_argument("--edits", type=int, default=200)
+    args = parser.parse_args()
+
+    edited_data = synthetic_tables(args.labels)
+    column_names = ["Han", "Phien am", "Dich nghia"]
+    rng = random.Random(1)
+    edits = [(str(rng.randint(1, args.labels)), rng.randrange(12), rng.randrange(3)) for _ in range(args.edits)]
+
+    with tempfile.TemporaryDirectory() as folder:
+        csv_path = os.path.join(folder, "output.csv")
+        start = time.perf_counter()
+        for label_index, row, col in edits:
+            edited_data[label_index]["data"][col][row] += "x"
+            write_csv(csv_path, column_names, edited_data)
+        rewrite = (time.perf_counter() - start) / len(edits)
+
+        store = ProjectStore(os.path.join(folder, "book.project.sqlite"))
+        store.save_labels(edited_data)
+        start = time.perf_counter()
+        for label_index, row, col in edits:
+            columns = edited_data[label_index]["data"]
+            columns[col][row] += "y"
+            store.save_label(label_index, columns, True, rows=[row])
+        upsert = (time.perf_counter() - start) / len(edits)
+
+        start = time.perf_counter()
+        count = store.export_csv(csv_path, column_names)
+        export = time.perf_counter() - start
+        store.close()
+
+    print(f"{args.labels} labels, {args.edits} single-cell edits")
+    print(f"  rewrite CSV per edit:   {rewrite * 1000:8.2f} ms")
+    print(f"  project upsert per edit:{upsert * 1000:8.2f} ms  ({rewrite / upsert:.0f}x faster)")
+    print(f"  project CSV export:     {export * 1000:8.2f} ms ({count} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Đo chi phí khởi động và độ trễ tra cứu của index âm Hán-Việt.
+
+Usage (từ thư mục gốc của repo):
+    python -m benchmarks.bench_reading_index [--table han_viet.txt] [--pairs 10000]
+
+Nếu không truyền bảng, một bảng tổng hợp phủ toàn bộ khối CJK (U+4E00-U+9FFF) sẽ được sinh ra.
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+import tracemalloc
+from language_helper import (
+    _parse_reading_table, build_reading_index, ReadingIndex, reading_match_score, reading_match_scores
+)
+
+SYLLABLES = ["thiên", "địa", "nhân", "hòa", "xuân", "thu", "nguyệt", "minh", "sơn", "thủy", "vân", "phong",
+             "quang", "sương", "hương", "cố", "đầu", "vọng", "tiền", "sàng"]
+
+
+def synthetic_table(path, seed=0):
+    """Sinh bảng âm Hán-Việt tổng hợp, mỗi chữ có 1-3 âm."""
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as file:
+        for codepoint in range(0x4e00, 0xa000):
+            readings = rng.sample(SYLLABLES, rng.randint(1, 3))
+            file.write(f"{chr(codepoint)}\t{','.join(readings)}\n")
+
+
+def measure(func):
+    """Chạy func, trả về (kết quả, giây, bytes cấp phát đỉnh)."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Han-Viet reading index.")
+    parser.add_argument("--table", default=None, help="Reading table (default: synthetic).")
+    parser.add_argument("--pairs", type=int, default=10000, help="Number of line pairs to score.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        table_path = args.table or os.path.join(tmp_dir, "han_viet.txt")
+        if not args.table:
+            synthetic_table(table_path)
+        index_path = os.path.join(tmp_dir, "han_viet.hvidx")
+
+        readings, dict_seconds, dict_peak = measure(lambda: _parse_reading_table(table_path))
+        _, build_seconds, _ = measure(lambda: build_reading_index(table_path, index_path))
+        index, open_seconds, open_peak = measure(lambda: ReadingIndex(index_path))
+
+        print(f"Entries: {len(readings)}, index file {os.path.getsize(index_path) / 1024:.0f} KiB")
+        print(f"Parse table into dict: {dict_seconds * 1000:.1f} ms, {dict_peak / 1024:.0f} KiB allocated")
+        print(f"Build index (once):    {build_seconds * 1000:.1f} ms")
+        print(f"Open index (startup):  {open_seconds * 1000:.3f} ms, {open_peak / 1024:.0f} KiB allocated")
+
+        rng = random.Random(1)
+        pairs = []
+        for _ in range(args.pairs):
+            han = [chr(rng.randint(0x4e00, 0x9fff)) for _ in range(rng.choice((5, 7)))]
+            viet = [rng.choice(sorted(readings[ord(char)])) for char in han]
+            pairs.append(("".join(han), " ".join(viet).capitalize() + ","))
+
+        start = time.perf_counter()
+        for han_line, viet_line in pairs:
+            reading_match_score(han_line, viet_line, index=index)
+        single_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        scores = reading_match_scores(pairs, index=index)
+        batch_seconds = time.perf_counter() - start
+
+        print(f"reading_match_score:  {single_seconds / len(pairs) * 1e6:.1f} us/line")
+        print(f"reading_match_scores: {batch_seconds / len(pairs) * 1e6:.1f} us/line "
+              f"(mean score {sum(scores) / len(scores):.1f})")
+        index.close()
+
+
+if __name__ == "__main__":
+    main()
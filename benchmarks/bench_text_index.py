@@ -0,0 +1,64 @@
+"""
+Thời gian dựng inverted index (text_index.py) và thời gian tìm kiếm trên một corpus OCR tổng hợp.
+
+Usage (từ thư mục gốc của repo):
+    python -m benchmarks.bench_text_index [--lines 1000000] [--queries 200]
+
+Corpus được sinh bằng benchmarks.synthetic_ocr.page_lines (chỉ text, không có polygon). Query là các dòng
+lấy ngẫu nhiên trong corpus: nguyên dòng, bỏ dấu, hoặc bị sửa một chữ như lỗi OCR.
+"""
+import time
+import random
+import argparse
+from text_index import TextIndex, fold_syllables
+from benchmarks.synthetic_ocr import page_lines
+
+
+def mutate(rng, text):
+    """Thay một ký tự (không phải khoảng trắng) như một lỗi OCR."""
+    positions = [i for i, char in enumerate(text) if not char.isspace()]
+    position = rng.choice(positions)
+    replacement = chr(rng.randint(0x4e00, 0x9fff)) if ord(text[position]) >= 0x4e00 else "x"
+    return text[:position] + replacement + text[position + 1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and query time of the OCR text index.")
+    parser.add_argument("--lines", type=int, default=1000000)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pages = []
+    num_lines = 0
+    while num_lines < args.lines:
+        lines = page_lines(rng, len(pages))
+        pages.append(lines)
+        num_lines += len(lines)
+
+    index = TextIndex()
+    start = time.perf_counter()
+    for page_index, lines in enumerate(pages):
+        index.add_page("synthetic", page_index // 2 + 1, page_index, lines)
+    build = time.perf_counter() - start
+    print(f"{num_lines} lines ({len(pages)} pages) indexed in {build:.1f} s "
+          f"({num_lines / build / 1000:.0f}k lines/s)")
+
+    samples = [rng.choice(rng.choice(pages)[2:-1]) for _ in range(args.queries)]
+    for name, queries in [("exact line", samples),
+                          ("no diacritics", [fold_syllables(text) or text for text in samples]),
+                          ("one OCR error", [mutate(rng, text) for text in samples])]:
+        times = []
+        found = 0
+        for query, expected in zip(queries, samples):
+            start = time.perf_counter()
+            hits = index.search(query)
+            times.append(time.perf_counter() - start)
+            found += any(hit[3] == expected for hit in hits)
+        times.sort()
+        print(f"  {name:<14} p50 {times[len(times) // 2] * 1000:7.2f} ms  p95 {times[int(len(times) * 0.95)] * 1000:7.2f} ms"
+              f"  ({found}/{len(queries)} found the source line)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Kiểm tra sai khác giữa language_helper.clean_sentence và bản cài đặt gốc (nhiều lần re.sub tuần tự) giữ lại
+trong file này làm chuẩn.
+
+Usage (từ thư mục gốc của repo):
+    python -m benchmarks.check_clean_sentence [--labels 300] [--random 200000] [--seed 0]
+
+So sánh trên các dòng của corpus tổng hợp, một bộ trường hợp biên viết tay và các chuỗi ngẫu nhiên ghép từ
+những ký tự "khó" (khoảng trắng Unicode, chữ số không phải ASCII, dấu câu, ngoặc, chữ tổ hợp chưa NFC).
+Đồng thời kiểm tra clean_sentences (tuần tự và qua process pool) trả về đúng thứ tự.
+Script thất bại (exit code 1) nếu có bất kỳ kết quả nào khác bản gốc.
+"""
+import re
+import sys
+import random
+import argparse
+from unicodedata import normalize
+from benchmarks.synthetic_ocr import generate_records
+
+EDGE_CASES = [
+    "", " ", "   ", "\t\n", "123", " 1 2 3 ", "a - b", "a  -  b", "a -b", "a- b", "- -", " - ", "a - - b",
+    "a , b", "a ,b", "a , , b", "x .", "x ?", "x !", "x ' y", "a -, b", "a - ,b", "a ' - b", "a-", "-a",
+    "(a)", "( a )", "()", "( )", "(1)", "((a)", 'a "b', '"a" "b"', '" "', "a ( ) b", "Phiên âm : 12 ,3",
+    "thu\u0309y", "Nguye\u0302\u0303n", "a\u00a0-\u00a0b", "a\u3000,b", "a\x1c-\x1fb", "a\u200b,b",
+    "\u0661\u0662 a \u0663 ,", "a\u2028-\u2029b", "\u0660 - \u0661", "天 地 , 人", "Trần Lô (1930 - 2000)",
+    "- a -", "a -- b", "a - 1 - b", "a 1 , b", "a 1- b", "' a '", "a ''", "' '",
+]
+ALPHABET = ["a", "b", "đ", "ê", "天", " ", "  ", "\t", "\n", "\u00a0", "\u2003", "\u3000", "\x1c", "\u200b",
+            "1", "9", "\u0663", "\uff11", ",", ".", "?", "!", "'", "-", "(", ")", '"', "e\u0301", "o\u0302", ":"]
+
+
+def clean_sentence_reference(sentence):
+    """Bản clean_sentence gốc, giữ nguyên từng bước."""
+    try:
+        sentence = normalize('NFC', sentence)
+        sentence = re.sub(r'\d+', '', sentence)
+        sentence = re.sub(r'\s+', ' ', sentence)
+        sentence = sentence.strip()
+        punctuation_fixes = [
+            (r'\s,', ','), (r'\s\.', '.'), (r'\s\?', '?'), (r'\s!', '!'),
+            (r"\s'", "'"), (r'\s-', '-'), (r'-\s', '-')
+        ]
+        for pattern, replacement in punctuation_fixes:
+            sentence = re.sub(pattern, replacement, sentence)
+        if sentence.count('(') != sentence.count(')') or sentence.count('"') % 2 != 0:
+            sentence = sentence.replace('(', '').replace(')', '').replace('"', '')
+        sentence = sentence.replace("()", "")
+        return sentence.strip()
+    except Exception as e:
+        print(f"Error in clean_sentence: {e}")
+        return sentence
+
+
+def random_sentences(count, seed=0, max_length=24):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_length))) for _ in range(count)]
+
+
+def main():
+    from language_helper import clean_sentence, clean_sentences, PARALLEL_MIN_SENTENCES
+
+    parser = argparse.ArgumentParser(description="Differential check of clean_sentence against the original.")
+    parser.add_argument("--labels", type=int, default=300, help="Number of synthetic labels.")
+    parser.add_argument("--random", type=int, default=200000, help="Number of random strings.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    records = generate_records(args.labels, seed=args.seed)
+    corpus = [line["text"] for record in records for line in record["result"]["lines"]]
+    sentences = EDGE_CASES + corpus + random_sentences(args.random, seed=args.seed)
+
+    mismatches = []
+    for sentence in sentences:
+        expected, actual = clean_sentence_reference(sentence), clean_sentence(sentence)
+        if expected != actual:
+            mismatches.append((sentence, expected, actual))
+    for sentence, expected, actual in mismatches[:20]:
+        print(f"MISMATCH {sentence!r}: expected {expected!r}, got {actual!r}")
+
+    expected = [clean_sentence_reference(sentence) for sentence in sentences]
+    batch_ok = clean_sentences(sentences) == expected
+    parallel_input = (sentences * (PARALLEL_MIN_SENTENCES // len(sentences) + 1))[:PARALLEL_MIN_SENTENCES]
+    parallel_ok = clean_sentences(parallel_input, workers=2) == [
+        clean_sentence_reference(sentence) for sentence in parallel_input]
+    print(f"{len(sentences)} sentences ({len(EDGE_CASES)} edge cases, {len(corpus)} corpus lines, "
+          f"{args.random} random): {len(mismatches)} mismatches; "
+          f"clean_sentences: {'ok' if batch_ok else 'FAIL'}, parallel: {'ok' if parallel_ok else 'FAIL'}")
+    if mismatches or not batch_ok or not parallel_ok:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
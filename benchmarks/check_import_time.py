@@ -0,0 +1,61 @@
+"""
+Kiểm tra ngân sách thời gian import của các module không phụ thuộc GUI.
+
+Usage (từ thư mục gốc của repo):
+    python -m benchmarks.check_import_time [--budget-ms 150]
+
+Mỗi module được import trong một interpreter mới với `-X importtime`. Script thất bại (exit code 1)
+nếu thời gian import tích lũy vượt ngân sách, hoặc nếu module kéo theo PyQt5 / fuzzywuzzy
+(các module này phải được import lazy để worker của multiprocessing khởi động nhanh).
+"""
+import sys
+import argparse
+import subprocess
+
+CORE_MODULES = ["align_core", "simple_filter", "language_helper", "aligner", "dedupe", "batch_align"]
+FORBIDDEN_PREFIXES = ("PyQt5", "fuzzywuzzy")
+DEFAULT_BUDGET_MS = 150
+
+
+def import_time_ms(module):
+    """
+    Import module trong một interpreter mới.
+    :return: Tuple (thời gian import tích lũy tính bằng ms, list các module bị cấm đã được import).
+    """
+    code = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in sys.modules if m.split('.')[0] in {FORBIDDEN_PREFIXES!r}))"
+    )
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            capture_output=True, text=True, check=True)
+    cumulative_us = 0
+    for line in result.stderr.splitlines():
+        parts = [part.strip() for part in line.split("|")]
+        if len(parts) == 3 and parts[2] == module:
+            cumulative_us = int(parts[1])
+    forbidden = [name for name in result.stdout.strip().split(",") if name]
+    return cumulative_us / 1000, forbidden
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the import-time budget of the Qt-free modules.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Budget per module (ms).")
+    args = parser.parse_args()
+
+    failed = False
+    for module in CORE_MODULES:
+        elapsed, forbidden = import_time_ms(module)
+        status = "ok"
+        if elapsed > args.budget_ms:
+            status = f"OVER BUDGET ({args.budget_ms:.0f} ms)"
+            failed = True
+        if forbidden:
+            status = f"imports {', '.join(sorted(forbidden))}"
+            failed = True
+        print(f"{module:<18} {elapsed:>8.1f} ms  {status}")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Bộ benchmark cho language_helper, simple_filter, phần gom label của align_GUI và pdf_to_png.
+
+Usage (từ thư mục gốc của repo):
+    python -m benchmarks.run_benchmarks [--labels 500] [--repeat 3] [-o benchmark_results.json]
+                                        [--only clean_sentence,simple_chinese] [--compare old.json]
+
+Kết quả (thời gian tốt nhất trong các lần lặp, số thao tác, micro giây mỗi thao tác) được lưu ra JSON
+để so sánh giữa các lần chạy bằng --compare.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import contextlib
+from datetime import datetime
+from benchmarks.synthetic_ocr import generate_records, generate_pdf
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Đăng ký một benchmark; hàm nhận corpus và trả về số thao tác đã thực hiện."""
+    def register(func):
+        BENCHMARKS[name] = func
+        return func
+    return register
+
+
+def build_corpus(num_labels, pages_per_label=2, seed=0):
+    from align_core import group_by_label
+
+    records = generate_records(num_labels, pages_per_label=pages_per_label, seed=seed)
+    return {
+        "records": records,
+        "lines": [line["text"] for record in records for line in record["result"]["lines"]],
+        "labels": group_by_label(records)
+    }
+
+
+@benchmark("percentage_similarity")
+def bench_percentage_similarity(corpus):
+    from language_helper import percentage_similarity
+    for text in corpus["lines"]:
+        percentage_similarity(text, "phien am")
+    return len(corpus["lines"])
+
+
+@benchmark("percentage_chinese")
+def bench_percentage_chinese(corpus):
+    from language_helper import percentage_chinese
+    for text in corpus["lines"]:
+        percentage_chinese(text)
+    return len(corpus["lines"])
+
+
+@benchmark("percentage_vietnamese")
+def bench_percentage_vietnamese(corpus):
+    from language_helper import percentage_vietnamese
+    for text in corpus["lines"]:
+        percentage_vietnamese(text)
+    return len(corpus["lines"])
+
+
+@benchmark("clean_sentence")
+def bench_clean_sentence(corpus):
+    from language_helper import clean_sentence
+    for text in corpus["lines"]:
+        clean_sentence(text)
+    return len(corpus["lines"])
+
+
+@benchmark("clean_sentences")
+def bench_clean_sentences(corpus):
+    from language_helper import clean_sentences
+    clean_sentences(corpus["lines"])
+    return len(corpus["lines"])
+
+
+def _bench_filter(corpus, filter_function):
+    for data in corpus["labels"].values():
+        filter_function(data)
+    return len(corpus["labels"])
+
+
+@benchmark("filter.only_text")
+def bench_only_text(corpus):
+    from simple_filter import only_text
+    return _bench_filter(corpus, only_text)
+
+
+@benchmark("filter.simple")
+def bench_simple(corpus):
+    from simple_filter import simple
+    return _bench_filter(corpus, simple)
+
+
+@benchmark("filter.simple_chinese")
+def bench_simple_chinese(corpus):
+    from simple_filter import simple_chinese
+    return _bench_filter(corpus, simple_chinese)
+
+
+@benchmark("filter.only_phien_am")
+def bench_only_phien_am(corpus):
+    from simple_filter import only_phien_am
+    # Cùng tham số mặc định như populate_table khi chưa có cột chữ Hán
+    return _bench_filter(corpus, lambda data: only_phien_am(data, med=float("inf"), leng=float("inf")))
+
+
+@benchmark("label_grouping.scan")
+def bench_label_grouping_scan(corpus):
+    # Cách populate_table tìm record của label hiện tại: duyệt toàn bộ dữ liệu mỗi lần chuyển label
+    records = corpus["records"]
+    for label_index in corpus["labels"]:
+        [item for item in records if str(item["label_index"]) == str(label_index)]
+    return len(corpus["labels"])
+
+
+@benchmark("label_grouping.index")
+def bench_label_grouping_index(corpus):
+    from align_core import group_by_label
+    groups = group_by_label(corpus["records"])
+    for label_index in corpus["labels"]:
+        groups.get(label_index, [])
+    return len(corpus["labels"])
+
+
+@benchmark("label_table")
+def bench_label_table(corpus):
+    from simple_filter import label_table
+    for data in corpus["labels"].values():
+        label_table([data, data])
+    return len(corpus["labels"])
+
+
+@benchmark("align_table")
+def bench_align_table(corpus):
+    from simple_filter import label_table
+    from aligner import align_table
+    tables = [label_table([data, data]) for data in corpus["labels"].values()]
+    start = time.perf_counter()
+    for table in tables:
+        align_table(table)
+    # Chỉ tính thời gian căn chỉnh, không tính lọc
+    corpus["_elapsed"] = time.perf_counter() - start
+    return len(tables)
+
+
+@benchmark("pdf_to_images_parallel")
+def bench_pdf_to_images(corpus):
+    from pdf_to_png import pdf_to_images_parallel
+
+    num_pages = corpus["pdf_pages"]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        pdf_path = os.path.join(tmp_dir, "synthetic.pdf")
+        generate_pdf(pdf_path, num_pages)
+        start = time.perf_counter()
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            pdf_to_images_parallel(pdf_path, output_folder=os.path.join(tmp_dir, "IMAGE"), dpi=corpus["pdf_dpi"])
+        corpus["_elapsed"] = time.perf_counter() - start
+    return num_pages
+
+
+def run_benchmarks(corpus, names, repeat=3):
+    """Chạy các benchmark, mỗi cái lặp `repeat` lần và giữ thời gian tốt nhất."""
+    results = {}
+    for name in names:
+        timings = []
+        try:
+            for _ in range(repeat):
+                corpus.pop("_elapsed", None)
+                start = time.perf_counter()
+                ops = BENCHMARKS[name](corpus)
+                timings.append(corpus.pop("_elapsed", time.perf_counter() - start))
+        except Exception as e:
+            results[name] = {"error": f"{type(e).__name__}: {e}"}
+            print(f"{name:<28} ERROR {results[name]['error']}")
+            continue
+
+        best = min(timings)
+        results[name] = {
+            "seconds": best,
+            "mean_seconds": sum(timings) / len(timings),
+            "ops": ops,
+            "us_per_op": best / ops * 1e6 if ops else None
+        }
+        print(f"{name:<28} {best * 1000:>10.1f} ms  {results[name]['us_per_op']:>10.1f} us/op  ({ops} ops)")
+    return results
+
+
+def compare(results, baseline_path):
+    """In tỉ lệ thời gian so với một file kết quả cũ (< 1 là nhanh hơn)."""
+    with open(baseline_path, "r", encoding="utf-8") as file:
+        baseline = json.load(file)["results"]
+    print(f"\nCompared with '{baseline_path}':")
+    for name, result in results.items():
+        old = baseline.get(name, {})
+        if "us_per_op" in result and old.get("us_per_op"):
+            ratio = result["us_per_op"] / old["us_per_op"]
+            print(f"{name:<28} {ratio:>6.2f}x {'faster' if ratio < 1 else 'slower'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the NLP_minitools benchmark suite.")
+    parser.add_argument("--labels", type=int, default=500, help="Number of synthetic labels.")
+    parser.add_argument("--pages", type=int, default=2, help="Pages per label.")
+    parser.add_argument("--pdf-pages", type=int, default=20, help="Pages of the generated PDF.")
+    parser.add_argument("--pdf-dpi", type=int, default=150, help="DPI for pdf_to_images_parallel.")
+    parser.add_argument("--repeat", type=int, default=3, help="Repetitions per benchmark (best is kept).")
+    parser.add_argument("--only", default=None, help="Comma separated benchmark names.")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="Output JSON file.")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to compare with.")
+    args = parser.parse_args()
+
+    names = args.only.split(",") if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}. Available: {', '.join(BENCHMARKS)}")
+
+    corpus = build_corpus(args.labels, pages_per_label=args.pages)
+    corpus["pdf_pages"] = args.pdf_pages
+    corpus["pdf_dpi"] = args.pdf_dpi
+    print(f"Corpus: {len(corpus['records'])} records, {len(corpus['lines'])} lines, {len(corpus['labels'])} labels\n")
+
+    results = run_benchmarks(corpus, names, repeat=args.repeat)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump({
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "params": {"labels": args.labels, "pages": args.pages, "pdf_pages": args.pdf_pages,
+                       "pdf_dpi": args.pdf_dpi, "repeat": args.repeat},
+            "results": results
+        }, file, indent=2)
+    print(f"\nSaved results to '{args.output}'.")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Sinh dữ liệu OCR tổng hợp theo cấu trúc trong `demo_json.png` để benchmark.
+
+Usage (từ thư mục gốc của repo):
+    python -m benchmarks.synthetic_ocr --labels 1000 -o synthetic.json [--pdf synthetic.pdf]
+
+Mỗi label gồm một số trang; mỗi trang có tiêu đề viết hoa, năm sinh/mất, dòng chữ Hán,
+phần "Phiên âm", phần "Dịch nghĩa" và số trang, giống một trang sách ngữ liệu thực tế.
+"""
+import json
+import random
+import argparse
+
+SYLLABLES = ["thiên", "địa", "nhân", "hòa", "xuân", "thu", "nguyệt", "minh", "sơn", "thủy", "vân", "phong",
+             "quang", "sương", "hương", "cố", "đầu", "vọng", "tiền", "sàng", "giang", "hoa", "lạc", "tâm"]
+WORDS = ["trăng", "sáng", "trước", "giường", "ngỡ", "là", "sương", "trên", "mặt", "đất", "ngẩng", "đầu",
+         "nhìn", "cúi", "nhớ", "quê", "nhà", "người", "xưa", "đi", "về", "núi", "sông", "mây", "gió"]
+NAMES = ["TRẦN LÔ", "NGUYỄN TRÃI", "LÊ THÁNH TÔNG", "NGUYỄN BỈNH KHIÊM", "PHÙNG KHẮC KHOAN"]
+LINE_HEIGHT = 60
+PAGE_WIDTH = 2000
+
+
+def _polygon(x, y, width, height):
+    return [[x, y], [x + width, y], [x + width, y + height], [x, y + height]]
+
+
+def _line(rng, text, y):
+    """Tạo một dòng OCR kèm word-level polygon và confidence như kết quả Azure."""
+    words = []
+    x = 300
+    for word in text.split():
+        width = 40 * len(word)
+        words.append({
+            "text": word,
+            "boundingPolygon": _polygon(x, y, width, LINE_HEIGHT - 10),
+            "confidence": round(rng.uniform(0.4, 1.0), 3)
+        })
+        x += width + 20
+    return {
+        "text": text,
+        "boundingPolygon": _polygon(300, y, max(x - 320, 40), LINE_HEIGHT - 10),
+        "words": words
+    }
+
+
+def _han_line(rng, length):
+    return "".join(chr(rng.randint(0x4e00, 0x9fff)) for _ in range(length))
+
+
+def _viet_line(rng, vocabulary, length):
+    return " ".join(rng.choice(vocabulary) for _ in range(length)).capitalize() + rng.choice([",", ".", ""])
+
+
+def page_lines(rng, page_index, poem_lines=4):
+    """Các dòng text của một trang: tiêu đề, chú thích, chữ Hán, phiên âm, dịch nghĩa và số trang."""
+    length = rng.choice((5, 7))
+    birth = rng.randint(1300, 1800)
+    lines = [rng.choice(NAMES), f"({birth}-{birth + rng.randint(30, 80)})"]
+    lines += [_han_line(rng, length) for _ in range(poem_lines)]
+    lines.append("Phiên âm")
+    lines += [_viet_line(rng, SYLLABLES, length) for _ in range(poem_lines)]
+    lines.append("Dịch nghĩa")
+    lines += [_viet_line(rng, WORDS, rng.randint(8, 16)) for _ in range(poem_lines)]
+    lines.append(str(page_index))
+    return lines
+
+
+def generate_records(num_labels, pages_per_label=2, label_name="ORI", seed=0):
+    """
+    Sinh list các record OCR (image_name, label_name, page_index, label_index, result.lines).
+    """
+    rng = random.Random(seed)
+    records = []
+    page_index = 0
+    for label_index in range(1, num_labels + 1):
+        for _ in range(pages_per_label):
+            lines = [_line(rng, text, 200 + row * LINE_HEIGHT) for row, text in enumerate(page_lines(rng, page_index))]
+            records.append({
+                "image_name": f"{label_name}_{label_index}_{page_index}",
+                "label_name": label_name,
+                "page_index": str(page_index),
+                "label_index": str(label_index),
+                "result": {"lines": lines}
+            })
+            page_index += 1
+    return records
+
+
+def generate_pdf(pdf_path, num_pages, seed=0):
+    """
+    Sinh file PDF gồm num_pages trang chữ (cần PyMuPDF), dùng để benchmark pdf_to_png.
+    """
+    import fitz  # PyMuPDF
+
+    rng = random.Random(seed)
+    document = fitz.open()
+    for page_index in range(num_pages):
+        page = document.new_page()
+        y = 72
+        for text in page_lines(rng, page_index):
+            # Font mặc định không có chữ Hán/tiếng Việt, chỉ cần nội dung để render
+            page.insert_text((72, y), text.encode("ascii", "replace").decode("ascii"), fontsize=11)
+            y += 20
+    document.save(pdf_path)
+    document.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic OCR JSON (and optionally a PDF).")
+    parser.add_argument("--labels", type=int, default=1000, help="Number of labels.")
+    parser.add_argument("--pages", type=int, default=2, help="Pages per label.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed.")
+    parser.add_argument("-o", "--output", default="synthetic.json", help="Output JSON file.")
+    parser.add_argument("--pdf", default=None, help="Also write a PDF with the same number of pages.")
+    args = parser.parse_args()
+
+    records = generate_records(args.labels, pages_per_label=args.pages, seed=args.seed)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(records, file, ensure_ascii=False, indent=2)
+    print(f"Saved {len(records)} records ({args.labels} labels) to '{args.output}'.")
+
+    if args.pdf:
+        generate_pdf(args.pdf, len(records), seed=args.seed)
+        print(f"Saved {len(records)} pages to '{args.pdf}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Tìm các bài thơ trùng lặp (gần giống nhau) giữa các label bằng MinHash và LSH banding.
+
+Usage:
+    python dedupe.py output1.csv output2.csv ... -o clusters.json [--threshold 0.8]
+
+Mỗi label được biểu diễn bởi text Hán và phiên âm đã làm sạch (clean_sentence), cắt thành các shingle
+ký tự. Chữ ký MinHash được chia thành các band; hai label chỉ được so sánh khi trùng ít nhất một band
+nên chi phí gần tuyến tính theo số label thay vì O(n^2).
+"""
+import os
+import re
+import json
+import hashlib
+import argparse
+from operator import eq
+from multiprocessing import Pool, cpu_count
+from language_helper import clean_sentence
+
+NUM_PERM = 128
+BANDS = 16
+SHINGLE_SIZE = 3
+MAX_HASH = (1 << 32) - 1
+DENSIFY_OFFSET = 0x9E3779B1
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    """
+    Cắt text đã làm sạch thành tập các shingle ký tự (bỏ khoảng trắng và dấu câu).
+    """
+    text = re.sub(r'[\W_]+', '', clean_sentence(text).lower())
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+class MinHasher:
+    """
+    Tạo chữ ký MinHash theo kiểu one-permutation hashing: mỗi shingle chỉ được băm một lần, hash được
+    chia vào NUM_PERM bin và giữ giá trị nhỏ nhất mỗi bin; bin rỗng được lấp bằng bin không rỗng kế tiếp
+    (densification) để các chữ ký vẫn so sánh được theo từng vị trí.
+    """
+    def __init__(self, num_perm=NUM_PERM, seed=1, cache_size=1 << 20):
+        self.num_perm = num_perm
+        self.salt = str(seed).encode("utf-8")
+        self.cache_size = cache_size
+        self._cache = {}
+
+    def shingle_hash(self, shingle):
+        """Hash 64-bit của một shingle (được cache vì shingle lặp lại rất nhiều giữa các label)."""
+        value = self._cache.get(shingle)
+        if value is None:
+            digest = hashlib.blake2b(shingle.encode("utf-8"), digest_size=8, salt=self.salt).digest()
+            value = int.from_bytes(digest, "little")
+            if len(self._cache) >= self.cache_size:
+                self._cache.clear()
+            self._cache[shingle] = value
+        return value
+
+    def signature(self, shingle_set):
+        """Chữ ký MinHash của một tập shingle (tuple num_perm số nguyên)."""
+        num_perm = self.num_perm
+        bins = [MAX_HASH] * num_perm
+        for shingle in shingle_set:
+            value = self.shingle_hash(shingle)
+            position = value % num_perm
+            value = (value >> 32) & MAX_HASH
+            if value < bins[position]:
+                bins[position] = value
+
+        filled = [position for position in range(num_perm) if bins[position] != MAX_HASH]
+        if not filled or len(filled) == num_perm:
+            return tuple(bins)
+
+        # Densification: bin rỗng lấy giá trị của bin không rỗng gần nhất bên phải (vòng tròn)
+        result = list(bins)
+        next_filled = filled[0] + num_perm
+        for position in range(num_perm - 1, -1, -1):
+            if bins[position] != MAX_HASH:
+                next_filled = position
+            else:
+                distance = next_filled - position
+                result[position] = (bins[next_filled % num_perm] + distance * DENSIFY_OFFSET) & MAX_HASH
+        return tuple(result)
+
+
+_hasher = None
+
+
+def text_signature(text):
+    """Chữ ký MinHash (NUM_PERM hàm hash) của một text; dùng được trong process pool."""
+    global _hasher
+    if _hasher is None:
+        _hasher = MinHasher()
+    return _hasher.signature(shingles(text))
+
+
+def estimated_jaccard(sig1, sig2):
+    """Ước lượng độ tương đồng Jaccard từ hai chữ ký MinHash."""
+    return sum(map(eq, sig1, sig2)) / len(sig1)
+
+
+def find_duplicates(entries, threshold=0.8, bands=BANDS, workers=1):
+    """
+    Tìm các cụm label gần trùng nhau.
+    :param entries: Dict {key: text}, key định danh label (vd: (file, label_index)).
+    :param threshold: Ngưỡng Jaccard ước lượng để coi hai label là trùng.
+    :param bands: Số band LSH (NUM_PERM / bands hàng mỗi band).
+    :param workers: Số process tính chữ ký (None: cpu_count()).
+    :return: List các cụm (list key, phần tử đầu là đại diện), chỉ gồm các cụm có từ 2 label.
+    """
+    rows = NUM_PERM // bands
+    keys = list(entries)
+    texts = [entries[key] for key in keys]
+    if workers == 1:
+        signatures = [text_signature(text) for text in texts]
+    else:
+        with Pool(processes=workers or cpu_count()) as pool:
+            signatures = pool.map(text_signature, texts, chunksize=256)
+
+    # LSH: các label trùng một band được đưa vào cùng bucket
+    buckets = {}
+    for idx, signature in enumerate(signatures):
+        if signature[0] == MAX_HASH:
+            continue
+        for band in range(bands):
+            bucket = (band, signature[band * rows:(band + 1) * rows])
+            buckets.setdefault(bucket, []).append(idx)
+
+    # Union-find trên các cặp ứng viên đã được kiểm tra lại bằng chữ ký đầy đủ
+    parent = list(range(len(keys)))
+
+    def find(idx):
+        while parent[idx] != idx:
+            parent[idx] = parent[parent[idx]]
+            idx = parent[idx]
+        return idx
+
+    # Mỗi bucket chỉ so các label với label đầu tiên và bỏ qua cặp đã cùng cụm, nên tuyến tính theo kích thước bucket
+    for members in buckets.values():
+        first = members[0]
+        for second in members[1:]:
+            root_first, root_second = find(first), find(second)
+            if root_first != root_second and estimated_jaccard(signatures[first], signatures[second]) >= threshold:
+                parent[max(root_first, root_second)] = min(root_first, root_second)
+
+    clusters = {}
+    for idx in range(len(keys)):
+        clusters.setdefault(find(idx), []).append(keys[idx])
+    return [members for members in clusters.values() if len(members) > 1]
+
+
+def duplicate_keys(clusters):
+    """Các key cần bỏ khi xuất dữ liệu (giữ lại phần tử đầu tiên của mỗi cụm)."""
+    return {key for cluster in clusters for key in cluster[1:]}
+
+
+def csv_fields(line):
+    """
+    Tách một dòng CSV do write_csv ghi ra. write_csv không quote mà bỏ dấu phẩy trong text nên chỉ cần split;
+    csv.reader sẽ coi một dấu " trong text OCR là mở quote và nuốt phần còn lại của file.
+    """
+    return line.rstrip("\r\n").split(",")
+
+
+def load_csv_entries(csv_path):
+    """
+    Đọc CSV do align_GUI.save_csv_data / batch_align ghi ra thành dict {(csv_path, số thứ tự label): text}.
+    Label mới bắt đầu khi cột index quay về 1.
+    """
+    entries = {}
+    label_number = 0
+    with open(csv_path, "r", encoding="utf-8-sig") as file:
+        file.readline()
+        for line in file:
+            if not line.strip():
+                continue
+            row = csv_fields(line)
+            if row[0] == "1":
+                label_number += 1
+            key = (csv_path, label_number)
+            # Bỏ cột index, page và box; giữ phần text Hán và phiên âm
+            entries[key] = entries.get(key, "") + " " + " ".join(row[3:])
+    return entries
+
+
+def collapse_csv(csv_path, skip_keys, output_file):
+    """
+    Ghi lại CSV, bỏ các label có key (csv_path, số thứ tự label) nằm trong skip_keys.
+    """
+    label_number = 0
+    with open(csv_path, "r", encoding="utf-8-sig") as source, open(output_file, "w", encoding="utf-8-sig") as target:
+        header = source.readline()
+        target.write(header)
+        for line in source:
+            if csv_fields(line)[0] == "1":
+                label_number += 1
+            if (csv_path, label_number) not in skip_keys:
+                target.write(line)
+
+
+def table_entries(edited_data):
+    """
+    Chuyển các label được lưu trong edited_data ({label_index: {"is_save", "data"}})
+    thành dict {label_index: text} để dedupe.
+    """
+    return {
+        label_index: " ".join(" ".join(str(value) for value in column) for column in data["data"][2:])
+        for label_index, data in edited_data.items()
+        if data["is_save"] and data["data"]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find near-duplicate poems across exported CSV files.")
+    parser.add_argument("csv_files", nargs="+", help="CSV files written by align_GUI or batch_align.")
+    parser.add_argument("-o", "--output", default="duplicates.json", help="Output cluster file.")
+    parser.add_argument("--threshold", type=float, default=0.8, help="Estimated Jaccard threshold.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes.")
+    parser.add_argument("--collapse", action="store_true",
+                        help="Also write <name>_dedup.csv files keeping one label per cluster.")
+    args = parser.parse_args()
+
+    entries = {}
+    for csv_path in args.csv_files:
+        entries.update(load_csv_entries(csv_path))
+
+    clusters = find_duplicates(entries, threshold=args.threshold, workers=args.workers)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump([[list(key) for key in cluster] for cluster in clusters], file, ensure_ascii=False, indent=2)
+    print(f"Found {len(clusters)} duplicate clusters among {len(entries)} labels. Saved to '{args.output}'.")
+
+    if args.collapse:
+        skip_keys = duplicate_keys(clusters)
+        for csv_path in args.csv_files:
+            output_file = os.path.splitext(csv_path)[0] + "_dedup.csv"
+            collapse_csv(csv_path, skip_keys, output_file)
+            print(f"Saved '{output_file}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Lưu các chỉnh sửa bảng của align_GUI dưới dạng log thao tác so với bảng gốc do bộ lọc sinh ra.
+
+Mỗi label chỉ giữ bảng gốc (baseline) và danh sách thao tác (sửa ô, thêm/xóa hàng, thêm/xóa cột) nên chuyển
+label không phải copy lại toàn bộ bảng, label không bị sửa và không được đánh dấu lưu thì không tốn bộ nhớ,
+và undo/redo chỉ là lùi/tiến con trỏ trong log. Không phụ thuộc Qt.
+
+`items()` trả về (label_index, {"is_save", "data"}) giống dict edited_data cũ nên dùng trực tiếp được với
+align_core.write_csv và dedupe.table_entries. `on_change` cho phép ghi từng thay đổi ra ngoài (project_store).
+"""
+from contextlib import contextmanager
+
+
+def _apply(columns, op):
+    kind = op[0]
+    if kind == "set":
+        _, row, col, old, new = op
+        columns[col][row] = new
+    elif kind == "insert_row":
+        for column in columns:
+            column.insert(op[1], "")
+    elif kind == "remove_row":
+        for column in columns:
+            del column[op[1]]
+    elif kind == "insert_column":
+        rows = len(columns[0]) if columns else 0
+        columns.insert(op[1], [""] * rows)
+    elif kind == "remove_column":
+        del columns[op[1]]
+
+
+def _revert(columns, op):
+    kind = op[0]
+    if kind == "set":
+        _, row, col, old, new = op
+        columns[col][row] = old
+    elif kind == "insert_row":
+        for column in columns:
+            del column[op[1]]
+    elif kind == "remove_row":
+        for column, value in zip(columns, op[2]):
+            column.insert(op[1], value)
+    elif kind == "insert_column":
+        del columns[op[1]]
+    elif kind == "remove_column":
+        columns.insert(op[1], list(op[2]))
+
+
+def normalize_table(table):
+    """Copy bảng (list cột) thành các cột cùng độ dài, mọi giá trị là str."""
+    rows = max((len(column) for column in table), default=0)
+    return [[str(value) for value in column] + [""] * (rows - len(column)) for column in table]
+
+
+class LabelEdits:
+    """Bảng gốc, log thao tác (theo nhóm để undo/redo) và cờ lưu của một label."""
+    __slots__ = ("baseline", "history", "position", "is_save")
+
+    def __init__(self, baseline, is_save=False):
+        self.baseline = baseline
+        self.history = []  # List nhóm thao tác; history[:position] đang được áp dụng
+        self.position = 0
+        self.is_save = is_save
+
+    @property
+    def dirty(self):
+        return self.position > 0
+
+    def materialize(self):
+        columns = [list(column) for column in self.baseline]
+        for group in self.history[:self.position]:
+            for op in group:
+                _apply(columns, op)
+        return columns
+
+
+class EditStore:
+    """
+    Quản lý LabelEdits của mọi label và bảng đang hiển thị của label hiện tại.
+    Các thao tác ghi (set_cell, insert_row, ...) áp dụng cho label đang mở bằng open().
+    """
+    def __init__(self):
+        self._labels = {}
+        self.current = None
+        self.columns = None  # Bảng của label hiện tại sau khi áp dụng log
+        self._group = None
+        self.on_change = None  # Hàm on_change(label_index, group) gọi sau mỗi thay đổi; group là None nếu chỉ đổi cờ lưu
+
+    def __contains__(self, label_index):
+        return str(label_index) in self._labels
+
+    def __len__(self):
+        return len(self._labels)
+
+    def open(self, label_index, baseline=None):
+        """
+        Mở một label. Nếu có baseline (bảng mới lọc), label bắt đầu lại từ bảng đó và log cũ bị bỏ;
+        nếu không, dùng bảng gốc và log đã lưu. Trả về bảng hiện tại (list cột).
+        """
+        label_index = str(label_index)
+        if label_index != self.current:
+            self.close()
+        if baseline is not None:
+            previous = self._labels.get(label_index)
+            self._labels[label_index] = LabelEdits(normalize_table(baseline), previous.is_save if previous else False)
+        self.current = label_index
+        self.columns = self._labels[label_index].materialize()
+        return self.columns
+
+    def put(self, label_index, table, is_save=False):
+        """Đặt bảng gốc và cờ lưu của một label (vd: bảng đã lưu trong project), bỏ log cũ của label đó."""
+        label_index = str(label_index)
+        self._labels[label_index] = LabelEdits(normalize_table(table), is_save)
+        if label_index == self.current:
+            self.columns = self._labels[label_index].materialize()
+
+    def table(self, label_index):
+        """Bảng hiện tại (list cột) của một label, None nếu label không được giữ."""
+        label_index = str(label_index)
+        if label_index == self.current:
+            return self.columns
+        edits = self._labels.get(label_index)
+        return edits.materialize() if edits else None
+
+    def _notify(self, label_index, group):
+        if self.on_change is not None:
+            self.on_change(label_index, group)
+
+    def close(self):
+        """Đóng label hiện tại; label không bị sửa và không được đánh dấu lưu thì không cần giữ lại."""
+        edits = self._labels.get(self.current)
+        if edits is not None and not edits.history and not edits.is_save:
+            del self._labels[self.current]
+        self.current = None
+        self.columns = None
+
+    def is_saved(self, label_index):
+        edits = self._labels.get(str(label_index))
+        return edits.is_save if edits else False
+
+    def set_saved(self, label_index, is_save):
+        edits = self._labels.get(str(label_index))
+        if edits is not None and edits.is_save != is_save:
+            edits.is_save = is_save
+            self._notify(str(label_index), None)
+
+    def is_dirty(self, label_index):
+        edits = self._labels.get(str(label_index))
+        return edits.dirty if edits else False
+
+    def dirty_labels(self):
+        return [label_index for label_index, edits in self._labels.items() if edits.dirty]
+
+    @contextmanager
+    def group(self):
+        """Gom các thao tác bên trong thành một bước undo (vd: dán nhiều ô)."""
+        if self._group is not None:
+            yield
+            return
+        self._group = []
+        try:
+            yield
+        finally:
+            group, self._group = self._group, None
+            self._commit(group)
+
+    def _commit(self, group):
+        if not group:
+            return
+        edits = self._labels[self.current]
+        del edits.history[edits.position:]
+        edits.history.append(group)
+        edits.position += 1
+        self._notify(self.current, group)
+
+    def _record(self, op):
+        _apply(self.columns, op)
+        if self._group is not None:
+            self._group.append(op)
+        else:
+            self._commit([op])
+
+    def set_cell(self, row, col, value):
+        """Sửa một ô; trả về False nếu giá trị không đổi (không ghi log)."""
+        old = self.columns[col][row]
+        if old == value:
+            return False
+        self._record(("set", row, col, old, value))
+        return True
+
+    def insert_row(self, row):
+        self._record(("insert_row", row))
+
+    def remove_row(self, row):
+        self._record(("remove_row", row, tuple(column[row] for column in self.columns)))
+
+    def insert_column(self, col, name):
+        self._record(("insert_column", col, name))
+
+    def remove_column(self, col, name):
+        self._record(("remove_column", col, tuple(self.columns[col]), name))
+
+    def undo(self):
+        """Hoàn tác nhóm thao tác cuối của label hiện tại; trả về nhóm đó (None nếu không có)."""
+        edits = self._labels.get(self.current)
+        if edits is None or edits.position == 0:
+            return None
+        edits.position -= 1
+        group = edits.history[edits.position]
+        for op in reversed(group):
+            _revert(self.columns, op)
+        self._notify(self.current, group)
+        return group
+
+    def redo(self):
+        """Làm lại nhóm thao tác vừa hoàn tác; trả về nhóm đó (None nếu không có)."""
+        edits = self._labels.get(self.current)
+        if edits is None or edits.position == len(edits.history):
+            return None
+        group = edits.history[edits.position]
+        edits.position += 1
+        for op in group:
+            _apply(self.columns, op)
+        self._notify(self.current, group)
+        return group
+
+    def load(self, edited_data):
+        """Nạp dict edited_data ({label_index: {"is_save", "data"}}, vd: từ file review) làm bảng gốc."""
+        self.close()
+        self._labels = {
+            str(label_index): LabelEdits(normalize_table(data["data"]), data["is_save"])
+            for label_index, data in edited_data.items()
+        }
+
+    def items(self):
+        """(label_index, {"is_save", "data"}) của các label đang giữ, bảng được dựng khi cần."""
+        for label_index, edits in self._labels.items():
+            data = self.columns if label_index == self.current else edits.materialize()
+            yield label_index, {"is_save": edits.is_save, "data": data}
@@ -0,0 +1,228 @@
+"""
+Xuất ảnh đã gán nhãn ra thư mục dạng "<label>_<label_index>_<page_index>.<ext>" (label_GUI "Save Images")
+bằng thread pool, không decode/encode ảnh khi không cần.
+
+Mỗi trang được xuất theo cách rẻ nhất có thể:
+    hardlink  cùng định dạng: file đích trỏ tới cùng dữ liệu với ảnh gốc, không copy
+    copy      cùng định dạng nhưng không hardlink được (khác ổ đĩa, FAT32, trang trong file .pack)
+    encode    chỉ khi đổi định dạng (vd: png -> jpg), dùng Pillow; trang PDF ("book.pdf#12") luôn được render ở
+              độ phân giải đầy đủ (pdf_pages.EXPORT_DPI) lúc xuất và cũng tính là encode
+File được ghi ra file tạm rồi đổi tên. Nguồn của mỗi file đã ghi (ref, mtime và kích thước của file nguồn, định dạng)
+được lưu trong thư mục ẩn ".image_export" cạnh file đích; file đích chỉ được bỏ qua khi là hardlink của ảnh gốc
+hoặc được ghi từ đúng nguồn đó, nên chạy lại sau khi hủy sẽ tiếp tục từ chỗ dừng còn trang đã đổi nhãn thì được
+ghi đè.
+
+Usage (xuất từ manifest của label_GUI):
+    python image_export.py labels_manifest.json -o LABELED [--format jpg] [--workers 8]
+"""
+import io
+import os
+import json
+import time
+import shutil
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from page_pack import PDF_EXTENSION, split_ref, open_pack, read_page, resolve_ref
+
+FORMAT_EXTENSIONS = {"png": ".png", "jpg": ".jpg", "bmp": ".bmp", "webp": ".webp"}
+PIL_FORMATS = {"png": "PNG", "jpg": "JPEG", "bmp": "BMP", "webp": "WEBP"}
+JPEG_QUALITY = 90
+DEFAULT_WORKERS = 8
+SOURCE_FOLDER = ".image_export"  # Nguồn của từng file đã xuất, cạnh các file đích
+
+
+def _normalize_format(image_format):
+    image_format = image_format.lower().lstrip(".")
+    return "jpg" if image_format == "jpeg" else image_format
+
+
+def source_format(source):
+    """Định dạng ảnh gốc ("png", "jpg", ...) lấy từ index của pack hoặc phần mở rộng file (trang PDF: "png")."""
+    pack_path, name = split_ref(resolve_ref(source))
+    if name is not None and pack_path.lower().endswith(PDF_EXTENSION):
+        return "png"
+    if name is not None:
+        return _normalize_format(open_pack(pack_path).entry(name)["format"])
+    return _normalize_format(os.path.splitext(pack_path)[1])
+
+
+def output_extension(source, image_format=None):
+    """Phần mở rộng của file đích: theo định dạng đích, hoặc định dạng gốc nếu không đổi."""
+    target_format = _normalize_format(image_format) if image_format else source_format(source)
+    return FORMAT_EXTENSIONS.get(target_format, f".{target_format}")
+
+
+def _write_atomic(dest, data):
+    temp_path = f"{dest}.part"
+    with open(temp_path, "wb") as file:
+        file.write(data)
+    os.replace(temp_path, dest)
+
+
+def _copy_atomic(source, dest):
+    temp_path = f"{dest}.part"
+    shutil.copyfile(source, temp_path)
+    os.replace(temp_path, dest)
+
+
+def _source_signature(source, target_format):
+    # Ref, mtime và kích thước của file chứa ảnh gốc (file ảnh, .pack hoặc .pdf) và định dạng đích
+    container = split_ref(source)[0]
+    stat = os.stat(container)
+    return {"source": os.path.abspath(container) + source[len(container):], "mtime": stat.st_mtime_ns,
+            "size": stat.st_size, "format": target_format}
+
+
+def _signature_path(dest):
+    return os.path.join(os.path.dirname(os.path.abspath(dest)), SOURCE_FOLDER, os.path.basename(dest) + ".json")
+
+
+def _is_exported_from(dest, signature):
+    """File đích có sẵn và được ghi từ đúng nguồn này."""
+    if not os.path.exists(dest):
+        return False
+    try:
+        with open(_signature_path(dest), "r", encoding="utf-8") as file:
+            return json.load(file) == signature
+    except (OSError, ValueError):
+        return False
+
+
+def _record_source(dest, signature):
+    path = _signature_path(dest)
+    if signature is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    _write_atomic(path, json.dumps(signature, ensure_ascii=False).encode("utf-8"))
+
+
+def export_page(source, dest, image_format=None):
+    """
+    Xuất một trang (đường dẫn file, "book.pack#12" hoặc tham chiếu manifest) ra dest.
+    :param image_format: Định dạng đích; None hoặc trùng định dạng gốc thì giữ nguyên bytes.
+    :return: Tuple (cách xuất: "hardlink" | "copy" | "encode" | "skip", số bytes của file đích).
+    """
+    source = resolve_ref(source)
+    original_format = source_format(source)
+    target_format = _normalize_format(image_format) if image_format else original_format
+    pack_path, name = split_ref(source)
+    signature = _source_signature(source, target_format)
+    if _is_exported_from(dest, signature):
+        return "skip", os.path.getsize(dest)
+
+    if name is not None and pack_path.lower().endswith(PDF_EXTENSION) and target_format == original_format:
+        data = read_page(source)
+        _write_atomic(dest, data)
+        _record_source(dest, signature)
+        return "encode", len(data)
+
+    if target_format == original_format:
+        if name is None:
+            size = os.path.getsize(source)
+            if os.path.exists(dest):
+                if os.path.samefile(source, dest):
+                    return "skip", size
+                os.remove(dest)
+            try:
+                os.link(source, dest)
+                _record_source(dest, None)  # Hardlink: samefile là đủ
+                return "hardlink", size
+            except OSError:
+                _copy_atomic(source, dest)
+                _record_source(dest, signature)
+                return "copy", size
+        data = read_page(source)
+        _write_atomic(dest, data)
+        _record_source(dest, signature)
+        return "copy", len(data)
+
+    from PIL import Image
+    with Image.open(io.BytesIO(read_page(source))) as image:
+        pil_format = PIL_FORMATS[target_format]
+        if pil_format == "JPEG" and image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        buffer = io.BytesIO()
+        image.save(buffer, pil_format, **({"quality": JPEG_QUALITY} if pil_format in ("JPEG", "WEBP") else {}))
+    _write_atomic(dest, buffer.getvalue())
+    _record_source(dest, signature)
+    return "encode", buffer.tell()
+
+
+def export_pages(jobs, image_format=None, workers=DEFAULT_WORKERS, cancel=None, progress=None):
+    """
+    Xuất nhiều trang song song (hardlink/copy chủ yếu chờ I/O nên dùng thread).
+    :param jobs: List (source, dest).
+    :param cancel: threading.Event; khi được set, các trang chưa bắt đầu bị bỏ qua.
+    :param progress: Hàm progress(done, total) gọi sau mỗi trang (từ thread gọi export_pages).
+    :return: Dict thống kê (pages, done, hardlink, copy, encode, skip, errors, bytes, seconds, cancelled, ...).
+    """
+    cancel = cancel or threading.Event()
+    stats = {"pages": len(jobs), "done": 0, "hardlink": 0, "copy": 0, "encode": 0, "skip": 0, "errors": 0,
+             "bytes": 0}
+    start = time.perf_counter()
+
+    def run(source, dest):
+        if cancel.is_set():
+            return None
+        return export_page(source, dest, image_format)
+
+    with ThreadPoolExecutor(max_workers=workers or DEFAULT_WORKERS) as pool:
+        futures = {pool.submit(run, source, dest): (source, dest) for source, dest in jobs}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"Error exporting {futures[future][0]}: {e}")
+                stats["errors"] += 1
+                result = ()
+            if result is None:
+                continue
+            if result:
+                method, size = result
+                stats[method] += 1
+                if method != "skip":
+                    stats["bytes"] += size
+            stats["done"] += 1
+            if progress:
+                progress(stats["done"], stats["pages"])
+
+    stats["cancelled"] = cancel.is_set() and stats["done"] < stats["pages"]
+    stats["seconds"] = time.perf_counter() - start
+    written = stats["done"] - stats["skip"] - stats["errors"]
+    stats["pages_per_second"] = written / stats["seconds"] if stats["seconds"] else 0.0
+    stats["mb_per_second"] = stats["bytes"] / 2 ** 20 / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+def format_report(stats):
+    """Một dòng tóm tắt kết quả export_pages."""
+    return (f"{stats['done']}/{stats['pages']} pages in {stats['seconds']:.1f} s "
+            f"({stats['hardlink']} hardlinked, {stats['copy']} copied, {stats['encode']} re-encoded, "
+            f"{stats['skip']} already done, {stats['errors']} errors), "
+            f"{stats['pages_per_second']:.0f} pages/s, {stats['mb_per_second']:.1f} MB/s")
+
+
+def main():
+    from label_manifest import read_manifest, image_name
+
+    parser = argparse.ArgumentParser(description="Export the pages of a label manifest as labeled image files.")
+    parser.add_argument("manifest", help="labels_manifest.json written by label_GUI.")
+    parser.add_argument("-o", "--output", required=True, help="Output folder.")
+    parser.add_argument("--format", choices=sorted(FORMAT_EXTENSIONS), default=None,
+                        help="Re-encode to this format (default: keep the source format).")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Number of export threads.")
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    jobs = []
+    for record in read_manifest(args.manifest):
+        extension = output_extension(record["source_path"], args.format)
+        jobs.append((record["source_path"], os.path.join(args.output, image_name(record) + extension)))
+    print(format_report(export_pages(jobs, args.format, workers=args.workers)))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,22 @@ import os
 import sys
 import json
 import re
-from PyQt5.QtCore import Qt, QThread, pyqtSignal
+import time
+import sqlite3
+import threading
+from PyQt5.QtCore import Qt, QThread, pyqtSignal, QTimer, QRect, QPoint
 from PyQt5.QtGui import QPixmap, QImageReader
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QScrollArea, QInputDialog,
     QPushButton, QTableWidget, QTableWidgetItem, QHeaderView, QFileDialog, QSpinBox,
     QCheckBox, QAbstractItemView, QMessageBox, QGridLayout, QSplitter, QStatusBar, QMenu, QProgressDialog
 )
+from perf_stats import span, instrument, create_perf_dock
+from thumb_cache import cached_thumbnail
+from page_pack import list_pages, is_pdf, is_page_ref, page_name, split_ref
+from label_manifest import MANIFEST_NAME, write_manifest
+from image_export import export_pages, output_extension, format_report
+from project_store import ProjectStore, PROJECT_SUFFIX, default_project_path
 
 
 # Constants
@@ -21,28 +30,86 @@ CONFIG_FILE = "config.json"
 class ImageLoaderThread(QThread):
     images_loaded = pyqtSignal(list)
 
-    def __init__(self, folder, start_index, count):
+    def __init__(self, folder, start_index, count, width):
         super().__init__()
         self.folder = folder
         self.start_index = start_index
         self.count = count
+        self.width = width
 
     def run(self):
         valid_images = []
-        files = os.listdir(self.folder)
-        sorted_files = sorted(
-            (f for f in files if f.split(".")[0].isdigit()),
-            key=lambda x: int(x.split(".")[0])
-        )
+        # Thư mục ảnh hoặc file .pack (tham chiếu "book.pack#12")
+        sorted_files = list_pages(self.folder)
 
         for i in range(self.start_index, min(len(sorted_files), self.start_index + self.count)):
-            file_path = os.path.join(self.folder, sorted_files[i])
-            if QImageReader(file_path).canRead():
-                valid_images.append(file_path)
+            file_path = sorted_files[i]
+            if is_page_ref(file_path) or QImageReader(file_path).canRead():
+                # Thumbnail lấy từ cache trên đĩa (hoặc decode rồi lưu vào cache) ngay trong thread nền
+                valid_images.append((file_path, cached_thumbnail(file_path, self.width)))
 
         self.images_loaded.emit(valid_images)
 
 
+class PageRenderThread(QThread):
+    """
+    Render các trang PDF đang hiện trên màn hình (pdf_pages qua thumbnail cache) ở kích thước ô ảnh.
+    Mỗi request thay danh sách trang đang chờ nên cuộn nhanh qua nhiều trang không bị render thừa.
+    """
+    page_rendered = pyqtSignal(int, str, object)  # generation, tham chiếu trang, QImage
+
+    def __init__(self):
+        super().__init__()
+        self._condition = threading.Condition()
+        self._pending = []
+        self._generation = 0
+        self._width = 0
+        self._stopped = False
+
+    def request(self, generation, pages, width):
+        with self._condition:
+            self._generation = generation
+            self._pending = list(pages)
+            self._width = width
+            self._condition.notify()
+
+    def stop(self):
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+        self.wait()
+
+    def run(self):
+        while True:
+            with self._condition:
+                while not self._stopped and not self._pending:
+                    self._condition.wait()
+                if self._stopped:
+                    return
+                page = self._pending.pop(0)
+                generation, width = self._generation, self._width
+            self.page_rendered.emit(generation, page, cached_thumbnail(page, width))
+
+
+class ExportThread(QThread):
+    """Xuất ảnh đã gán nhãn bằng image_export.export_pages (thread pool) ngoài UI thread."""
+    progress = pyqtSignal(int, int)
+    export_finished = pyqtSignal(object)
+
+    def __init__(self, jobs, image_format):
+        super().__init__()
+        self.jobs = jobs
+        self.image_format = image_format
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        stats = export_pages(self.jobs, self.image_format, cancel=self.cancel_event, progress=self.progress.emit)
+        self.export_finished.emit(stats)
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -55,6 +122,14 @@ class MainWindow(QMainWindow):
         self.columns = 3
         self.current_tick_row = 0
         self.label_names = []
+        self.export_thread = None
+        self.project = None  # ProjectStore: phân trang được ghi vào đây sau mỗi lần sửa bảng
+        self.page_source_cache = None
+        self.pdf_placeholders = {}  # {"book.pdf#12": QLabel} các trang PDF chưa render
+        self.render_generation = 0  # Kết quả render của thế hệ cũ (đổi file, đổi số cột) bị bỏ qua
+        self.render_thread = PageRenderThread()
+        self.render_thread.page_rendered.connect(self.pdf_page_rendered)
+        self.render_thread.start()
 
         # Load configuration if exists
         self.config = self.load_config()
@@ -65,6 +140,8 @@ class MainWindow(QMainWindow):
         # Top Layout
         top_layout = QHBoxLayout()
         self.btn_load_folder = QPushButton("Load Folder")
+        self.btn_load_pack = QPushButton("Load Pack")
+        self.btn_load_pdf = QPushButton("Load PDF")
         self.btn_load_more = QPushButton("Load More Images")
         self.column_selector = QSpinBox()
         self.column_selector.setRange(1, 10)
@@ -72,6 +149,8 @@ class MainWindow(QMainWindow):
         self.column_selector.valueChanged.connect(self.update_columns)
 
         top_layout.addWidget(self.btn_load_folder)
+        top_layout.addWidget(self.btn_load_pack)
+        top_layout.addWidget(self.btn_load_pdf)
         top_layout.addWidget(self.btn_load_more)
         top_layout.addWidget(QLabel("Columns:"))
         top_layout.addWidget(self.column_selector)
@@ -88,6 +167,7 @@ class MainWindow(QMainWindow):
         self.scroll_area = QScrollArea()
         self.scroll_area.setWidgetResizable(True)
         self.scroll_area.setWidget(self.image_area)
+        self.scroll_area.verticalScrollBar().valueChanged.connect(self.request_visible_pages)
         splitter.addWidget(self.scroll_area)
 
         # Label Table Area
@@ -114,15 +194,24 @@ class MainWindow(QMainWindow):
 
         main_layout.addWidget(splitter)
 
-        # Save Button
+        # Save Buttons
+        save_layout = QHBoxLayout()
         self.btn_save = QPushButton("Save Images")
-        main_layout.addWidget(self.btn_save)
+        self.btn_save_manifest = QPushButton("Save Manifest")
+        self.btn_project = QPushButton("Open Project")
+        save_layout.addWidget(self.btn_save)
+        save_layout.addWidget(self.btn_save_manifest)
+        save_layout.addWidget(self.btn_project)
+        main_layout.addLayout(save_layout)
 
         # Status Bar
         self.status_bar = QStatusBar()
         self.setStatusBar(self.status_bar)
         self.update_status_bar()
 
+        # Performance panel (only when NLP_MINITOOLS_PERF is set)
+        self.perf_dock = create_perf_dock(self)
+
         # Central Widget
         central_widget = QWidget()
         central_widget.setLayout(main_layout)
@@ -130,8 +219,13 @@ class MainWindow(QMainWindow):
 
         # Connections
         self.btn_load_folder.clicked.connect(self.load_folder)
+        self.btn_load_pack.clicked.connect(self.load_pack)
+        self.btn_load_pdf.clicked.connect(self.load_pdf)
         self.btn_load_more.clicked.connect(self.load_more_images)
         self.btn_save.clicked.connect(self.save_images)
+        self.btn_save_manifest.clicked.connect(self.save_manifest)
+        self.btn_project.clicked.connect(self.open_project)
+        self.table.itemChanged.connect(self.label_row_changed)
 
         # Setup context menu
         self.setup_table_context_menu()
@@ -157,31 +251,57 @@ class MainWindow(QMainWindow):
     def load_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Image Folder")
         if folder:
-            self.image_folder = folder
-            self.images = []
-            self.loaded_image_count = 0
-            self.image_layout.setRowMinimumHeight(0, 0)  # Clear previous grid
-            self.load_more_images()
+            self.open_image_source(folder)
+
+    def load_pack(self):
+        """Mở file .pack do pdf_to_png.py tạo ra thay cho thư mục ảnh."""
+        pack_path, _ = QFileDialog.getOpenFileName(self, "Select Page Pack", "", "Page Pack (*.pack)")
+        if pack_path:
+            self.open_image_source(pack_path)
+
+    def load_pdf(self):
+        """Mở thẳng file PDF: chỉ các trang đang hiện được render (ở kích thước ô ảnh), không cần pdf_to_png.py."""
+        pdf_path, _ = QFileDialog.getOpenFileName(self, "Select PDF", "", "PDF (*.pdf)")
+        if pdf_path:
+            self.open_image_source(pdf_path)
+
+    def open_image_source(self, source):
+        self.image_folder = source
+        self.page_source_cache = None
+        self.pdf_placeholders.clear()
+        self.render_generation += 1
+        self.images = []
+        self.loaded_image_count = 0
+        self.image_layout.setRowMinimumHeight(0, 0)  # Clear previous grid
+        self.load_more_images()
 
     def load_more_images(self):
         if not self.image_folder:
             QMessageBox.warning(self, "Error", "Please load a folder first!")
             return
 
+        if is_pdf(self.image_folder):
+            self.add_pdf_placeholders()
+            return
+
         self.btn_load_more.setEnabled(False)
-        self.thread = ImageLoaderThread(self.image_folder, self.loaded_image_count, IMAGES_PER_LOAD)
+        self.thread = ImageLoaderThread(self.image_folder, self.loaded_image_count, IMAGES_PER_LOAD,
+                                        self.thumbnail_width())
         self.thread.images_loaded.connect(self.display_images)
         self.thread.start()
 
-    def display_images(self, image_paths):
+    def thumbnail_width(self):
         screen = QApplication.primaryScreen()
         screen_width = screen.size().width()
-        image_width = screen_width // self.columns - 20
+        return screen_width // self.columns - 20
 
-        for path in image_paths:
-            pixmap = QPixmap(path)
+    @instrument("label_GUI.display_images")
+    def display_images(self, images):
+        for path, image in images:
+            with span("label_GUI.image_convert"):
+                pixmap = QPixmap.fromImage(image)
             label = QLabel()
-            label.setPixmap(pixmap.scaled(image_width, image_width, Qt.KeepAspectRatio))
+            label.setPixmap(pixmap)
             label.setAlignment(Qt.AlignCenter)
             label.setObjectName(path)  # Store image path in QLabel
             label.mousePressEvent = lambda event, path=path: self.image_clicked(event, path)
@@ -195,6 +315,54 @@ class MainWindow(QMainWindow):
         self.update_status_bar()
         self.btn_load_more.setEnabled(True)
 
+    def add_pdf_placeholders(self):
+        """Thêm ô chờ (đúng kích thước trang) cho lượt trang PDF tiếp theo; trang được render khi cuộn tới."""
+        from pdf_pages import page_size
+
+        if self.page_source_cache is None:
+            self.page_source_cache = self.page_sources()
+        pages = list(self.page_source_cache.values())
+        width = self.thumbnail_width()
+        for path in pages[self.loaded_image_count:self.loaded_image_count + IMAGES_PER_LOAD]:
+            page_width, page_height = page_size(*split_ref(path))
+            scale = width / max(page_width, page_height)
+            label = QLabel(f"Page {page_name(path)}")
+            label.setAlignment(Qt.AlignCenter)
+            label.setMinimumSize(int(page_width * scale), int(page_height * scale))
+            label.setObjectName(path)
+            label.mousePressEvent = lambda event, path=path: self.image_clicked(event, path)
+
+            row = self.loaded_image_count // self.columns
+            col = self.loaded_image_count % self.columns
+            self.image_layout.addWidget(label, row, col)
+            self.pdf_placeholders[path] = label
+            self.loaded_image_count += 1
+
+        self.update_status_bar()
+        # Xếp lại layout ngay để biết ô nào đang hiện
+        self.image_layout.activate()
+        QTimer.singleShot(0, self.request_visible_pages)
+
+    def request_visible_pages(self):
+        """Gửi các trang PDF chưa render nằm trong màn hình (và nửa màn hình trên/dưới) cho thread render."""
+        if not self.pdf_placeholders:
+            return
+        viewport = self.scroll_area.viewport()
+        margin = viewport.height() // 2
+        area = viewport.rect().adjusted(0, -margin, 0, margin)
+        visible = [
+            path for path, label in self.pdf_placeholders.items()
+            if QRect(label.mapTo(viewport, QPoint(0, 0)), label.size()).intersects(area)
+        ]
+        self.render_thread.request(self.render_generation, visible, self.thumbnail_width())
+
+    def pdf_page_rendered(self, generation, path, image):
+        label = self.pdf_placeholders.get(path)
+        if generation != self.render_generation or label is None or image.isNull():
+            return
+        label.setPixmap(QPixmap.fromImage(image))
+        del self.pdf_placeholders[path]
+
     def setup_table_context_menu(self):
         """Thiết lập menu chuột phải cho bảng."""
         self.table.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -272,6 +440,7 @@ class MainWindow(QMainWindow):
             for i in range(self.table.rowCount()):
                 self.table.setVerticalHeaderItem(i, QTableWidgetItem(str(i + 1)))
 
+            self.sync_project()
             QMessageBox.information(self, "Row Deleted", f"Row {current_row + 1} has been deleted.")
     
     def delete_table_column(self):
@@ -279,6 +448,7 @@ class MainWindow(QMainWindow):
         current_col = self.table.currentColumn()
         if current_col > 0:  # Không cho phép xóa cột tick box
             self.table.removeColumn(current_col)
+            self.sync_project()
             QMessageBox.information(self, "Column Deleted", f"Column {current_col} has been deleted.")
         else:
             QMessageBox.warning(self, "Cannot Delete", "Cannot delete the tick box column.")
@@ -298,6 +468,7 @@ class MainWindow(QMainWindow):
             new_name, ok = QInputDialog.getText(self, "Edit Label Name", "Enter new label name:")
             if ok and new_name.strip():
                 self.table.setHorizontalHeaderItem(current_col, QTableWidgetItem(new_name))
+                self.sync_project()
                 QMessageBox.information(self, "Label Edited", f"Label name has been updated to '{new_name}'.")
         else:
             QMessageBox.warning(self, "Cannot Edit", "Cannot edit the tick box column.")
@@ -365,51 +536,204 @@ class MainWindow(QMainWindow):
             widget.deleteLater()
 
         self.loaded_image_count = 0
+        self.pdf_placeholders.clear()
+        self.render_generation += 1
         self.load_more_images()
 
+    @instrument("label_GUI.save_images")
     def save_images(self):
+        """
+        Xuất các trang đã gán nhãn ra `[Label]_[index]_[page].<ext>` trong thread nền: hardlink/copy nguyên file,
+        chỉ encode lại khi chọn định dạng khác ảnh gốc. Chạy lại vào cùng thư mục sẽ bỏ qua các file đã xong.
+        """
+        if self.export_thread is not None and self.export_thread.isRunning():
+            QMessageBox.warning(self, "Error", "Images are still being saved!")
+            return
+        if not self.image_folder:
+            QMessageBox.warning(self, "Error", "Please load a folder first!")
+            return
         save_folder = QFileDialog.getExistingDirectory(self, "Select Save Folder")
         if not save_folder:
             return
+        formats = ["PNG", "JPG", "Keep source format"]
+        choice, ok = QInputDialog.getItem(self, "Image Format", "Save images as:", formats, 0, False)
+        if not ok:
+            return
+        image_format = None if choice == formats[-1] else choice.lower()
+
+        sources = self.page_sources()
+        jobs = []
+        for label_name, label_index, index in self.labeled_pages():
+            source = sources.get(index, os.path.join(self.image_folder, f"{index}.png"))
+            save_path = os.path.join(save_folder, f"{label_name}_{label_index}_{index}")
+            try:
+                jobs.append((source, save_path + output_extension(source, image_format)))
+            except (OSError, KeyError, ValueError) as e:
+                print(f"Error saving image {index}: {e}")
+
+        self.export_dialog = QProgressDialog("Saving images...", "Cancel", 0, len(jobs), self)
+        self.export_dialog.setWindowTitle("Saving Images")
+        self.export_dialog.setAutoClose(False)
+        self.export_dialog.setAutoReset(False)
+        self.export_dialog.setValue(0)
+        self.btn_save.setEnabled(False)
+
+        self.export_thread = ExportThread(jobs, image_format)
+        self.export_thread.progress.connect(lambda done, total: self.export_dialog.setValue(done))
+        self.export_thread.export_finished.connect(self.export_finished)
+        self.export_dialog.canceled.connect(self.export_thread.cancel)
+        self.export_thread.start()
+
+    def export_finished(self, stats):
+        self.export_dialog.close()
+        self.btn_save.setEnabled(True)
+        report = format_report(stats)
+        print(report)
+        self.status_bar.showMessage(report)
+        if stats["cancelled"]:
+            QMessageBox.warning(self, "Operation Cancelled",
+                                f"Saving images was cancelled!\n{report}\n\nSave to the same folder again to resume.")
+        elif stats["errors"]:
+            QMessageBox.warning(self, "Save Finished With Errors", report)
+        else:
+            QMessageBox.information(self, "Save Complete", f"All images have been saved successfully!\n{report}")
 
-        total_items = 0
-        for row in range(self.table.rowCount()):
+    def page_sources(self):
+        """{page index: đường dẫn ảnh hoặc "book.pack#N"} của nguồn ảnh đang mở."""
+        return {page_name(path): path for path in list_pages(self.image_folder)}
+
+    def labeled_pages(self, rows=None):
+        """List (tên nhãn hợp lệ, label index, page index) của mọi ô trong bảng (hoặc các hàng rows), theo thứ tự hàng rồi cột."""
+        pages = []
+        for row in (range(self.table.rowCount()) if rows is None else rows):
             for col in range(1, self.table.columnCount()):
                 item = self.table.item(row, col)
-                if item:
-                    total_items += len(item.text().split(","))
-
-        progress_dialog = QProgressDialog("Saving images...", "Cancel", 0, total_items, self)
-        progress_dialog.setWindowTitle("Saving Images")
-        progress_dialog.setWindowModality(Qt.ApplicationModal)
-        progress_dialog.setValue(0)
+                if not item:
+                    continue
+                label_name = self.get_valid_column_names(col)
+                for index in item.text().split(","):
+                    index = index.strip()
+                    if index:
+                        pages.append((label_name, row + 1, index))
+        return pages
+
+    def save_manifest(self):
+        """
+        Ghi labels_manifest.json (label_name, label_index, page_index, source_path) trỏ về ảnh gốc thay vì copy ảnh;
+        ocr_runner.py và align_GUI ("Load Images" chọn thư mục chứa manifest) đọc trực tiếp file này.
+        """
+        if not self.image_folder:
+            QMessageBox.warning(self, "Error", "Please load a folder first!")
+            return
+        default_folder = os.path.dirname(self.image_folder) if os.path.isfile(self.image_folder) else self.image_folder
+        manifest_path, _ = QFileDialog.getSaveFileName(
+            self, "Save Label Manifest", os.path.join(default_folder, MANIFEST_NAME), "Label Manifest (*manifest.json)"
+        )
+        if not manifest_path:
+            return
 
-        current_progress = 0
+        start = time.perf_counter()
+        self.page_source_cache = None
+        try:
+            count = write_manifest(manifest_path, self.label_records())
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Failed to save manifest: {e}")
+            return
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.status_bar.showMessage(f"Saved {count} labeled pages to {manifest_path} ({elapsed_ms:.0f} ms)")
+
+    def label_records(self, rows=None):
+        """Record phân trang {"label_name", "label_index", "page_index", "source_path"} của bảng (hoặc các hàng rows)."""
+        if self.page_source_cache is None:
+            self.page_source_cache = self.page_sources() if self.image_folder else {}
+        records = []
+        for label_name, label_index, index in self.labeled_pages(rows):
+            records.append({
+                "label_name": label_name,
+                "label_index": label_index,
+                "page_index": int(index) if index.isdigit() else index,
+                "source_path": self.page_source_cache.get(index, os.path.join(self.image_folder, f"{index}.png"))
+            })
+        return records
+
+    def open_project(self):
+        """
+        Mở (hoặc tạo) project dùng chung với align_GUI và batch_align.py (project_store.py). Nếu project đã có phân
+        trang thì bảng được dựng lại từ đó, nếu không thì bảng hiện tại được ghi vào project.
+        """
+        default_path = default_project_path(self.image_folder) if self.image_folder else ""
+        project_path, _ = QFileDialog.getSaveFileName(self, "Open or Create Project", default_path,
+                                                      f"Project Files (*{PROJECT_SUFFIX})",
+                                                      options=QFileDialog.DontConfirmOverwrite)
+        if not project_path:
+            return
 
-        for row in range(self.table.rowCount()):
-            for col in range(1, self.table.columnCount()):
-                item = self.table.item(row, col)
-                if item:
-                    indices = item.text().split(",")
-                    for index in indices:
-                        index = index.strip()
-                        try:
-                            img_path = os.path.join(self.image_folder, f"{index}.png")
-                            label_name = self.get_valid_column_names(col)
-                            save_path = os.path.join(save_folder, f"{label_name}_{row + 1}_{index}.png")
-                            QPixmap(img_path).save(save_path)
-                        except Exception as e:
-                            print(f"Error saving image {index}: {e}")
-                        current_progress += 1
-                        progress_dialog.setValue(current_progress)
-
-                        if progress_dialog.wasCanceled():
-                            QMessageBox.warning(self, "Operation Cancelled", "Saving images was cancelled!")
-                            return
-
-        progress_dialog.close()
-        QMessageBox.information(self, "Save Complete", "All images have been saved successfully!")
+        try:
+            project = ProjectStore(project_path)
+            records = project.assignments()
+            image_source = project.get_meta("image_source")
+        except (OSError, sqlite3.Error) as e:
+            QMessageBox.critical(self, "Error", f"Failed to open project: {e}")
+            return
+        if self.project is not None:
+            self.project.close()
+        self.project = project
+
+        if image_source and not self.image_folder and os.path.exists(image_source):
+            self.open_image_source(image_source)
+        if records:
+            self.fill_table_from_records(records)
+        self.sync_project()
+        self.status_bar.showMessage(f"Project {os.path.basename(project_path)}: {len(records)} labeled pages")
+
+    def fill_table_from_records(self, records):
+        """Dựng lại nội dung bảng từ các record phân trang (cột theo label_name, hàng theo label_index)."""
+        cells = {}
+        for record in records:
+            if str(record["label_index"]).isdigit():
+                cells.setdefault((int(record["label_index"]) - 1, record["label_name"]), []).append(
+                    str(record["page_index"]))
+
+        self.table.blockSignals(True)
+        try:
+            columns = {self.get_valid_column_names(col): col for col in range(1, self.table.columnCount())}
+            for row, label_name in cells:
+                if label_name not in columns:
+                    self.add_table_column()
+                    columns[label_name] = self.table.columnCount() - 1
+                    self.table.setHorizontalHeaderItem(columns[label_name], QTableWidgetItem(label_name))
+                while self.table.rowCount() <= row:
+                    self.add_table_row()
+            for row in range(self.table.rowCount()):
+                for col in range(1, self.table.columnCount()):
+                    self.table.setItem(row, col, QTableWidgetItem(""))
+            for (row, label_name), pages in cells.items():
+                self.table.setItem(row, columns[label_name], QTableWidgetItem(", ".join(pages)))
+        finally:
+            self.table.blockSignals(False)
+        self.update_status_bar()
 
+    def sync_project(self):
+        """Ghi toàn bộ phân trang, tên nhãn và nguồn ảnh vào project (sau khi xóa hàng/cột hoặc đổi tên nhãn)."""
+        if self.project is None:
+            return
+        try:
+            self.project.set_assignments(self.label_records())
+            self.project.set_meta("label_names", [self.get_column_name(i) for i in range(1, self.table.columnCount())])
+            if self.image_folder:
+                self.project.set_meta("image_source", os.path.abspath(self.image_folder))
+        except sqlite3.Error as e:
+            self.status_bar.showMessage(f"Failed to write project: {e}")
+
+    def label_row_changed(self, item):
+        """Ghi lại phân trang của hàng vừa sửa vào project (chỉ một label mỗi lần sửa)."""
+        if self.project is None or item.column() == 0:
+            return
+        row = item.row()
+        try:
+            self.project.set_label_pages(row + 1, self.label_records([row]))
+        except sqlite3.Error as e:
+            self.status_bar.showMessage(f"Failed to write project: {e}")
 
     def update_status_bar(self):
         total_images = self.loaded_image_count
@@ -422,11 +746,17 @@ class MainWindow(QMainWindow):
 
     def closeEvent(self, event):
         self.save_config()
+        self.render_thread.stop()
+        if self.project is not None:
+            self.project.close()
+        if self.export_thread is not None and self.export_thread.isRunning():
+            self.export_thread.cancel()
+            self.export_thread.wait()
         super().closeEvent(event)
 
     def image_clicked(self, event, image_path):
         """Xử lý sự kiện click chuột trái/phải trên ảnh."""
-        index = os.path.basename(image_path).split(".")[0]
+        index = page_name(image_path)
         if not index.isdigit():
             return
 
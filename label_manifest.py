@@ -0,0 +1,96 @@
+"""
+Manifest gán nhãn: thay vì copy từng trang ra file "<label>_<label_index>_<page_index>.png", label_GUI ghi một
+file JSON liệt kê các trang đã gán nhãn và trỏ về ảnh gốc (file ảnh hoặc "book.pack#12").
+
+Cấu trúc file (mặc định labels_manifest.json):
+    {"version": 1, "records": [{"label_name", "label_index", "page_index", "source_path"}, ...]}
+
+source_path được lưu tương đối so với thư mục chứa manifest (nếu được) để có thể di chuyển cả thư mục.
+Mỗi record có tên giống tên file ảnh cũ ("ORI_1_39") và được tham chiếu bằng "labels_manifest.json#ORI_1_39",
+nên ocr_runner và thumbnail cache dùng được như ảnh thật (xem page_pack.read_page).
+"""
+import os
+import json
+import threading
+from page_pack import MANIFEST_SUFFIX, REF_SEPARATOR
+
+MANIFEST_NAME = "labels_manifest.json"
+
+
+def image_name(record):
+    """Tên giống file ảnh đã gán nhãn: "<label_name>_<label_index>_<page_index>"."""
+    return f"{record['label_name']}_{record['label_index']}_{record['page_index']}"
+
+
+def is_manifest(path):
+    return os.path.isfile(path) and path.lower().endswith(MANIFEST_SUFFIX)
+
+
+def find_manifest(folder):
+    """Đường dẫn labels_manifest.json trong thư mục, None nếu không có."""
+    path = os.path.join(folder, MANIFEST_NAME)
+    return path if os.path.isfile(path) else None
+
+
+def manifest_ref(manifest_path, name):
+    """Tham chiếu tới một record trong manifest, vd: "labels_manifest.json#ORI_1_39"."""
+    return f"{manifest_path}{REF_SEPARATOR}{name}"
+
+
+def write_manifest(path, records):
+    """
+    Ghi manifest (ghi ra file tạm rồi đổi tên để không để lại file hỏng).
+    :param records: Các dict {"label_name", "label_index", "page_index", "source_path"}.
+    :return: Số record đã ghi.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+    entries = []
+    for record in records:
+        source = os.path.abspath(record["source_path"])
+        try:
+            source = os.path.relpath(source, base)
+        except ValueError:
+            # Khác ổ đĩa trên Windows: giữ đường dẫn tuyệt đối
+            pass
+        entries.append({
+            "label_name": record["label_name"],
+            "label_index": record["label_index"],
+            "page_index": record["page_index"],
+            "source_path": source.replace(os.sep, "/")
+        })
+
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump({"version": 1, "records": entries}, file, ensure_ascii=False, indent=1)
+    os.replace(temp_path, path)
+    return len(entries)
+
+
+def read_manifest(path):
+    """Các record của manifest, source_path đã đổi thành đường dẫn tuyệt đối."""
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+    records = manifest["records"]
+    for record in records:
+        record["source_path"] = os.path.normpath(os.path.join(base, record["source_path"]))
+    return records
+
+
+_open_manifests = {}
+_open_manifests_lock = threading.Lock()
+
+
+def open_manifest(path):
+    """
+    {tên ảnh: source_path} của manifest theo thứ tự ghi, dùng chung trong process (đọc lại nếu file đã bị ghi đè).
+    Trang được gán cho nhiều label xuất hiện một lần cho mỗi label.
+    """
+    path = os.path.abspath(path)
+    mtime = os.stat(path).st_mtime_ns
+    with _open_manifests_lock:
+        cached = _open_manifests.get(path)
+        if cached is None or cached[0] != mtime:
+            images = {image_name(record): record["source_path"] for record in read_manifest(path)}
+            cached = _open_manifests[path] = (mtime, images)
+    return cached[1]
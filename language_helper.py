@@ -1,7 +1,26 @@
+import os
 import re
-from fuzzywuzzy import fuzz
+import sys
+import mmap
+import struct
+from array import array
+from bisect import bisect_left
 from unicodedata import normalize
 
+READING_TABLE_ENV = "HAN_VIET_TABLE"
+READING_INDEX_MAGIC = b"HVIDX001"
+_READING_HEADER = struct.Struct("<8sII")
+_fuzz = None
+
+
+def _get_fuzz():
+    # fuzzywuzzy chỉ được import khi thật sự cần (import chậm, không cần cho các hàm khác)
+    global _fuzz
+    if _fuzz is None:
+        from fuzzywuzzy import fuzz
+        _fuzz = fuzz
+    return _fuzz
+
 
 def percentage_similarity(text1: str, text2: str) -> float:
     """
@@ -18,7 +37,7 @@ def percentage_similarity(text1: str, text2: str) -> float:
         text2 = preprocess_text(text2)
 
         # Sử dụng fuzz.token_set_ratio để đo độ tương đồng
-        return fuzz.token_set_ratio(text1, text2)
+        return _get_fuzz().token_set_ratio(text1, text2)
     except Exception as e:
         print(f"Error in percentage_similarity_tokens: {e}")
         return 0.0
@@ -90,23 +109,26 @@ def is_uppercase(line: str) -> bool:
         print(f"Error in is_uppercase: {e}")
         return False
 
+
+_DIGITS = re.compile(r'\d+')
+# Các bước sửa dấu câu cũ (r'\s,', r'\s\.', r'\s\?', r'\s!', r"\s'", r'\s-', r'-\s') chạy sau khi đã gộp khoảng trắng
+# nên chỉ còn là xóa một dấu cách đứng trước , . ? ! ' - hoặc đứng sau -: gộp thành một lần thay thế
+_PUNCTUATION_SPACE = re.compile(r" (?=[,.?!'-])|(?<=-) ")
+PARALLEL_MIN_SENTENCES = 20000
+
+
 def clean_sentence(sentence: str) -> str:
     """
     Làm sạch câu bằng cách loại bỏ ký tự không cần thiết, xử lý dấu câu và ký tự đặc biệt.
     """
     try:
-        sentence = normalize('NFC', sentence)
-        sentence = re.sub(r'\d+', '', sentence)  # Loại bỏ số
-        sentence = re.sub(r'\s+', ' ', sentence)  # Loại bỏ khoảng trắng thừa
-        sentence = sentence.strip()
+        sentence = _DIGITS.sub('', normalize('NFC', sentence))  # Loại bỏ số
+        # Loại bỏ khoảng trắng thừa: str.split() tách theo cùng tập ký tự với r'\s'
+        sentence = ' '.join(sentence.split())
 
         # Sửa lỗi dấu câu
-        punctuation_fixes = [
-            (r'\s,', ','), (r'\s\.', '.'), (r'\s\?', '?'), (r'\s!', '!'),
-            (r"\s'", "'"), (r'\s-', '-'), (r'-\s', '-')
-        ]
-        for pattern, replacement in punctuation_fixes:
-            sentence = re.sub(pattern, replacement, sentence)
+        if ' ' in sentence:
+            sentence = _PUNCTUATION_SPACE.sub('', sentence)
 
         # Xử lý cặp ngoặc không hợp lệ
         if sentence.count('(') != sentence.count(')') or sentence.count('"') % 2 != 0:
@@ -117,3 +139,217 @@ def clean_sentence(sentence: str) -> str:
     except Exception as e:
         print(f"Error in clean_sentence: {e}")
         return sentence
+
+
+def clean_sentences(sentences, workers=1):
+    """
+    clean_sentence cho cả list câu, giữ nguyên thứ tự.
+    :param workers: Số process (None: cpu_count()); list ngắn hơn PARALLEL_MIN_SENTENCES luôn chạy tuần tự vì
+                    chi phí khởi động pool lớn hơn phần tiết kiệm được.
+    """
+    sentences = list(sentences)
+    if workers == 1 or len(sentences) < PARALLEL_MIN_SENTENCES:
+        return [clean_sentence(sentence) for sentence in sentences]
+    from multiprocessing import Pool, cpu_count
+    with Pool(processes=workers or cpu_count()) as pool:
+        return pool.map(clean_sentence, sentences, chunksize=4096)
+
+
+def _parse_reading_table(table_path):
+    """
+    Đọc bảng âm Hán-Việt do người dùng cung cấp, mỗi dòng: `chữ<TAB>âm1,âm2,...`
+    (chữ có thể viết dạng U+XXXX; các âm có thể cách nhau bằng dấu phẩy hoặc khoảng trắng).
+    """
+    readings = {}
+    with open(table_path, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            parts = re.split(r"[\s,;]+", line)
+            char = parts[0]
+            if char.upper().startswith("U+"):
+                codepoint = int(char[2:], 16)
+            elif len(char) == 1:
+                codepoint = ord(char)
+            else:
+                continue
+            values = readings.setdefault(codepoint, [])
+            for reading in parts[1:]:
+                reading = normalize('NFC', reading.lower())
+                if reading and reading not in values:
+                    values.append(reading)
+    return readings
+
+
+def build_reading_index(table_path, index_path):
+    """
+    Biên dịch bảng âm Hán-Việt thành file index nhị phân:
+    header | codepoints (uint32, đã sắp xếp) | offsets (uint32) | các âm (utf-8, cách nhau bằng tab).
+    Mọi số nguyên là little-endian như header.
+    """
+    readings = _parse_reading_table(table_path)
+    codepoints = array("I", sorted(readings))
+    offsets = array("I")
+    blob = bytearray()
+    for codepoint in codepoints:
+        offsets.append(len(blob))
+        blob.extend("\t".join(readings[codepoint]).encode("utf-8"))
+    offsets.append(len(blob))
+    if sys.byteorder == "big":
+        codepoints.byteswap()
+        offsets.byteswap()
+
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "wb") as file:
+        file.write(_READING_HEADER.pack(READING_INDEX_MAGIC, len(codepoints), len(blob)))
+        file.write(codepoints.tobytes())
+        file.write(offsets.tobytes())
+        file.write(blob)
+    os.replace(tmp_path, index_path)
+
+
+def _uint32_le(view):
+    # Mảng uint32 little-endian trong file index: đọc thẳng từ mmap, trừ máy big-endian (copy rồi đảo byte)
+    if sys.byteorder == "little":
+        return view.cast("I")
+    values = array("I", bytes(view))
+    values.byteswap()
+    return values
+
+
+class ReadingIndex:
+    """
+    Index chữ Hán -> danh sách âm Hán-Việt, đọc trực tiếp từ file index qua mmap.
+    """
+    def __init__(self, index_path):
+        self.index_path = index_path
+        self._file = open(index_path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, blob_length = _READING_HEADER.unpack_from(self._mmap, 0)
+        if magic != READING_INDEX_MAGIC:
+            raise ValueError(f"Invalid reading index: {index_path}")
+
+        view = memoryview(self._mmap)
+        start = _READING_HEADER.size
+        self._codepoints = _uint32_le(view[start:start + 4 * count])
+        start += 4 * count
+        self._offsets = _uint32_le(view[start:start + 4 * (count + 1)])
+        start += 4 * (count + 1)
+        self._blob = view[start:start + blob_length]
+        self._cache = {}
+
+    def __len__(self):
+        return len(self._codepoints)
+
+    def readings(self, char):
+        """Trả về tập các âm Hán-Việt của một chữ (rỗng nếu không có trong bảng)."""
+        codepoint = ord(char)
+        cached = self._cache.get(codepoint)
+        if cached is not None:
+            return cached
+
+        position = bisect_left(self._codepoints, codepoint)
+        if position < len(self._codepoints) and self._codepoints[position] == codepoint:
+            start, end = self._offsets[position], self._offsets[position + 1]
+            result = frozenset(bytes(self._blob[start:end]).decode("utf-8").split("\t"))
+        else:
+            result = frozenset()
+        self._cache[codepoint] = result
+        return result
+
+    def close(self):
+        self._cache.clear()
+        for values in (self._codepoints, self._offsets):
+            if isinstance(values, memoryview):
+                values.release()
+        self._blob.release()
+        self._mmap.close()
+        self._file.close()
+
+
+_reading_index = None
+_reading_index_failed = False  # Nạp từ HAN_VIET_TABLE đã lỗi: không thử lại ở mỗi lần gọi
+
+
+def load_reading_index(table_path, index_path=None):
+    """
+    Nạp bảng âm Hán-Việt (biên dịch lại file index nếu chưa có hoặc cũ hơn bảng) và dùng làm index mặc định.
+    """
+    global _reading_index
+    index_path = index_path or os.path.splitext(table_path)[0] + ".hvidx"
+    if not os.path.exists(index_path) or os.path.getmtime(index_path) < os.path.getmtime(table_path):
+        build_reading_index(table_path, index_path)
+    _reading_index = ReadingIndex(index_path)
+    return _reading_index
+
+
+def get_reading_index():
+    """
+    Trả về index âm Hán-Việt mặc định, tự nạp từ biến môi trường HAN_VIET_TABLE nếu có (None nếu không).
+    """
+    global _reading_index_failed
+    if _reading_index is None and not _reading_index_failed and os.environ.get(READING_TABLE_ENV):
+        try:
+            load_reading_index(os.environ[READING_TABLE_ENV])
+        except Exception as e:
+            print(f"Error in get_reading_index: {e}")
+            _reading_index_failed = True
+    return _reading_index
+
+
+_han_char_pattern = re.compile(r'[\u4e00-\u9fff]')
+_non_word_pattern = re.compile(r'[^\w\s]')
+
+
+def _viet_syllables(viet_line):
+    return _non_word_pattern.sub(' ', normalize('NFC', viet_line).lower()).split()
+
+
+def _match_score(han_chars, syllables, index):
+    total = max(len(han_chars), len(syllables))
+    if total == 0:
+        return 0.0
+    readings = index.readings
+    matches = sum(1 for char, syllable in zip(han_chars, syllables) if syllable in readings(char))
+    return round(matches / total * 100, 2)
+
+
+def reading_match_score(han_line: str, viet_line: str, index=None) -> float:
+    """
+    Tính phần trăm chữ Hán trong dòng có âm Hán-Việt khớp với âm tiết cùng vị trí trong dòng phiên âm.
+    """
+    try:
+        index = index or get_reading_index()
+        if index is None:
+            return 0.0
+        return _match_score(_han_char_pattern.findall(han_line), _viet_syllables(viet_line), index)
+    except Exception as e:
+        print(f"Error in reading_match_score: {e}")
+        return 0.0
+
+
+def reading_match_scores(pairs, index=None) -> list:
+    """
+    Phiên bản batch của reading_match_score cho list các cặp (han_line, viet_line).
+    Mỗi dòng chỉ được tách chữ/âm tiết một lần dù xuất hiện trong nhiều cặp.
+    """
+    try:
+        index = index or get_reading_index()
+        if index is None:
+            return [0.0] * len(pairs)
+        han_cache = {}
+        viet_cache = {}
+        scores = []
+        for han_line, viet_line in pairs:
+            han_chars = han_cache.get(han_line)
+            if han_chars is None:
+                han_chars = han_cache[han_line] = _han_char_pattern.findall(han_line)
+            syllables = viet_cache.get(viet_line)
+            if syllables is None:
+                syllables = viet_cache[viet_line] = _viet_syllables(viet_line)
+            scores.append(_match_score(han_chars, syllables, index))
+        return scores
+    except Exception as e:
+        print(f"Error in reading_match_scores: {e}")
+        return [0.0] * len(pairs)
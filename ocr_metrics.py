@@ -0,0 +1,146 @@
+"""
+Số liệu thông lượng và chi phí của bước OCR (ocr_runner.py).
+
+Mỗi request OCR (một ảnh hoặc một mosaic, tính cả các lần retry) được ghi lại: thời gian của lần gọi thành công,
+số bytes upload, số lần retry, số lần bị rate limit (429), thời gian ngủ chờ retry, có lấy từ cache (--resume)
+hay không và số dòng trả về. Trong lúc chạy, một dòng tóm tắt (trang/phút, p50/p95 latency, mức dùng quota)
+được in định kỳ; khi xong, toàn bộ được ghi ra file metrics JSON:
+    {"summary": {...}, "requests": [{"name", "pages", "bytes", "latency", "attempts", "retries", "rate_limited",
+                                     "backoff", "cache_hit", "lines", "ok", "start"}, ...]}
+
+Dùng để quyết định nên tăng song song, giảm kích thước ảnh (--preprocess) hay ghép mosaic (--batch):
+    busy_percent     % thời gian chờ response của OCR; thấp nghĩa là tiền xử lý/đọc ảnh đang là nút thắt
+    backoff_percent  % thời gian ngủ chờ retry; cao nghĩa là đang chạm rate limit
+    quota_percent    số lần gọi mỗi phút so với quota (--quota-per-minute) của gói dịch vụ
+
+Usage (xem lại file metrics):
+    python ocr_metrics.py ocr_results_metrics.json
+"""
+import json
+import time
+import argparse
+import threading
+
+LIVE_INTERVAL = 15.0  # Giây giữa hai dòng tóm tắt trong lúc chạy
+
+
+def _percentile(values, fraction):
+    # Giống ocr_preprocess.summarize: phần tử thứ int(n * fraction) của dãy đã sắp xếp
+    return values[min(len(values) - 1, int(len(values) * fraction))] if values else 0.0
+
+
+class OcrMetrics:
+    """Số liệu của từng request OCR và tóm tắt của cả lần chạy. An toàn khi dùng từ nhiều thread."""
+    def __init__(self, quota_per_minute=None, interval=LIVE_INTERVAL):
+        self.quota_per_minute = quota_per_minute
+        self.interval = interval
+        self.requests = []
+        self.pages_done = 0
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self._last_report = self._start
+
+    def add_request(self, name, pages, payload_bytes, latency, attempts, rate_limited=0, backoff=0.0, lines=0,
+                    ok=True, cache_hit=False):
+        """
+        Ghi một request (ảnh hoặc mosaic).
+        :param latency: Tổng số giây của mọi lần gọi backend (kể cả lần lỗi và 429), không tính backoff.
+        :param attempts: Số lần gọi backend (0 nếu lấy từ cache).
+        :param backoff: Tổng số giây ngủ chờ giữa các lần retry.
+        """
+        with self._lock:
+            self.requests.append({
+                "name": str(name), "pages": pages, "bytes": payload_bytes, "latency": latency, "attempts": attempts,
+                "retries": max(attempts - 1, 0), "rate_limited": rate_limited, "backoff": backoff,
+                "cache_hit": cache_hit, "lines": lines, "ok": ok, "start": time.perf_counter() - self._start
+            })
+
+    def add_cache_hit(self, name, pages=1):
+        """Trang đã có kết quả (không gửi request)."""
+        self.add_request(name, pages, 0, 0.0, 0, cache_hit=True)
+
+    def page_done(self, count=1):
+        with self._lock:
+            self.pages_done += count
+
+    def summary(self):
+        """Dict tóm tắt: số trang/request, trang/phút, latency p50/p95, retry, 429, thời gian chờ, quota, ..."""
+        with self._lock:
+            requests = list(self.requests)
+            pages_done = self.pages_done
+        elapsed = time.perf_counter() - self._start
+        minutes = elapsed / 60
+        sent = [request for request in requests if not request["cache_hit"]]
+        latencies = sorted(request["latency"] for request in sent if request["ok"])
+        calls = sum(request["attempts"] for request in sent)
+        busy = sum(request["latency"] for request in sent)
+        backoff = sum(request["backoff"] for request in sent)
+        calls_per_minute = calls / minutes if minutes else 0.0
+        return {
+            "seconds": elapsed,
+            "pages": pages_done,
+            "requests": len(sent),
+            "calls": calls,
+            "failed": sum(1 for request in sent if not request["ok"]),
+            "retries": sum(request["retries"] for request in sent),
+            "rate_limited": sum(request["rate_limited"] for request in sent),
+            "cache_hits": sum(request["pages"] for request in requests if request["cache_hit"]),
+            "upload_bytes": sum(request["bytes"] * request["attempts"] for request in sent),
+            "lines": sum(request["lines"] for request in sent),
+            "pages_per_minute": pages_done / minutes if minutes else 0.0,
+            "calls_per_minute": calls_per_minute,
+            "p50_ms": 1000 * _percentile(latencies, 0.5),
+            "p95_ms": 1000 * _percentile(latencies, 0.95),
+            "max_ms": 1000 * latencies[-1] if latencies else 0.0,
+            "backoff_seconds": backoff,
+            "busy_percent": 100 * busy / elapsed if elapsed else 0.0,
+            "backoff_percent": 100 * backoff / elapsed if elapsed else 0.0,
+            "quota_percent": 100 * calls_per_minute / self.quota_per_minute if self.quota_per_minute else None
+        }
+
+    def maybe_report(self, force=False):
+        """In dòng tóm tắt nếu đã quá interval giây kể từ lần in trước (hoặc force)."""
+        now = time.perf_counter()
+        if not force and now - self._last_report < self.interval:
+            return
+        self._last_report = now
+        print(format_summary(self.summary()))
+
+    def write(self, path):
+        """Ghi tóm tắt và số liệu từng request ra file JSON; trả về tóm tắt."""
+        summary = self.summary()
+        with self._lock:
+            requests = list(self.requests)
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"summary": summary, "requests": requests}, file, ensure_ascii=False, indent=1)
+        return summary
+
+
+def format_summary(summary):
+    """Một dòng tóm tắt của OcrMetrics.summary()."""
+    quota = f", quota {summary['quota_percent']:.0f}%" if summary.get("quota_percent") is not None else ""
+    return (f"[OCR] {summary['pages']} pages, {summary['pages_per_minute']:.1f} pages/min, "
+            f"{summary['requests']} requests (p50 {summary['p50_ms']:.0f} ms, p95 {summary['p95_ms']:.0f} ms), "
+            f"{summary['retries']} retries ({summary['rate_limited']} rate limited, "
+            f"{summary['backoff_seconds']:.0f} s backoff = {summary['backoff_percent']:.0f}%), "
+            f"busy {summary['busy_percent']:.0f}%, {summary['upload_bytes'] / 2 ** 20:.2f} MB uploaded, "
+            f"{summary['cache_hits']} cached{quota}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize an OCR metrics file written by ocr_runner.py.")
+    parser.add_argument("metrics", help="Metrics JSON file.")
+    parser.add_argument("--slowest", type=int, default=5, help="Number of slowest requests to list.")
+    args = parser.parse_args()
+
+    with open(args.metrics, "r", encoding="utf-8") as file:
+        metrics = json.load(file)
+    print(format_summary(metrics["summary"]))
+    slowest = sorted((r for r in metrics["requests"] if not r["cache_hit"]), key=lambda r: r["latency"], reverse=True)
+    for request in slowest[:args.slowest]:
+        print(f"  {request['latency'] * 1000:8.0f} ms  {request['bytes'] / 1024:8.1f} KB  "
+              f"{request['retries']} retries  {request['lines']:4d} lines  {request['name']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""
+Tiền xử lý ảnh trước khi OCR: chuyển grayscale, (tùy chọn) nhị phân hóa / chỉnh nghiêng, giảm độ phân giải
+và encode gọn để giảm dung lượng upload. Chạy song song bằng process pool.
+
+Usage:
+    python ocr_preprocess.py "IMAGE DIDDY" [--max-side 2400] [--binarize] [--deskew] [--sample 20]
+
+In ra tổng dung lượng trước/sau, thời gian xử lý mỗi ảnh và (với --sample) so sánh kết quả OCR có/không
+tiền xử lý trên một mẫu ảnh bằng backend local (ocr_runner.FakeBackend). Dùng trong OCR bằng
+`python ocr_runner.py ... --preprocess`.
+"""
+import io
+import os
+import math
+import time
+import argparse
+from difflib import SequenceMatcher
+from multiprocessing import Pool, cpu_count
+from page_pack import read_page, page_name
+
+DEFAULT_MAX_SIDE = 2400
+DEFAULT_JPEG_QUALITY = 85
+MAX_SKEW_ANGLE = 5.0
+SKEW_STEP = 0.25
+SKEW_PROBE_SIDE = 800
+
+
+def otsu_threshold(image):
+    """Ngưỡng Otsu từ histogram của ảnh grayscale."""
+    histogram = image.histogram()[:256]
+    total = sum(histogram)
+    sum_all = sum(value * count for value, count in enumerate(histogram))
+    sum_background = weight_background = 0
+    best_threshold, best_variance = 127, -1.0
+    for value, count in enumerate(histogram):
+        weight_background += count
+        if weight_background == 0:
+            continue
+        weight_foreground = total - weight_background
+        if weight_foreground == 0:
+            break
+        sum_background += value * count
+        mean_background = sum_background / weight_background
+        mean_foreground = (sum_all - sum_background) / weight_foreground
+        variance = weight_background * weight_foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = value, variance
+    return best_threshold
+
+
+def estimate_skew(image, max_angle=MAX_SKEW_ANGLE, step=SKEW_STEP):
+    """
+    Ước lượng góc nghiêng (độ, ngược chiều kim đồng hồ) của ảnh grayscale bằng projection profile:
+    góc làm cho tổng theo hàng có phương sai lớn nhất (các dòng chữ nằm ngang).
+    """
+    from PIL import Image
+
+    probe = image.copy()
+    probe.thumbnail((SKEW_PROBE_SIDE, SKEW_PROBE_SIDE))
+    threshold = otsu_threshold(probe)
+    # Chữ -> 255, nền -> 0
+    probe = probe.point(lambda value: 255 if value <= threshold else 0)
+
+    best_angle, best_score = 0.0, -1.0
+    steps = int(round(max_angle / step))
+    for i in range(-steps, steps + 1):
+        angle = i * step
+        rotated = probe.rotate(angle, resample=Image.NEAREST, fillcolor=0)
+        profile = rotated.resize((1, rotated.height), Image.BOX).tobytes()
+        mean = sum(profile) / len(profile)
+        score = sum((value - mean) ** 2 for value in profile)
+        if score > best_score:
+            best_angle, best_score = angle, score
+    return best_angle
+
+
+def preprocess_image(image_data, max_side=DEFAULT_MAX_SIDE, binarize=False, deskew=False,
+                     image_format=None, quality=DEFAULT_JPEG_QUALITY):
+    """
+    Tiền xử lý một ảnh (bytes).
+    :param max_side: Cạnh dài nhất sau khi giảm độ phân giải (None: giữ nguyên).
+    :param binarize: Nhị phân hóa bằng ngưỡng Otsu (encode PNG 1-bit).
+    :param deskew: Xoay lại ảnh theo góc nghiêng ước lượng.
+    :param image_format: "PNG" hoặc "JPEG" (mặc định: PNG khi nhị phân hóa, JPEG khi không).
+    :return: (bytes đã encode, info) với info chứa original_size, size, scale, angle để đổi tọa độ OCR về ảnh gốc.
+        Nếu không giảm độ phân giải, không xoay mà bytes encode lại không nhỏ hơn ảnh gốc thì trả về bytes gốc
+        (scale 1, angle 0).
+    """
+    from PIL import Image
+
+    image = Image.open(io.BytesIO(image_data))
+    original_size = image.size
+    image = image.convert("L")
+
+    resized = bool(max_side and max(image.size) > max_side)
+    if resized:
+        ratio = max_side / max(image.size)
+        image = image.resize((max(1, round(image.width * ratio)), max(1, round(image.height * ratio))), Image.LANCZOS)
+
+    angle = estimate_skew(image) if deskew else 0.0
+    if angle:
+        image = image.rotate(angle, resample=Image.BICUBIC, fillcolor=255)
+
+    if binarize:
+        threshold = otsu_threshold(image)
+        image = image.point(lambda value: 255 if value > threshold else 0).convert("1")
+
+    image_format = (image_format or ("PNG" if binarize else "JPEG")).upper()
+    buffer = io.BytesIO()
+    if image_format == "JPEG":
+        image.save(buffer, format="JPEG", quality=quality, optimize=True)
+    else:
+        image.save(buffer, format=image_format, optimize=True)
+
+    if not resized and not angle and buffer.tell() >= len(image_data):
+        return bytes(image_data), {"original_size": original_size, "size": original_size, "scale": (1.0, 1.0),
+                                   "angle": 0.0}
+
+    info = {
+        "original_size": original_size,
+        "size": image.size,
+        "scale": (image.width / original_size[0], image.height / original_size[1]),
+        "angle": angle
+    }
+    return buffer.getvalue(), info
+
+
+def restore_polygon(polygon, info):
+    """Đổi tọa độ polygon trên ảnh đã tiền xử lý về tọa độ ảnh gốc (xoay ngược rồi chia tỉ lệ)."""
+    scale_x, scale_y = info["scale"]
+    center_x, center_y = info["size"][0] / 2, info["size"][1] / 2
+    theta = math.radians(info["angle"])
+    cos, sin = math.cos(theta), math.sin(theta)
+    restored = []
+    for x, y in polygon:
+        dx, dy = x - center_x, y - center_y
+        x, y = center_x + dx * cos - dy * sin, center_y + dx * sin + dy * cos
+        restored.append([round(x / scale_x), round(y / scale_y)])
+    return restored
+
+
+def restore_result(ocr, info):
+    """Đổi toàn bộ boundingPolygon (dòng và từ) của kết quả OCR về tọa độ ảnh gốc."""
+    lines = []
+    for line in ocr.get("lines", []):
+        line = dict(line, boundingPolygon=restore_polygon(line["boundingPolygon"], info))
+        if "words" in line:
+            line["words"] = [dict(word, boundingPolygon=restore_polygon(word["boundingPolygon"], info)) for word in line["words"]]
+        lines.append(line)
+    return dict(ocr, lines=lines)
+
+
+def _preprocess_file(args):
+    """Chạy trong process con: đọc file, tiền xử lý và trả về (path, bytes, info)."""
+    path, options = args
+    start = time.perf_counter()
+    try:
+        image_data = read_page(path)
+        data, info = preprocess_image(image_data, **options)
+    except Exception as e:
+        print(f"Error preprocessing {path}: {e}")
+        return path, None, None
+    info["original_bytes"] = len(image_data)
+    info["bytes"] = len(data)
+    info["seconds"] = time.perf_counter() - start
+    return path, data, info
+
+
+def preprocess_files(paths, workers=None, **options):
+    """
+    Tiền xử lý song song các file ảnh, trả về iterator (path, bytes, info) theo đúng thứ tự paths
+    (bytes/info là None nếu lỗi). Có thể dùng ngay trong khi các ảnh sau vẫn đang được xử lý.
+    """
+    tasks = [(path, options) for path in paths]
+    workers = workers or cpu_count()
+    if workers <= 1:
+        for task in tasks:
+            yield _preprocess_file(task)
+        return
+    with Pool(processes=workers) as pool:
+        yield from pool.imap(_preprocess_file, tasks, chunksize=4)
+
+
+def summarize(infos):
+    """Thống kê dung lượng và thời gian từ list info của preprocess_files."""
+    infos = [info for info in infos if info]
+    if not infos:
+        return {"images": 0}
+    seconds = sorted(info["seconds"] for info in infos)
+    original_bytes = sum(info["original_bytes"] for info in infos)
+    new_bytes = sum(info["bytes"] for info in infos)
+    return {
+        "images": len(infos),
+        "original_bytes": original_bytes,
+        "bytes": new_bytes,
+        "saved_percent": 100 * (1 - new_bytes / original_bytes) if original_bytes else 0.0,
+        "mean_ms": 1000 * sum(seconds) / len(seconds),
+        "p95_ms": 1000 * seconds[min(len(seconds) - 1, int(len(seconds) * 0.95))]
+    }
+
+
+def _box(polygon):
+    xs = [point[0] for point in polygon]
+    ys = [point[1] for point in polygon]
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def _iou(first, second):
+    x0, y0 = max(first[0], second[0]), max(first[1], second[1])
+    x1, y1 = min(first[2], second[2]), min(first[3], second[3])
+    intersection = max(0, x1 - x0) * max(0, y1 - y0)
+    union = (first[2] - first[0]) * (first[3] - first[1]) + (second[2] - second[0]) * (second[3] - second[1]) - intersection
+    return intersection / union if union else 0.0
+
+
+def compare_results(reference, candidate, min_iou=0.5):
+    """
+    So sánh hai kết quả OCR của cùng một ảnh (tọa độ ảnh gốc): tỉ lệ dòng của reference tìm được dòng
+    tương ứng (IoU >= min_iou) trong candidate, và độ giống text trung bình của các cặp dòng đó.
+    """
+    reference_lines = reference.get("lines", [])
+    candidate_boxes = [(_box(line["boundingPolygon"]), line["text"]) for line in candidate.get("lines", [])]
+    matched, similarity = 0, 0.0
+    for line in reference_lines:
+        box = _box(line["boundingPolygon"])
+        best = max(candidate_boxes, key=lambda item: _iou(box, item[0]), default=None)
+        if best is not None and _iou(box, best[0]) >= min_iou:
+            matched += 1
+            similarity += SequenceMatcher(None, line["text"], best[1]).ratio()
+    return {
+        "lines": len(reference_lines),
+        "recall": matched / len(reference_lines) if reference_lines else 1.0,
+        "text_similarity": similarity / matched if matched else 0.0
+    }
+
+
+def compare_quality(paths, backend, **options):
+    """
+    OCR một mẫu ảnh có và không tiền xử lý rồi so sánh (compare_results), trả về trung bình trên mẫu.
+    Lưu ý: FakeBackend trả về kích thước pixel làm text nên text_similarity chỉ có ý nghĩa với OCR thật.
+    """
+    reports = []
+    for path, data, info in preprocess_files(paths, workers=1, **options):
+        if data is None:
+            continue
+        reference = backend.analyze(read_page(path))
+        candidate = restore_result(backend.analyze(data), info)
+        reports.append(compare_results(reference, candidate))
+    if not reports:
+        return {}
+    return {
+        "images": len(reports),
+        "recall": sum(report["recall"] for report in reports) / len(reports),
+        "text_similarity": sum(report["text_similarity"] for report in reports) / len(reports)
+    }
+
+
+def main():
+    from ocr_runner import get_sorted_image_list, FakeBackend
+
+    parser = argparse.ArgumentParser(description="Preprocess page images before OCR and report the savings.")
+    parser.add_argument("image_dir", help="Folder of page images.")
+    parser.add_argument("--max-side", type=int, default=DEFAULT_MAX_SIDE, help="Longest side after downsampling (0: keep).")
+    parser.add_argument("--binarize", action="store_true", help="Otsu binarization (1-bit PNG).")
+    parser.add_argument("--deskew", action="store_true", help="Estimate and correct page skew.")
+    parser.add_argument("--format", choices=["PNG", "JPEG"], default=None, help="Output encoding.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes.")
+    parser.add_argument("--sample", type=int, default=0, help="Compare OCR output on this many images (fake backend).")
+    parser.add_argument("-o", "--output-dir", default=None, help="Also write the preprocessed images here.")
+    args = parser.parse_args()
+
+    options = {"max_side": args.max_side or None, "binarize": args.binarize, "deskew": args.deskew,
+               "image_format": args.format}
+    paths = get_sorted_image_list(args.image_dir)
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    infos = []
+    for path, data, info in preprocess_files(paths, workers=args.workers, **options):
+        infos.append(info)
+        if args.output_dir and data is not None:
+            extension = ".png" if data.startswith(b"\x89PNG") else ".jpg"
+            name = page_name(path) + extension
+            with open(os.path.join(args.output_dir, name), "wb") as f:
+                f.write(data)
+
+    summary = summarize(infos)
+    if summary["images"]:
+        print(f"{summary['images']} images: {summary['original_bytes'] / 2 ** 20:.1f} MB -> {summary['bytes'] / 2 ** 20:.2f} MB "
+              f"({summary['saved_percent']:.1f}% saved), {summary['mean_ms']:.0f} ms/image (p95 {summary['p95_ms']:.0f} ms)")
+
+    if args.sample:
+        quality = compare_quality(paths[:args.sample], FakeBackend(), **options)
+        if quality:
+            print(f"OCR on {quality['images']} sample images: line recall {quality['recall']:.3f}, "
+                  f"text similarity {quality['text_similarity']:.3f} (vs. unprocessed)")
+
+
+if __name__ == "__main__":
+    main()
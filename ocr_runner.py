@@ -0,0 +1,626 @@
+"""
+Chạy OCR cho thư mục ảnh (tách từ demo_azure_ocr.ipynb) và lưu kết quả JSON cho align_GUI.
+
+Usage:
+    python ocr_runner.py "IMAGE DIDDY" -o ocr_results.json [--backend azure|fake] [--batch] [--canvas 4096]
+
+Thư mục ảnh có thể thay bằng một file .pack chứa các trang đã gán nhãn (xem page_pack.py), hoặc manifest gán
+nhãn labels_manifest.json do label_GUI ghi ra (file manifest hoặc thư mục chứa nó, xem label_manifest.py).
+
+Backend "azure" cần `pip install azure-ai-vision-imageanalysis` và biến môi trường AZURE_VISION_ENDPOINT /
+AZURE_VISION_KEY. Backend "fake" chạy local (chỉ cần Pillow): mỗi hình chữ nhật tối màu trong ảnh được trả về
+thành một dòng có text "WxH", dùng để kiểm thử.
+
+Với --preprocess, ảnh được chuyển grayscale, giảm độ phân giải (và tùy chọn --binarize/--deskew) song song
+trong process pool trước khi upload (xem ocr_preprocess.py); tọa độ trả về được đổi lại theo ảnh gốc.
+
+Chế độ --batch ghép nhiều ảnh nhỏ vào một canvas (mosaic) và gửi một request, sau đó tách các dòng về ảnh
+gốc theo tâm của boundingPolygon và trừ lại tọa độ. Record giữ nguyên dạng
+{"image_name", "label_name", "page_index", "label_index", "result": {"lines": [...]}}.
+
+Với --stream out.jsonl, mỗi record được ghi thêm thành một dòng JSON ngay khi ảnh OCR xong (với --batch: khi
+cả lô xong) để align_GUI ("Follow OCR Stream") duyệt các label đã đủ trang trong khi OCR vẫn đang chạy.
+
+Với --slim, kết quả được ghi theo schema rút gọn (text + polygon của dòng dạng mảng int16 base64, thêm dữ liệu
+từng từ nếu có --words), xem ocr_schema.py.
+
+Số liệu từng request (latency, bytes, retry, thời gian chờ, số dòng) được tóm tắt định kỳ trong lúc chạy và ghi ra
+<output>_metrics.json (đổi bằng --metrics), xem ocr_metrics.py. Với --resume, các ảnh đã có trong file kết quả
+được bỏ qua (tính là cache hit).
+"""
+import io
+import os
+import json
+import time
+import argparse
+from random import randint
+from page_pack import is_pack, open_pack, page_ref, page_name, read_page
+from label_manifest import is_manifest, find_manifest, open_manifest, manifest_ref
+from ocr_schema import slim_result
+from ocr_metrics import OcrMetrics, format_summary
+
+MAX_RETRIES = 5
+RATE_LIMIT_WAIT = 10
+# Giới hạn của Azure Image Analysis 4.0: file < 20 MB, mỗi cạnh 50..16000 px
+MAX_REQUEST_BYTES = 20 * 1024 * 1024
+MAX_IMAGE_SIDE = 16000
+MIN_IMAGE_SIDE = 50
+DEFAULT_CANVAS_SIZE = 4096
+TILE_PADDING = 64
+IMAGE_EXTENSIONS = ('.jpg', '.png', '.jpeg', '.bmp')
+
+
+class AzureBackend:
+    """OCR bằng Azure Image Analysis (READ), giống ocr_result trong notebook."""
+    def __init__(self, endpoint=None, key=None):
+        from azure.ai.vision.imageanalysis import ImageAnalysisClient
+        from azure.ai.vision.imageanalysis.models import VisualFeatures
+        from azure.core.credentials import AzureKeyCredential
+
+        endpoint = endpoint or os.environ.get("AZURE_VISION_ENDPOINT", "")
+        key = key or os.environ.get("AZURE_VISION_KEY", "")
+        self.client = ImageAnalysisClient(endpoint=endpoint, credential=AzureKeyCredential(key))
+        self.visual_features = [VisualFeatures.READ]
+
+    def analyze(self, image_data):
+        result = self.client.analyze(
+            image_data=bytes(image_data),  # SDK cần bytes; trang trong pack là memoryview
+            visual_features=self.visual_features,
+            smart_crops_aspect_ratios=[0.9, 1.33],
+            gender_neutral_caption=True,
+            language="en"
+        )
+        if not result.read or not result.read.blocks:
+            return {"lines": []}
+        block = result.read.blocks[0].as_dict()
+        # Chuyển đổi boundingPolygon thành list[list]
+        for line in block.get("lines", []):
+            line["boundingPolygon"] = convert_bounding_polygon(line["boundingPolygon"])
+            for word in line.get("words", []):
+                word["boundingPolygon"] = convert_bounding_polygon(word["boundingPolygon"])
+        return block
+
+
+class FakeBackend:
+    """
+    Backend OCR giả lập chạy local: tìm các hình chữ nhật tối màu (XY-cut trên ảnh nhị phân) và trả về mỗi
+    hình một dòng có text "WxH" cùng boundingPolygon, theo thứ tự từ trên xuống, trái sang phải.
+    """
+    def __init__(self, threshold=128, latency=0.0):
+        self.threshold = threshold
+        self.latency = latency
+
+    def analyze(self, image_data):
+        from PIL import Image
+
+        if self.latency:
+            time.sleep(self.latency)
+        image = Image.open(io.BytesIO(image_data)).convert("L")
+        # Điểm tối -> 255, điểm sáng -> 0
+        binary = image.point(lambda value: 255 if value < self.threshold else 0)
+        width, height = binary.size
+        rows = binary.tobytes()
+        columns = binary.transpose(Image.TRANSPOSE).tobytes()
+
+        lines = []
+        for x0, y0, x1, y1 in _dark_boxes(rows, columns, width, height, (0, 0, width, height)):
+            polygon = [[x0, y0], [x1, y0], [x1, y1], [x0, y1]]
+            text = f"{x1 - x0}x{y1 - y0}"
+            lines.append({
+                "text": text,
+                "boundingPolygon": polygon,
+                "words": [{"text": text, "boundingPolygon": [list(point) for point in polygon], "confidence": 1.0}]
+            })
+        return {"lines": lines}
+
+
+def _runs(positions):
+    # Gom các vị trí liên tiếp thành các khoảng [start, end)
+    runs = []
+    for position in positions:
+        if runs and position == runs[-1][1]:
+            runs[-1][1] = position + 1
+        else:
+            runs.append([position, position + 1])
+    return runs
+
+
+def _dark_boxes(rows, columns, width, height, box):
+    x0, y0, x1, y1 = box
+    ys = [y for y in range(y0, y1) if 255 in rows[y * width + x0:y * width + x1]]
+    if not ys:
+        return []
+    row_runs = _runs(ys)
+    y0, y1 = row_runs[0][0], row_runs[-1][1]
+    xs = [x for x in range(x0, x1) if 255 in columns[x * height + y0:x * height + y1]]
+    column_runs = _runs(xs)
+    if len(row_runs) == 1 and len(column_runs) == 1:
+        return [(column_runs[0][0], y0, column_runs[0][1], y1)]
+
+    boxes = []
+    if len(row_runs) > 1:
+        for start, end in row_runs:
+            boxes += _dark_boxes(rows, columns, width, height, (x0, start, x1, end))
+    else:
+        for start, end in column_runs:
+            boxes += _dark_boxes(rows, columns, width, height, (start, y0, end, y1))
+    return boxes
+
+
+BACKENDS = {"azure": AzureBackend, "fake": FakeBackend}
+
+
+def convert_bounding_polygon(polygon):
+    """Chuyển boundingPolygon dạng [{"x", "y"}] thành list[list]."""
+    return [[point['x'], point['y']] if isinstance(point, dict) else list(point) for point in polygon]
+
+
+def save_json(results, output_json, compact=False):
+    # Đọc dữ liệu cũ nếu file JSON đã tồn tại
+    if os.path.exists(output_json):
+        try:
+            with open(output_json, "r", encoding="utf-8") as f:
+                existing_data = json.load(f)  # Nạp dữ liệu cũ từ file JSON
+                if not isinstance(existing_data, list):  # Kiểm tra định dạng
+                    print(f"Invalid JSON format in {output_json}")
+                    existing_data = []
+        except json.JSONDecodeError:
+            print(f"Error decoding JSON from {output_json}. Starting with an empty list.")
+            existing_data = []
+    else:
+        existing_data = []
+
+    # Thêm kết quả mới vào dữ liệu cũ
+    existing_data.extend(results)
+
+    # Ghi toàn bộ dữ liệu (cũ + mới) vào file JSON
+    with open(output_json, "w", encoding="utf-8") as f:
+        if compact:
+            json.dump(existing_data, f, ensure_ascii=False, separators=(",", ":"))
+        else:
+            json.dump(existing_data, f, ensure_ascii=False, indent=2)
+
+
+def existing_image_names(output_json):
+    """image_name của các record đã có trong file kết quả (rỗng nếu file chưa có hoặc hỏng)."""
+    if not os.path.exists(output_json):
+        return set()
+    try:
+        with open(output_json, "r", encoding="utf-8") as f:
+            records = json.load(f)
+    except json.JSONDecodeError:
+        return set()
+    return {record.get("image_name") for record in records} if isinstance(records, list) else set()
+
+
+def get_sorted_image_list(folder_path):
+    """
+    Danh sách ảnh trong thư mục (hoặc tham chiếu "book.pack#<tên>" nếu folder_path là file .pack,
+    "labels_manifest.json#<tên>" nếu là manifest gán nhãn hay thư mục chứa manifest),
+    sắp xếp theo (label_index, page_index) lấy từ tên file.
+    """
+    manifest = folder_path if is_manifest(folder_path) else None
+    if manifest is None and os.path.isdir(folder_path):
+        manifest = find_manifest(folder_path)
+    if manifest is not None:
+        image_files = [manifest_ref(manifest, name) for name in open_manifest(manifest)]
+    elif is_pack(folder_path):
+        image_files = [page_ref(folder_path, name) for name in open_pack(folder_path).names()]
+    else:
+        image_files = [os.path.join(folder_path, f) for f in os.listdir(folder_path) if f.lower().endswith(IMAGE_EXTENSIONS)]
+
+    def extract_sort_keys(file_name):
+        name = page_name(file_name)
+        parts = name.split('_')
+        if len(parts) < 3:
+            raise ValueError(f"Invalid file name format: {name}")
+        return (int(parts[1].strip()), int(parts[2].strip()))
+
+    return sorted(image_files, key=extract_sort_keys)
+
+
+def image_record(image_path, ocr):
+    """Record kết quả theo tên file "<label>_<label_index>_<page_index>.<ext>", None nếu tên không hợp lệ."""
+    file_name = page_name(image_path)
+    splitter = file_name.split('_')
+    if len(splitter) < 3:
+        print(f"Invalid file name format: {file_name}")
+        return None
+    return {
+        "image_name": file_name,
+        "label_name": splitter[0].strip(),
+        "page_index": splitter[2].strip(),
+        "label_index": splitter[1].strip(),
+        "result": ocr
+    }
+
+
+def analyze_with_retries(backend, image_data, name, stats, metrics=None, pages=1):
+    """
+    Gọi backend.analyze với retry (chờ lâu hơn khi bị rate limit 429). Trả về None nếu thất bại.
+    :param metrics: OcrMetrics để ghi số liệu của request (pages: số trang trong request, vd: mosaic).
+    """
+    retries = 0
+    rate_limited = 0
+    backoff = 0.0
+    latency = 0.0
+    ocr = None
+    while retries < MAX_RETRIES:
+        start = time.perf_counter()
+        try:
+            stats["requests"] += 1
+            stats["upload_bytes"] += len(image_data)
+            ocr = backend.analyze(image_data)
+            latency += time.perf_counter() - start
+            break
+        except Exception as e:
+            # Lần gọi lỗi (kể cả 429) cũng chiếm thời gian chờ OCR, tính vào busy_percent
+            latency += time.perf_counter() - start
+            retries += 1
+            print(f"Error processing {name} (attempt {retries}/{MAX_RETRIES}): {e}")
+
+            if "429" in str(e):  # Kiểm tra lỗi TooManyRequests
+                rate_limited += 1
+                print(f"Rate limit exceeded. Waiting {RATE_LIMIT_WAIT} seconds...")
+                time.sleep(RATE_LIMIT_WAIT)
+                backoff += RATE_LIMIT_WAIT
+            elif retries >= MAX_RETRIES:
+                print(f"Max retries reached for {name}. Skipping...")
+            else:
+                wait_time = randint(3, 5)  # Random delay trước khi retry
+                print(f"Retrying in {wait_time} seconds...")
+                time.sleep(wait_time)
+                backoff += wait_time
+
+    if metrics is not None:
+        attempts = retries + (ocr is not None)
+        metrics.add_request(name, pages, len(image_data), latency, attempts, rate_limited=rate_limited,
+                            backoff=backoff, lines=len(ocr.get("lines", [])) if ocr else 0, ok=ocr is not None)
+    return ocr
+
+
+def pack_tiles(sizes, canvas_size, padding=TILE_PADDING):
+    """
+    Xếp các ảnh (w, h) vào các canvas canvas_size x canvas_size theo shelf packing (ảnh cao trước).
+    :return: List canvas, mỗi canvas là list (chỉ số ảnh, x, y).
+    """
+    canvases = []  # {"shelves": [[y, height, next_x]], "bottom": y, "tiles": [...]}
+    for idx in sorted(range(len(sizes)), key=lambda i: sizes[i][1], reverse=True):
+        width, height = sizes[idx]
+        placed = False
+        for canvas in canvases:
+            for shelf in canvas["shelves"]:
+                if height <= shelf[1] and shelf[2] + width + padding <= canvas_size:
+                    canvas["tiles"].append((idx, shelf[2], shelf[0]))
+                    shelf[2] += width + padding
+                    placed = True
+                    break
+            if not placed and canvas["bottom"] + height + padding <= canvas_size:
+                canvas["shelves"].append([canvas["bottom"], height, padding + width + padding])
+                canvas["tiles"].append((idx, padding, canvas["bottom"]))
+                canvas["bottom"] += height + padding
+                placed = True
+            if placed:
+                break
+        if not placed:
+            canvases.append({"shelves": [[padding, height, padding + width + padding]],
+                             "bottom": padding + height + padding, "tiles": [(idx, padding, padding)]})
+    return [canvas["tiles"] for canvas in canvases]
+
+
+def render_canvas(open_image, headers, tiles, padding=TILE_PADDING):
+    """
+    Ghép các ảnh vào một canvas nền trắng và encode PNG.
+    :param open_image: Hàm open_image(chỉ số ảnh) trả về ảnh PIL (chưa decode); ảnh chỉ được decode lúc dán vào
+        canvas nên mỗi lần chỉ giữ bitmap của một canvas.
+    :param headers: List (width, height, mode) của từng ảnh.
+    """
+    from PIL import Image
+
+    width = max(MIN_IMAGE_SIDE, max(x + headers[idx][0] for idx, x, y in tiles) + padding)
+    height = max(MIN_IMAGE_SIDE, max(y + headers[idx][1] for idx, x, y in tiles) + padding)
+    # Giữ canvas grayscale khi mọi ảnh đều là grayscale (vd: đã qua ocr_preprocess) để file nhỏ hơn
+    mode = "L" if all(headers[idx][2] in ("1", "L") for idx, x, y in tiles) else "RGB"
+    canvas = Image.new(mode, (width, height), "white")
+    for idx, x, y in tiles:
+        with open_image(idx) as image:
+            canvas.paste(image.convert(mode), (x, y))
+    buffer = io.BytesIO()
+    canvas.save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _rebase_polygon(polygon, x, y):
+    return [[point[0] - x, point[1] - y] for point in polygon]
+
+
+def split_mosaic_result(ocr, tiles, headers, padding=TILE_PADDING):
+    """
+    Tách các dòng OCR của một canvas về từng ảnh theo tâm boundingPolygon và trừ lại tọa độ.
+    Dòng có tâm nằm ở phần đệm (không thuộc ảnh nào) không được gán cho ảnh nào; các ảnh mà polygon của nó chạm
+    vào được tính như ảnh có dòng tràn ra ngoài để OCR lại riêng, tránh mất chữ.
+    :return: ({chỉ số ảnh: {"lines": [...]}}, số dòng không thuộc ảnh nào, tập ảnh có dòng tràn ra ngoài ảnh).
+    """
+    results = {idx: {"lines": []} for idx, x, y in tiles}
+    orphans = 0
+    straddling = set()
+    for line in ocr.get("lines", []):
+        polygon = line["boundingPolygon"]
+        center_x = sum(point[0] for point in polygon) / len(polygon)
+        center_y = sum(point[1] for point in polygon) / len(polygon)
+        owner = None
+        for idx, x, y in tiles:
+            if x <= center_x < x + headers[idx][0] and y <= center_y < y + headers[idx][1]:
+                owner = (idx, x, y)
+                break
+        if owner is None:
+            orphans += 1
+            left, right = min(point[0] for point in polygon), max(point[0] for point in polygon)
+            top, bottom = min(point[1] for point in polygon), max(point[1] for point in polygon)
+            straddling.update(idx for idx, x, y in tiles
+                              if left < x + headers[idx][0] and right > x and top < y + headers[idx][1] and bottom > y)
+            continue
+
+        idx, x, y = owner
+        tolerance = padding / 2
+        if (min(point[0] for point in polygon) < x - tolerance or max(point[0] for point in polygon) > x + headers[idx][0] + tolerance
+                or min(point[1] for point in polygon) < y - tolerance or max(point[1] for point in polygon) > y + headers[idx][1] + tolerance):
+            straddling.add(idx)
+
+        line = dict(line, boundingPolygon=_rebase_polygon(polygon, x, y))
+        if "words" in line:
+            line["words"] = [dict(word, boundingPolygon=_rebase_polygon(word["boundingPolygon"], x, y)) for word in line["words"]]
+        results[idx]["lines"].append(line)
+    return results, orphans, straddling
+
+
+def ocr_batched(backend, image_paths, stats, canvas_size=DEFAULT_CANVAS_SIZE, padding=TILE_PADDING, payloads=None,
+                metrics=None, on_result=None):
+    """
+    OCR theo mosaic: ảnh nhỏ được ghép vào canvas, ảnh lớn hơn canvas được gửi riêng.
+    :param payloads: {đường dẫn ảnh: bytes} dùng thay cho file gốc (vd: ảnh đã tiền xử lý).
+    :param metrics: OcrMetrics để ghi số liệu từng request.
+    :param on_result: Hàm on_result(đường dẫn ảnh, kết quả OCR) gọi theo thứ tự của image_paths ngay khi ảnh đó và
+        mọi ảnh trước nó đã xong (ảnh lỗi được bỏ qua), để ghi --stream trong lúc OCR còn chạy.
+    :return: {đường dẫn ảnh: kết quả OCR} (không có ảnh bị lỗi).
+    """
+    from PIL import Image
+
+    def open_image(idx):
+        return Image.open(io.BytesIO(read_payload(image_paths[idx], payloads)))
+
+    # Chỉ đọc header (kích thước, mode); ảnh được decode lúc ghép canvas
+    headers = []
+    for idx in range(len(image_paths)):
+        with open_image(idx) as image:
+            headers.append((image.width, image.height, image.mode))
+
+    results = {}
+    settled = set()
+    next_result = 0
+
+    def settle(idx, ocr):
+        # Ảnh đã xong (ocr None: lỗi); gọi on_result cho phần đầu liên tục của danh sách đã xong
+        nonlocal next_result
+        settled.add(idx)
+        if ocr is not None:
+            results[image_paths[idx]] = ocr
+        while next_result in settled:
+            path = image_paths[next_result]
+            if on_result is not None and path in results:
+                on_result(path, results[path])
+            next_result += 1
+
+    def analyze_single(indices):
+        for idx in sorted(indices):
+            settle(idx, analyze_with_retries(backend, read_payload(image_paths[idx], payloads), image_paths[idx],
+                                             stats, metrics=metrics))
+            if metrics is not None:
+                metrics.maybe_report()
+
+    large = [idx for idx, (width, height, mode) in enumerate(headers)
+             if width > canvas_size - 2 * padding or height > canvas_size - 2 * padding]
+    small = sorted(set(range(len(headers))) - set(large))
+    analyze_single(large)
+    groups = [[(small[idx], x, y) for idx, x, y in tiles]
+              for tiles in pack_tiles([headers[idx][:2] for idx in small], canvas_size, padding)]
+
+    # Canvas được gửi theo thứ tự xếp (ảnh đầu danh sách trước) để on_result không phải chờ tới cuối
+    while groups:
+        tiles = groups.pop(0)
+        if len(tiles) == 1:
+            analyze_single([tiles[0][0]])
+            continue
+        image_data = render_canvas(open_image, headers, tiles, padding)
+        if len(image_data) > MAX_REQUEST_BYTES:
+            # Canvas quá lớn: chia đôi rồi xếp lại
+            half = len(tiles) // 2
+            groups[:0] = [[(part[idx][0], x, y) for idx, x, y in packed]
+                          for part in (tiles[:half], tiles[half:])
+                          for packed in pack_tiles([headers[tile[0]][:2] for tile in part], canvas_size, padding)]
+            continue
+
+        stats["canvases"] += 1
+        stats["tiles"] += len(tiles)
+        ocr = analyze_with_retries(backend, image_data, f"mosaic of {len(tiles)} images", stats, metrics=metrics,
+                                   pages=len(tiles))
+        if metrics is not None:
+            metrics.maybe_report()
+        if ocr is None:
+            # Thử lại từng ảnh riêng
+            analyze_single([idx for idx, x, y in tiles])
+            continue
+        split, orphans, straddling = split_mosaic_result(ocr, tiles, headers, padding)
+        stats["orphan_lines"] += orphans
+        stats["straddling"] += len(straddling)
+        for idx, result in sorted(split.items()):
+            if idx not in straddling:
+                settle(idx, result)
+        # Dòng tràn sang ảnh khác: OCR lại riêng cho chắc chắn
+        analyze_single(straddling)
+    return results
+
+
+def read_payload(image_path, payloads=None):
+    """
+    Bytes gửi cho OCR: ảnh đã tiền xử lý nếu có, nếu không thì file gốc (hoặc memoryview của trang trong file .pack,
+    không copy).
+    """
+    if payloads and image_path in payloads:
+        return payloads[image_path]
+    return read_page(image_path)
+
+
+def _iter_payloads(list_path, preprocess, workers):
+    # (path, bytes, info); info là None khi không tiền xử lý hoặc tiền xử lý lỗi (dùng file gốc)
+    if preprocess is None:
+        for image_path in list_path:
+            yield image_path, read_payload(image_path), None
+        return
+    from ocr_preprocess import preprocess_files
+    for image_path, data, info in preprocess_files(list_path, workers=workers, **preprocess):
+        if data is None:
+            yield image_path, read_payload(image_path), None
+        else:
+            yield image_path, data, info
+
+
+def process_images(list_path, output_json, backend, batch=False, canvas_size=DEFAULT_CANVAS_SIZE, checkpoint=None,
+                   preprocess=None, workers=None, slim=False, slim_words=False, stream=None, metrics_path=None,
+                   quota_per_minute=None, resume=False):
+    """
+    OCR danh sách ảnh và lưu kết quả vào output_json (nối thêm vào dữ liệu cũ).
+    :param batch: Ghép các ảnh nhỏ thành mosaic để giảm số request.
+    :param checkpoint: File để ghi thêm từng record ngay khi xong (như /kaggle/working/tmp.json trong notebook).
+    :param preprocess: Tham số cho ocr_preprocess.preprocess_image (None: gửi file gốc).
+    :param workers: Số process tiền xử lý.
+    :param slim: Ghi kết quả theo schema rút gọn của ocr_schema (slim_words: giữ dữ liệu từng từ).
+    :param stream: File JSONL để ghi thêm từng record (một dòng) ngay khi xong.
+    :param metrics_path: File JSON để ghi số liệu từng request (ocr_metrics.py), None thì không ghi.
+    :param quota_per_minute: Số lần gọi mỗi phút cho phép của gói OCR, để tính mức dùng quota.
+    :param resume: Bỏ qua các ảnh đã có trong output_json (tính là cache hit).
+    :return: Dict thống kê (images, requests, requests_saved, upload_bytes, metrics, ...).
+    """
+    stats = {"images": len(list_path), "requests": 0, "canvases": 0, "tiles": 0, "orphan_lines": 0, "straddling": 0,
+             "upload_bytes": 0}
+    start = time.perf_counter()
+    metrics = OcrMetrics(quota_per_minute=quota_per_minute)
+    if resume:
+        done = existing_image_names(output_json)
+        for image_path in list_path:
+            if page_name(image_path) in done:
+                metrics.add_cache_hit(image_path)
+        list_path = [image_path for image_path in list_path if page_name(image_path) not in done]
+
+    infos = {}
+    results = []
+    if preprocess is not None:
+        from ocr_preprocess import restore_result
+    stream_file = open(stream, "a", encoding="utf-8") if stream else None
+
+    def finish(image_path, ocr):
+        # Đổi tọa độ về ảnh gốc, tạo record và ghi ngay ra checkpoint / stream
+        if infos.get(image_path):
+            ocr = restore_result(ocr, infos[image_path])
+        record = image_record(image_path, ocr)
+        if record is None:
+            return
+        metrics.page_done()
+        if slim:
+            record["result"] = slim_result(record["result"], words=slim_words)
+        results.append(record)
+        if checkpoint:
+            with open(checkpoint, "a", encoding="utf-8") as f:
+                json.dump(record, f, ensure_ascii=False, indent=2)
+        if stream_file is not None:
+            stream_file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            stream_file.flush()
+
+    try:
+        if batch:
+            # Cần kích thước mọi ảnh (đã tiền xử lý) để xếp canvas nên tiền xử lý xong hết trước khi OCR; record được
+            # ghi ra checkpoint / stream sau mỗi canvas
+            payloads = {}
+            for image_path, data, info in _iter_payloads(list_path, preprocess, workers):
+                payloads[image_path] = data
+                infos[image_path] = info
+            ocr_batched(backend, list_path, stats, canvas_size=canvas_size, payloads=payloads, metrics=metrics,
+                        on_result=finish)
+        else:
+            # Tiền xử lý chạy song song trong process pool trong khi ảnh trước đang được OCR
+            for image_path, data, info in _iter_payloads(list_path, preprocess, workers):
+                print(f"Processing: {image_path}")
+                infos[image_path] = info
+                ocr = analyze_with_retries(backend, data, image_path, stats, metrics=metrics)
+                if ocr is not None:
+                    finish(image_path, ocr)
+                metrics.maybe_report()
+    finally:
+        if stream_file is not None:
+            stream_file.close()
+
+    save_json(results, output_json, compact=slim)
+    stats["seconds"] = time.perf_counter() - start
+    # Số request tiết kiệm so với gửi mỗi ảnh một request (không tính retry)
+    stats["requests_saved"] = stats["tiles"] - stats["canvases"]
+    print(f"Processing completed. Results saved to {output_json}.")
+    print(f"{stats['images']} images, {stats['requests']} requests ({stats['requests_saved']} saved by batching, "
+          f"{stats['canvases']} mosaics), {stats['orphan_lines']} orphan lines, "
+          f"{stats['straddling']} images re-sent, {stats['upload_bytes'] / 2 ** 20:.2f} MB uploaded, {stats['seconds']:.1f} s")
+    if preprocess is not None:
+        from ocr_preprocess import summarize
+        summary = summarize(infos.values())
+        stats["preprocess"] = summary
+        if summary["images"]:
+            print(f"Preprocessing: {summary['original_bytes'] / 2 ** 20:.1f} MB -> {summary['bytes'] / 2 ** 20:.2f} MB "
+                  f"({summary['saved_percent']:.1f}% saved), {summary['mean_ms']:.0f} ms/image (p95 {summary['p95_ms']:.0f} ms)")
+    if metrics_path:
+        stats["metrics"] = metrics.write(metrics_path)
+        print(f"Metrics saved to {metrics_path}.")
+    else:
+        stats["metrics"] = metrics.summary()
+    print(format_summary(stats["metrics"]))
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OCR a folder of page images into align_GUI JSON.")
+    parser.add_argument("image_dir", help="Folder of <label>_<label_index>_<page_index> images, .pack or label manifest.")
+    parser.add_argument("-o", "--output", default="ocr_results.json", help="Output JSON file.")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="azure", help="OCR backend.")
+    parser.add_argument("--batch", action="store_true", help="Pack small images into mosaics (fewer requests).")
+    parser.add_argument("--canvas", type=int, default=DEFAULT_CANVAS_SIZE,
+                        help=f"Mosaic canvas side in pixels (max {MAX_IMAGE_SIDE}).")
+    parser.add_argument("--checkpoint", default=None, help="Append each record to this file as soon as it is done.")
+    parser.add_argument("--preprocess", action="store_true", help="Grayscale/downsample/re-encode before upload.")
+    parser.add_argument("--max-side", type=int, default=2400, help="Longest side after preprocessing (0: keep).")
+    parser.add_argument("--binarize", action="store_true", help="With --preprocess: Otsu binarization.")
+    parser.add_argument("--deskew", action="store_true", help="With --preprocess: correct page skew.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of preprocessing processes.")
+    parser.add_argument("--stream", default=None,
+                        help="Append each record to this JSONL file as soon as it is done (for align_GUI live review).")
+    parser.add_argument("--slim", action="store_true", help="Write the slim schema (line text + packed polygon).")
+    parser.add_argument("--words", action="store_true", help="With --slim: keep word-level data.")
+    parser.add_argument("--metrics", default=None,
+                        help="Per-request metrics JSON file (default: <output>_metrics.json).")
+    parser.add_argument("--quota-per-minute", type=float, default=None,
+                        help="Calls per minute allowed by the OCR plan, to report quota use (e.g. 20 for Azure F0).")
+    parser.add_argument("--resume", action="store_true", help="Skip images already in the output file.")
+    args = parser.parse_args()
+
+    if not MIN_IMAGE_SIDE * 4 <= args.canvas <= MAX_IMAGE_SIDE:
+        parser.error(f"--canvas must be between {MIN_IMAGE_SIDE * 4} and {MAX_IMAGE_SIDE}.")
+
+    backend = BACKENDS[args.backend]()
+    image_list = get_sorted_image_list(args.image_dir)
+    preprocess = None
+    if args.preprocess:
+        preprocess = {"max_side": args.max_side or None, "binarize": args.binarize, "deskew": args.deskew}
+    process_images(image_list, args.output, backend, batch=args.batch, canvas_size=args.canvas, checkpoint=args.checkpoint,
+                   preprocess=preprocess, workers=args.workers, slim=args.slim, slim_words=args.words,
+                   stream=args.stream, metrics_path=args.metrics or os.path.splitext(args.output)[0] + "_metrics.json",
+                   quota_per_minute=args.quota_per_minute, resume=args.resume)
+
+
+if __name__ == "__main__":
+    main()
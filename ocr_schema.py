@@ -0,0 +1,102 @@
+"""
+Schema OCR rút gọn ("slim") cho file kết quả của ocr_runner.
+
+Schema đầy đủ (như demo_json.png) lưu mỗi điểm của boundingPolygon thành một list [x, y] cho từng dòng và từng
+từ, kèm confidence của từng từ, trong khi simple_filter chỉ đọc text và polygon của dòng. Schema slim giữ:
+    {"text": "...", "polygon16": "<base64>"}    polygon của dòng là mảng phẳng x0, y0, x1, y1, ... kiểu int16
+                                                 little-endian ("polygon32" / int32 nếu tọa độ vượt int16)
+    "words": [{"text", "polygon16", "confidence"}]   chỉ khi bật tùy chọn words
+Record vẫn là {"image_name", "label_name", "page_index", "label_index", "result": {"lines": [...]}}.
+
+Code đọc dữ liệu dùng line_polygon(line) để nhận cả hai schema.
+
+Usage (chuyển file OCR có sẵn):
+    python ocr_schema.py ocr_results.json -o ocr_results.slim.json [--words]
+"""
+import sys
+import json
+import base64
+import argparse
+from array import array
+
+INT16_MIN, INT16_MAX = -32768, 32767
+
+
+def pack_polygon(polygon):
+    """
+    Đóng gói polygon ([[x, y], ...] hoặc mảng phẳng) thành (key, base64) với key là "polygon16" hoặc "polygon32".
+    """
+    flat = []
+    for point in polygon:
+        if isinstance(point, (list, tuple)):
+            flat.extend(int(round(value)) for value in point)
+        else:
+            flat.append(int(round(point)))
+    fits_int16 = all(INT16_MIN <= value <= INT16_MAX for value in flat)
+    values = array("h" if fits_int16 else "i", flat)
+    if sys.byteorder == "big":
+        values.byteswap()
+    return ("polygon16" if fits_int16 else "polygon32"), base64.b64encode(values.tobytes()).decode("ascii")
+
+
+def unpack_polygon(data, typecode="h"):
+    """Mảng phẳng [x0, y0, x1, y1, ...] từ chuỗi base64."""
+    values = array(typecode)
+    values.frombytes(base64.b64decode(data))
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values.tolist()
+
+
+def line_polygon(line):
+    """boundingPolygon dạng [[x, y], ...] của một dòng (hoặc từ) ở schema đầy đủ hoặc slim; [] nếu không có."""
+    polygon = line.get("boundingPolygon")
+    if polygon is not None:
+        return polygon
+    if "polygon16" in line:
+        flat = unpack_polygon(line["polygon16"], "h")
+    elif "polygon32" in line:
+        flat = unpack_polygon(line["polygon32"], "i")
+    else:
+        return []
+    return [flat[i:i + 2] for i in range(0, len(flat), 2)]
+
+
+def slim_line(line, words=False):
+    key, polygon = pack_polygon(line_polygon(line))
+    slim = {"text": line.get("text", ""), key: polygon}
+    if words and line.get("words"):
+        slim["words"] = []
+        for word in line["words"]:
+            word_key, word_polygon = pack_polygon(line_polygon(word))
+            slim["words"].append({"text": word.get("text", ""), word_key: word_polygon,
+                                  "confidence": word.get("confidence")})
+    return slim
+
+
+def slim_result(result, words=False):
+    """Kết quả OCR của một ảnh ({"lines": [...]}) ở schema slim."""
+    return {"lines": [slim_line(line, words=words) for line in result.get("lines", [])]}
+
+
+def slim_records(records, words=False):
+    """Copy các record với "result" ở schema slim (nhận cả record đã ở schema slim)."""
+    return [dict(record, result=slim_result(record.get("result", {}), words=words)) for record in records]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert OCR JSON records to the slim schema.")
+    parser.add_argument("input", help="OCR JSON file (list of records).")
+    parser.add_argument("-o", "--output", required=True, help="Output JSON file.")
+    parser.add_argument("--words", action="store_true", help="Keep word-level text, polygons and confidence.")
+    args = parser.parse_args()
+
+    with open(args.input, "r", encoding="utf-8") as file:
+        records = json.load(file)
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(slim_records(records, words=args.words), file, ensure_ascii=False, separators=(",", ":"))
+    print(f"Converted {len(records)} records to '{args.output}'.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,322 @@
+"""
+Gói toàn bộ ảnh trang của một cuốn sách vào một file duy nhất (.pack) thay cho hàng nghìn file PNG rời.
+
+Cấu trúc file:
+    header cố định  "<8sQQ": magic b"NLPPACK1", offset và độ dài của index
+    dữ liệu ảnh      các file ảnh (PNG/JPG...) nối tiếp nhau, giữ nguyên bytes
+    index (JSON)     {"version": 1, "pages": [{"name", "offset", "length", "width", "height", "sha1", "format"}]}
+
+Index nằm cuối file nên có thể ghi từng trang ngay khi render xong. Khi đọc, file được mmap và mỗi trang là
+một memoryview trỏ thẳng vào vùng nhớ đó (không copy). Một trang được tham chiếu bằng "book.pack#12".
+Các hàm read_page / page_name / source_path cũng nhận tham chiếu tới manifest gán nhãn
+("labels_manifest.json#ORI_1_39", xem label_manifest.py) và tới trang của file PDF ("book.pdf#12", render
+bằng PyMuPDF khi cần, xem pdf_pages.py).
+
+Usage:
+    python page_pack.py pack IMAGE -o book.pack          # đóng gói thư mục ảnh
+    python page_pack.py unpack book.pack -o IMAGE        # giải nén ra thư mục như cũ
+    python page_pack.py list book.pack [--verify]
+"""
+import os
+import io
+import mmap
+import json
+import struct
+import hashlib
+import argparse
+import threading
+
+PACK_MAGIC = b"NLPPACK1"
+PACK_HEADER = struct.Struct("<8sQQ")
+PACK_EXTENSION = ".pack"
+PDF_EXTENSION = ".pdf"
+REF_SEPARATOR = "#"
+MANIFEST_SUFFIX = "manifest.json"
+IMAGE_EXTENSIONS = ('.jpg', '.png', '.jpeg', '.bmp')
+
+
+def image_size(data):
+    """(width, height) đọc từ header PNG/JPEG, dùng Pillow cho các định dạng khác; (0, 0) nếu không đọc được."""
+    if data[:8] == b"\x89PNG\r\n\x1a\n":
+        return struct.unpack(">II", bytes(data[16:24]))
+    try:
+        from PIL import Image
+        with Image.open(io.BytesIO(data)) as image:
+            return image.size
+    except Exception:
+        return 0, 0
+
+
+class PagePackWriter:
+    """
+    Ghi file .pack: thêm từng trang bằng add() rồi close() để ghi index. Nếu khối with bị lỗi, file dở dang bị
+    xóa (abort()) thay vì được ghi index như một pack hoàn chỉnh.
+    """
+    def __init__(self, path):
+        self.path = path
+        self.pages = []
+        self._names = set()
+        self._file = open(path, "wb")
+        self._file.write(PACK_HEADER.pack(PACK_MAGIC, 0, 0))
+
+    def add(self, name, data, width=None, height=None, image_format=None):
+        name = str(name)
+        if name in self._names:
+            raise ValueError(f"Duplicate page name in pack: {name}")
+        if width is None or height is None:
+            width, height = image_size(data)
+        offset = self._file.tell()
+        self._file.write(data)
+        self.pages.append({
+            "name": name,
+            "offset": offset,
+            "length": len(data),
+            "width": width,
+            "height": height,
+            "sha1": hashlib.sha1(data).hexdigest(),
+            "format": image_format or ("png" if data[:4] == b"\x89PNG" else "jpg")
+        })
+        self._names.add(name)
+
+    def close(self):
+        if self._file.closed:
+            return
+        index = json.dumps({"version": 1, "pages": self.pages}, ensure_ascii=False).encode("utf-8")
+        index_offset = self._file.tell()
+        self._file.write(index)
+        self._file.seek(0)
+        self._file.write(PACK_HEADER.pack(PACK_MAGIC, index_offset, len(index)))
+        self._file.close()
+
+    def abort(self):
+        """Đóng và xóa file đang ghi dở (không ghi index)."""
+        if self._file.closed:
+            return
+        self._file.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+
+class PagePack:
+    """Đọc file .pack qua mmap; page_bytes() trả về memoryview không copy."""
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mmap)
+
+        magic, index_offset, index_length = PACK_HEADER.unpack_from(self._mmap, 0)
+        if magic != PACK_MAGIC or index_offset == 0:
+            self.close()
+            raise ValueError(f"Not a page pack (or not closed properly): {path}")
+        index = json.loads(bytes(self._view[index_offset:index_offset + index_length]).decode("utf-8"))
+        self.pages = index["pages"]
+        self._entries = {page["name"]: page for page in self.pages}
+
+    def names(self):
+        """Tên các trang theo thứ tự ghi."""
+        return [page["name"] for page in self.pages]
+
+    def entry(self, name):
+        return self._entries[str(name)]
+
+    def page_bytes(self, name):
+        entry = self.entry(name)
+        return self._view[entry["offset"]:entry["offset"] + entry["length"]]
+
+    def verify(self, name):
+        """Kiểm tra sha1 của một trang."""
+        return hashlib.sha1(self.page_bytes(name)).hexdigest() == self.entry(name)["sha1"]
+
+    def close(self):
+        try:
+            self._view.release()
+            self._mmap.close()
+        except (AttributeError, BufferError):
+            # Vẫn còn memoryview của trang đang được dùng: mmap được unmap khi view cuối cùng được giải phóng
+            pass
+        self._file.close()
+
+    def __contains__(self, name):
+        return str(name) in self._entries
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+_open_packs = {}
+_open_packs_lock = threading.Lock()
+
+
+def open_pack(path):
+    """PagePack dùng chung trong process (mở lại nếu file đã bị ghi đè)."""
+    path = os.path.abspath(path)
+    mtime = os.stat(path).st_mtime_ns
+    with _open_packs_lock:
+        cached = _open_packs.get(path)
+        if cached is None or cached[0] != mtime:
+            if cached is not None:
+                cached[1].close()  # File đã bị ghi đè: đóng pack cũ (mmap còn view đang dùng thì đóng khi hết view)
+            cached = _open_packs[path] = (mtime, PagePack(path))
+    return cached[1]
+
+
+def is_pack(path):
+    return os.path.isfile(path) and path.lower().endswith(PACK_EXTENSION)
+
+
+def is_pdf(path):
+    return os.path.isfile(path) and path.lower().endswith(PDF_EXTENSION)
+
+
+def page_ref(pack_path, name):
+    """Tham chiếu tới một trang trong pack, vd: "book.pack#12"."""
+    return f"{pack_path}{REF_SEPARATOR}{name}"
+
+
+def split_ref(ref):
+    """("book.pack", "12") cho "book.pack#12" (hoặc "book.pdf#12"); (ref, None) nếu ref là đường dẫn file bình thường."""
+    pack_path, separator, name = ref.rpartition(REF_SEPARATOR)
+    if separator and pack_path.lower().endswith((PACK_EXTENSION, PDF_EXTENSION)):
+        return pack_path, name
+    return ref, None
+
+
+def split_manifest_ref(ref):
+    """("labels_manifest.json", "ORI_1_39") cho "labels_manifest.json#ORI_1_39"; (ref, None) nếu không phải."""
+    manifest_path, separator, name = ref.rpartition(REF_SEPARATOR)
+    if separator and manifest_path.lower().endswith(MANIFEST_SUFFIX):
+        return manifest_path, name
+    return ref, None
+
+
+def resolve_ref(ref):
+    """Đổi tham chiếu manifest thành ảnh gốc (đường dẫn file hoặc "book.pack#12"); giữ nguyên các ref khác."""
+    manifest_path, name = split_manifest_ref(ref)
+    if name is None:
+        return ref
+    from label_manifest import open_manifest
+    return open_manifest(manifest_path)[name]
+
+
+def is_page_ref(ref):
+    return split_ref(ref)[1] is not None or split_manifest_ref(ref)[1] is not None
+
+
+def source_path(ref):
+    """File thật chứa ảnh (file .pack với tham chiếu trang), dùng cho os.stat / mtime."""
+    return split_ref(resolve_ref(ref))[0]
+
+
+def page_name(ref):
+    """
+    Tên trang không có phần mở rộng: "12" cho "book.pack#12" hoặc "IMAGE/12.png",
+    "ORI_1_39" cho "labels_manifest.json#ORI_1_39".
+    """
+    pack_path, name = split_ref(ref)
+    if name is None:
+        name = split_manifest_ref(ref)[1]
+    if name is not None:
+        return name
+    return os.path.splitext(os.path.basename(ref))[0]
+
+
+def read_page(ref):
+    """
+    Bytes của ảnh: memoryview (không copy) với tham chiếu pack, PNG render ở độ phân giải đầy đủ với trang PDF,
+    bytes đọc từ file nếu không.
+    """
+    pack_path, name = split_ref(resolve_ref(ref))
+    if name is not None:
+        if pack_path.lower().endswith(PDF_EXTENSION):
+            from pdf_pages import render_page
+            return render_page(pack_path, name)
+        return open_pack(pack_path).page_bytes(name)
+    with open(pack_path, "rb") as file:
+        return file.read()
+
+
+def list_pages(source):
+    """
+    Các trang đánh số (tên "0", "1", ... như pdf_to_png) của một thư mục, file .pack hoặc file PDF, sắp theo số
+    trang. Trả về đường dẫn file hoặc tham chiếu "book.pack#N" / "book.pdf#N".
+    """
+    if is_pdf(source):
+        from pdf_pages import page_count
+        return [page_ref(source, str(index)) for index in range(page_count(source))]
+    if is_pack(source):
+        names = [name for name in open_pack(source).names() if name.isdigit()]
+        return [page_ref(source, name) for name in sorted(names, key=int)]
+    files = [f for f in os.listdir(source) if f.split(".")[0].isdigit()]
+    return [os.path.join(source, f) for f in sorted(files, key=lambda x: int(x.split(".")[0]))]
+
+
+def pack_folder(folder, pack_path):
+    """Đóng gói các ảnh trong thư mục (tên trang = tên file không có phần mở rộng)."""
+    files = sorted(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTENSIONS))
+    with PagePackWriter(pack_path) as writer:
+        for file_name in files:
+            name, ext = os.path.splitext(file_name)
+            with open(os.path.join(folder, file_name), "rb") as file:
+                writer.add(name, file.read(), image_format=ext[1:].lower())
+    return len(files)
+
+
+def unpack(pack_path, output_folder):
+    """Giải nén pack ra thư mục theo bố cục cũ (<name>.<format>)."""
+    os.makedirs(output_folder, exist_ok=True)
+    with PagePack(pack_path) as pack:
+        for page in pack.pages:
+            with open(os.path.join(output_folder, f"{page['name']}.{page['format']}"), "wb") as file:
+                file.write(pack.page_bytes(page["name"]))
+        return len(pack)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create, unpack or list page pack files.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    pack_parser = subparsers.add_parser("pack", help="Pack a folder of images.")
+    pack_parser.add_argument("folder")
+    pack_parser.add_argument("-o", "--output", required=True, help="Output .pack file.")
+    unpack_parser = subparsers.add_parser("unpack", help="Unpack to a folder of images.")
+    unpack_parser.add_argument("pack")
+    unpack_parser.add_argument("-o", "--output", default=".", help="Output folder.")
+    list_parser = subparsers.add_parser("list", help="List the pages of a pack.")
+    list_parser.add_argument("pack")
+    list_parser.add_argument("--verify", action="store_true", help="Check the sha1 of every page.")
+    args = parser.parse_args()
+
+    if args.command == "pack":
+        count = pack_folder(args.folder, args.output)
+        print(f"Packed {count} images into '{args.output}'.")
+    elif args.command == "unpack":
+        count = unpack(args.pack, args.output)
+        print(f"Unpacked {count} images to '{args.output}'.")
+    else:
+        with PagePack(args.pack) as pack:
+            for page in pack.pages:
+                status = ("ok" if pack.verify(page["name"]) else "CORRUPT") if args.verify else ""
+                print(f"{page['name']}\t{page['width']}x{page['height']}\t{page['length']}\t{status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Render trang PDF theo yêu cầu bằng PyMuPDF để label_GUI mở thẳng file PDF thay vì đợi pdf_to_png.py xuất hết ảnh.
+
+Trang PDF được tham chiếu giống trang trong file .pack: "book.pdf#12" (page_pack.split_ref / read_page /
+list_pages nhận được). Có hai kiểu render:
+    render_fit   vừa khung width x width (kích thước ô ảnh của GUI), trả về mảng RGB; kết quả được giữ trong
+                 một LRU nhỏ (RENDER_CACHE_SIZE trang) nên cuộn qua lại không phải render lại
+    render_page  ảnh PNG ở EXPORT_DPI (như pdf_to_png.py), chỉ dùng khi xuất ảnh ("Save Images")
+MuPDF không cho dùng một document từ nhiều thread cùng lúc nên mọi lần render đi qua cùng một khóa.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+EXPORT_DPI = 300
+RENDER_CACHE_SIZE = 24
+
+_render_lock = threading.RLock()
+_open_documents = {}
+_render_cache = OrderedDict()  # {(path, mtime, page_index, width): (width, height, stride, samples)}
+
+
+def _document(path):
+    # Gọi khi đang giữ _render_lock; mở lại nếu file đã bị ghi đè
+    import fitz  # PyMuPDF
+
+    path = os.path.abspath(path)
+    mtime = os.stat(path).st_mtime_ns
+    cached = _open_documents.get(path)
+    if cached is None or cached[0] != mtime:
+        if cached is not None:
+            cached[1].close()
+        cached = _open_documents[path] = (mtime, fitz.open(path))
+    return cached[1]
+
+
+def page_count(path):
+    with _render_lock:
+        return _document(path).page_count
+
+
+def page_size(path, page_index):
+    """(width, height) của trang theo point (1/72 inch), không cần render."""
+    with _render_lock:
+        rect = _document(path).load_page(int(page_index)).rect
+    return rect.width, rect.height
+
+
+def render_fit(path, page_index, width):
+    """
+    Render trang vừa khung width x width (giữ tỉ lệ).
+    :return: Tuple (width, height, stride, bytes RGB888).
+    """
+    import fitz
+
+    page_index = int(page_index)
+    key = (os.path.abspath(path), os.stat(path).st_mtime_ns, page_index, int(width))
+    with _render_lock:
+        cached = _render_cache.get(key)
+        if cached is not None:
+            _render_cache.move_to_end(key)
+            return cached
+        page = _document(path).load_page(page_index)
+        zoom = width / max(page.rect.width, page.rect.height)
+        pix = page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), alpha=False)
+        cached = _render_cache[key] = (pix.width, pix.height, pix.stride, pix.samples)
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+    return cached
+
+
+def render_page(path, page_index, dpi=EXPORT_DPI, image_format="png"):
+    """Bytes ảnh của trang ở độ phân giải đầy đủ (không cache)."""
+    with _render_lock:
+        pix = _document(path).load_page(int(page_index)).get_pixmap(dpi=dpi)
+        return pix.tobytes(image_format)
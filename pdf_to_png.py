@@ -1,6 +1,8 @@
 import fitz  # PyMuPDF
 import os
+import argparse
 from multiprocessing import Pool, cpu_count
+from page_pack import PagePackWriter
 
 def convert_page_to_image(args):
     """
@@ -20,6 +22,47 @@ def convert_page_to_image(args):
     except Exception as e:
         return f"Error processing page {page_index}: {e}"
 
+def render_page_bytes(args):
+    """
+    Render a single page of a PDF to encoded image bytes (used when writing a page pack).
+    :param args: Tuple containing (pdf_path, page_index, image_format, dpi).
+    :return: Tuple (page_index, image bytes or None, width, height, error message or None).
+    """
+    pdf_path, page_index, image_format, dpi = args
+    try:
+        pdf_document = fitz.open(pdf_path)  # Re-open the PDF in each process
+        pix = pdf_document.load_page(page_index).get_pixmap(dpi=dpi)
+        data = pix.tobytes(image_format)
+        pdf_document.close()
+        return page_index, data, pix.width, pix.height, None
+    except Exception as e:
+        return page_index, None, 0, 0, f"Error processing page {page_index}: {e}"
+
+def pdf_to_pack_parallel(pdf_path, pack_path, image_format="png", dpi=300):
+    """
+    Convert each page of a PDF into one page pack file (see page_pack.py) using multiprocessing.
+    Pages are appended in order as soon as they are rendered, page names are the page indices.
+    :param pdf_path: Path to the PDF file.
+    :param pack_path: Output .pack file.
+    :param image_format: Image format (e.g., "png", "jpg").
+    :param dpi: Resolution for the output images (dots per inch).
+    """
+    pdf_document = fitz.open(pdf_path)
+    total_pages = pdf_document.page_count
+    pdf_document.close()
+
+    print(f"Starting conversion of {total_pages} pages from '{pdf_path}' to '{pack_path}'...")
+
+    args = [(pdf_path, page_index, image_format, dpi) for page_index in range(total_pages)]
+    with Pool(processes=cpu_count()) as pool, PagePackWriter(pack_path) as writer:
+        for page_index, data, width, height, error in pool.imap(render_page_bytes, args):
+            if error:
+                print(error)
+                continue
+            writer.add(page_index, data, width=width, height=height, image_format=image_format)
+
+    print(f"All pages have been converted and saved to '{pack_path}'.")
+
 def pdf_to_images_parallel(pdf_path, output_folder="IMAGE", image_format="png", dpi=300):
     """
     Convert each page of a PDF into images using multiprocessing.
@@ -56,4 +99,14 @@ def pdf_to_images_parallel(pdf_path, output_folder="IMAGE", image_format="png",
 
 # Example usage
 if __name__ == "__main__":
-    pdf_to_images_parallel("NGULIEU.pdf", output_folder="IMAGE", image_format="png", dpi=300)
+    parser = argparse.ArgumentParser(description="Convert PDF pages to images (a folder or a single page pack).")
+    parser.add_argument("pdf", nargs="?", default="NGULIEU.pdf", help="PDF file.")
+    parser.add_argument("-o", "--output", default="IMAGE", help="Output folder, or a .pack file.")
+    parser.add_argument("--format", default="png", help="Image format.")
+    parser.add_argument("--dpi", type=int, default=300, help="Resolution in dots per inch.")
+    args = parser.parse_args()
+
+    if args.output.lower().endswith(".pack"):
+        pdf_to_pack_parallel(args.pdf, args.output, image_format=args.format, dpi=args.dpi)
+    else:
+        pdf_to_images_parallel(args.pdf, output_folder=args.output, image_format=args.format, dpi=args.dpi)
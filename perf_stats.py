@@ -0,0 +1,236 @@
+"""
+Đo thời gian các đoạn code quan trọng của label_GUI / align_GUI (tùy chọn).
+
+Bật bằng biến môi trường NLP_MINITOOLS_PERF=1. Khi tắt, `instrument` trả về nguyên hàm gốc và `span`
+trả về một context manager rỗng dùng chung nên gần như không tốn chi phí.
+Khi bật: ghi histogram thời gian, mức bộ nhớ cao nhất, và có thể xuất Chrome trace JSON
+(mở bằng chrome://tracing hoặc https://ui.perfetto.dev). Đặt NLP_MINITOOLS_PERF_TRACE=trace.json
+để tự xuất trace khi thoát.
+"""
+import os
+import json
+import time
+import atexit
+import threading
+from functools import wraps
+
+PERF_ENV = "NLP_MINITOOLS_PERF"
+TRACE_ENV = "NLP_MINITOOLS_PERF_TRACE"
+ENABLED = os.environ.get(PERF_ENV, "") not in ("", "0")
+MAX_TRACE_EVENTS = 200000
+# Histogram theo lũy thừa của 2, tính bằng micro giây: bucket i chứa các giá trị < 2^i us
+NUM_BUCKETS = 32
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_memory_bytes():
+    """Mức bộ nhớ cao nhất của process (bytes), 0 nếu không lấy được."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux trả về KiB, macOS trả về bytes
+        return peak if os.uname().sysname == "Darwin" else peak * 1024
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                        ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                        ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                        ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                        ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb)
+        return counters.PeakWorkingSetSize
+    except Exception:
+        return 0
+
+
+class PerfStats:
+    """Lưu histogram thời gian, số lần gọi, mức bộ nhớ cao nhất và các sự kiện trace theo tên."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self.stats = {}
+        self.events = []
+
+    def record(self, name, start, end):
+        duration_us = (end - start) * 1e6
+        bucket = min(int(duration_us).bit_length(), NUM_BUCKETS - 1)
+        with self._lock:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = {"count": 0, "total_us": 0.0, "max_us": 0.0,
+                                           "buckets": [0] * NUM_BUCKETS, "peak_memory": 0}
+            stat["count"] += 1
+            stat["total_us"] += duration_us
+            stat["max_us"] = max(stat["max_us"], duration_us)
+            stat["buckets"][bucket] += 1
+            stat["peak_memory"] = peak_memory_bytes()
+            if len(self.events) < MAX_TRACE_EVENTS:
+                self.events.append((name, (start - self._origin) * 1e6, duration_us, threading.get_ident()))
+
+    @staticmethod
+    def _percentile(stat, fraction):
+        # Ước lượng bằng cận trên của bucket chứa phân vị
+        target = stat["count"] * fraction
+        seen = 0
+        for bucket, count in enumerate(stat["buckets"]):
+            seen += count
+            if seen >= target:
+                return min(float(1 << bucket), stat["max_us"])
+        return stat["max_us"]
+
+    def summary(self):
+        """List các dict (name, count, mean_ms, p50_ms, p95_ms, max_ms, peak_mb) sắp theo tổng thời gian."""
+        with self._lock:
+            rows = [
+                {
+                    "name": name,
+                    "count": stat["count"],
+                    "total_ms": stat["total_us"] / 1000,
+                    "mean_ms": stat["total_us"] / stat["count"] / 1000,
+                    "p50_ms": self._percentile(stat, 0.5) / 1000,
+                    "p95_ms": self._percentile(stat, 0.95) / 1000,
+                    "max_ms": stat["max_us"] / 1000,
+                    "peak_mb": stat["peak_memory"] / (1 << 20)
+                }
+                for name, stat in self.stats.items()
+            ]
+        return sorted(rows, key=lambda row: row["total_ms"], reverse=True)
+
+    def export_chrome_trace(self, path):
+        """Xuất các sự kiện theo định dạng Chrome trace (Trace Event Format)."""
+        pid = os.getpid()
+        with self._lock:
+            events = [
+                {"name": name, "ph": "X", "ts": round(ts, 1), "dur": round(dur, 1), "pid": pid, "tid": tid}
+                for name, ts, dur, tid in self.events
+            ]
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, file)
+
+    def reset(self):
+        with self._lock:
+            self.stats.clear()
+            self.events.clear()
+
+
+STATS = PerfStats()
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        STATS.record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name):
+    """Context manager đo thời gian một đoạn code (không làm gì khi tắt instrumentation)."""
+    return _Span(name) if ENABLED else _NULL_SPAN
+
+
+def instrument(name):
+    """Decorator đo thời gian một hàm; khi tắt instrumentation trả về nguyên hàm gốc."""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                STATS.record(name, start, time.perf_counter())
+        return wrapper
+    return decorator
+
+
+def create_perf_dock(parent):
+    """
+    Tạo QDockWidget hiển thị bảng thống kê (cập nhật mỗi giây) và nút xuất Chrome trace.
+    Trả về None khi instrumentation đang tắt.
+    """
+    if not ENABLED:
+        return None
+
+    from PyQt5.QtCore import Qt, QTimer
+    from PyQt5.QtWidgets import (
+        QDockWidget, QWidget, QVBoxLayout, QHBoxLayout, QTableWidget, QTableWidgetItem, QPushButton,
+        QFileDialog, QHeaderView
+    )
+
+    columns = ["name", "count", "mean_ms", "p50_ms", "p95_ms", "max_ms", "peak_mb"]
+    dock = QDockWidget("Performance", parent)
+    container = QWidget()
+    layout = QVBoxLayout(container)
+    table = QTableWidget(0, len(columns))
+    table.setHorizontalHeaderLabels(columns)
+    table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+    layout.addWidget(table)
+
+    buttons = QHBoxLayout()
+    export_button = QPushButton("Export Trace")
+    reset_button = QPushButton("Reset")
+    buttons.addWidget(export_button)
+    buttons.addWidget(reset_button)
+    layout.addLayout(buttons)
+    dock.setWidget(container)
+
+    def refresh():
+        rows = STATS.summary()
+        table.setRowCount(len(rows))
+        for row_idx, row in enumerate(rows):
+            for col_idx, column in enumerate(columns):
+                value = row[column]
+                text = f"{value:.2f}" if isinstance(value, float) else str(value)
+                table.setItem(row_idx, col_idx, QTableWidgetItem(text))
+
+    def export_trace():
+        path, _ = QFileDialog.getSaveFileName(parent, "Export Chrome Trace", "trace.json", "JSON Files (*.json)")
+        if path:
+            STATS.export_chrome_trace(path)
+
+    export_button.clicked.connect(export_trace)
+    reset_button.clicked.connect(lambda: (STATS.reset(), refresh()))
+
+    timer = QTimer(dock)
+    timer.timeout.connect(refresh)
+    timer.start(1000)
+
+    parent.addDockWidget(Qt.RightDockWidgetArea, dock)
+    return dock
+
+
+if ENABLED and os.environ.get(TRACE_ENV):
+    atexit.register(lambda: STATS.export_chrome_trace(os.environ[TRACE_ENV]))
@@ -0,0 +1,334 @@
+"""
+Project store: trạng thái làm việc của một cuốn sách trong một file SQLite (WAL) dùng chung cho label_GUI,
+align_GUI và batch_align.py.
+
+Một file project (mặc định "<sách>.project.sqlite") giữ:
+    pages        phân trang vào label của label_GUI (label_name, label_index, page_index, source_path)
+    ocr_records  record OCR theo từng nguồn (mỗi nguồn là một cột như mỗi lần "Load JSON"), index theo label_index
+    labels       trạng thái từng label đã sửa/được đánh dấu lưu trong align_GUI (is_save, người sửa, thời điểm)
+    label_rows   các hàng đã sửa của từng label, mỗi hàng là list JSON các ô
+    meta         cấu hình dùng chung (tên cột, tên nhãn, ...)
+
+Mỗi thao tác sửa chỉ ghi lại hàng/label bị đổi trong một transaction ngắn thay vì ghi lại cả file CSV. Ở chế độ
+WAL, người đọc không chặn người ghi nên nhiều annotator (nhiều GUI) và các batch tool có thể mở cùng một project;
+ghi đồng thời được SQLite tuần tự hóa (chờ tối đa BUSY_TIMEOUT giây). Xuất CSV là một truy vấn đọc dần từ cursor.
+
+Usage (xuất CSV từ project):
+    python project_store.py book.project.sqlite -o output.csv
+"""
+import os
+import json
+import time
+import getpass
+import sqlite3
+import argparse
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+
+PROJECT_SUFFIX = ".project.sqlite"
+BUSY_TIMEOUT = 30
+BATCH_EDITOR = "batch_align"  # Editor của các label do batch_align ghi, chạy lại batch_align được ghi đè
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS pages (
+    label_name TEXT NOT NULL, label_index TEXT NOT NULL, page_index TEXT NOT NULL,
+    source_path TEXT NOT NULL, position INTEGER NOT NULL,
+    PRIMARY KEY (label_index, label_name, page_index));
+CREATE TABLE IF NOT EXISTS ocr_sources (source TEXT PRIMARY KEY, position INTEGER NOT NULL);
+CREATE TABLE IF NOT EXISTS ocr_records (
+    source TEXT NOT NULL, label_name TEXT NOT NULL, label_index TEXT NOT NULL, page_index TEXT NOT NULL,
+    position INTEGER NOT NULL, record TEXT NOT NULL,
+    PRIMARY KEY (source, label_name, label_index, page_index));
+CREATE INDEX IF NOT EXISTS ocr_records_label ON ocr_records (label_index);
+CREATE TABLE IF NOT EXISTS labels (
+    label_index TEXT PRIMARY KEY, sort_key INTEGER, is_save INTEGER NOT NULL,
+    editor TEXT, updated REAL NOT NULL);
+CREATE INDEX IF NOT EXISTS labels_order ON labels (sort_key, label_index);
+CREATE TABLE IF NOT EXISTS label_rows (
+    label_index TEXT NOT NULL, row INTEGER NOT NULL, cells TEXT NOT NULL,
+    PRIMARY KEY (label_index, row)) WITHOUT ROWID;
+"""
+
+
+def default_project_path(source):
+    """File project cạnh thư mục ảnh / file .pack / file JSON, vd: "book.pack" -> "book.project.sqlite"."""
+    source = os.path.normpath(source)
+    return os.path.splitext(source)[0] + PROJECT_SUFFIX
+
+
+def _sort_key(label_index):
+    # Cùng thứ tự với align_core.label_sort_key: số theo giá trị, chuỗi khác xếp sau (NULL)
+    return int(label_index) if label_index.isdigit() else None
+
+
+def _dumps(value):
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+
+
+class ProjectStore:
+    """
+    Một file project SQLite (WAL). An toàn khi dùng từ nhiều thread; nhiều process mở cùng file cũng được.
+    label_index luôn được lưu dạng str như align_core.group_by_label.
+    """
+    def __init__(self, path, editor=None):
+        """:param editor: Tên ghi vào cột editor của label (mặc định: user đang đăng nhập)."""
+        self.path = path
+        self.editor = editor or getpass.getuser()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        # isolation_level=None: tự quản lý transaction bằng BEGIN IMMEDIATE để hai process không cùng nâng khóa
+        self._conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._transaction() as conn:
+            legacy_records = self._drop_legacy_ocr_records(conn)
+            for statement in SCHEMA.split(";"):
+                conn.execute(statement)
+            conn.executemany("INSERT OR REPLACE INTO ocr_records VALUES (?, ?, ?, ?, ?, ?)", legacy_records)
+
+    @staticmethod
+    def _drop_legacy_ocr_records(conn):
+        # Project cũ: ocr_records chưa có cột label_name trong khóa (Han_1_3 và PA_1_3 là một), dựng lại bảng
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(ocr_records)")]
+        if not columns or "label_name" in columns:
+            return []
+        rows = conn.execute("SELECT source, label_index, page_index, position, record FROM ocr_records").fetchall()
+        conn.execute("DROP TABLE ocr_records")
+        return [(source, str(json.loads(record).get("label_name", "")), label_index, page_index, position, record)
+                for source, label_index, page_index, position, record in rows]
+
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield self._conn
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # Meta
+
+    def get_meta(self, key, default=None):
+        rows = self._query("SELECT value FROM meta WHERE key = ?", (key,))
+        return json.loads(rows[0][0]) if rows else default
+
+    def set_meta(self, key, value):
+        with self._transaction() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, _dumps(value)))
+
+    # Phân trang của label_GUI
+
+    def set_assignments(self, records):
+        """
+        Thay toàn bộ phân trang bằng records ({"label_name", "label_index", "page_index", "source_path"}, giống
+        label_manifest). Trả về số record.
+        """
+        rows = [(record["label_name"], str(record["label_index"]), str(record["page_index"]),
+                 record["source_path"], position) for position, record in enumerate(records)]
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM pages")
+            conn.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def set_label_pages(self, label_index, records):
+        """Thay phân trang của một label (một hàng trong bảng của label_GUI)."""
+        label_index = str(label_index)
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM pages WHERE label_index = ?", (label_index,))
+            conn.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)", [
+                (record["label_name"], label_index, str(record["page_index"]), record["source_path"], position)
+                for position, record in enumerate(records)
+            ])
+
+    def assignments(self):
+        """Các record phân trang, theo label_index rồi thứ tự ghi."""
+        rows = self._query("SELECT label_name, label_index, page_index, source_path, position FROM pages")
+        rows.sort(key=lambda row: (_sort_key(row[1]) is None, _sort_key(row[1]) or 0, row[1], row[4]))
+        return [{"label_name": label_name, "label_index": label_index, "page_index": page_index,
+                 "source_path": source_path} for label_name, label_index, page_index, source_path, _ in rows]
+
+    # OCR
+
+    def add_ocr_records(self, source, records):
+        """
+        Thêm (hoặc ghi đè theo label_name/label_index/page_index) các record OCR của một nguồn; nguồn mới được thêm
+        làm cột cuối.
+        :return: Số record đã ghi.
+        """
+        with self._transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO ocr_sources (source, position) "
+                         "SELECT ?, COALESCE(MAX(position) + 1, 0) FROM ocr_sources", (source,))
+            # Record thêm sau (vd: từng đợt của một stream OCR) được xếp sau các record đã có của nguồn
+            start = conn.execute("SELECT COALESCE(MAX(position) + 1, 0) FROM ocr_records WHERE source = ?",
+                                 (source,)).fetchone()[0]
+            conn.executemany("INSERT OR REPLACE INTO ocr_records VALUES (?, ?, ?, ?, ?, ?)", [
+                (source, str(record.get("label_name", "")), str(record["label_index"]), str(record.get("page_index", "")),
+                 start + position, _dumps(record)) for position, record in enumerate(records)
+            ])
+        return len(records)
+
+    def ocr_sources(self):
+        return [row[0] for row in self._query("SELECT source FROM ocr_sources ORDER BY position")]
+
+    def ocr_records(self, source):
+        """Mọi record OCR của một nguồn, theo thứ tự đã thêm."""
+        rows = self._query("SELECT record FROM ocr_records WHERE source = ? ORDER BY position", (source,))
+        return [json.loads(row[0]) for row in rows]
+
+    def label_records(self, label_index):
+        """label_datas của một label: một list record cho mỗi nguồn OCR (giống đầu vào của align_core.filter_label)."""
+        rows = self._query(
+            "SELECT r.source, r.record FROM ocr_records r JOIN ocr_sources s USING (source) "
+            "WHERE r.label_index = ? ORDER BY s.position, r.position", (str(label_index),)
+        )
+        label_datas = {source: [] for source in self.ocr_sources()}
+        for source, record in rows:
+            label_datas[source].append(json.loads(record))
+        return list(label_datas.values())
+
+    # Bảng đã sửa của align_GUI
+
+    def _upsert_label(self, conn, label_index, is_save):
+        conn.execute(
+            "INSERT INTO labels (label_index, sort_key, is_save, editor, updated) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (label_index) DO UPDATE SET is_save = excluded.is_save, editor = excluded.editor, "
+            "updated = excluded.updated",
+            (label_index, _sort_key(label_index), int(bool(is_save)), self.editor, time.time())
+        )
+
+    @staticmethod
+    def _replace_rows(conn, label_index, columns):
+        num_rows = len(columns[0]) if columns else 0
+        conn.execute("DELETE FROM label_rows WHERE label_index = ? AND row >= ?", (label_index, num_rows))
+        conn.executemany("INSERT OR REPLACE INTO label_rows VALUES (?, ?, ?)", [
+            (label_index, row, _dumps([column[row] for column in columns])) for row in range(num_rows)
+        ])
+
+    def save_label(self, label_index, columns, is_save, rows=None):
+        """
+        Lưu bảng (list cột) của một label.
+        :param rows: Chỉ ghi lại các hàng này (vd: sau khi sửa ô); None thì ghi lại cả bảng (thêm/xóa hàng, cột).
+        """
+        label_index = str(label_index)
+        with self._transaction() as conn:
+            exists = conn.execute("SELECT 1 FROM labels WHERE label_index = ?", (label_index,)).fetchone()
+            self._upsert_label(conn, label_index, is_save)
+            if rows is None or not exists:
+                self._replace_rows(conn, label_index, columns)
+            else:
+                conn.executemany("INSERT OR REPLACE INTO label_rows VALUES (?, ?, ?)", [
+                    (label_index, row, _dumps([column[row] for column in columns])) for row in sorted(set(rows))
+                ])
+
+    def save_labels(self, edited_data, overwrite=True):
+        """
+        Lưu nhiều label trong một transaction ({label_index: {"is_save", "data"}}, giống dict của batch_align).
+        :param overwrite: False thì bỏ qua các label đã có trong project (không ghi đè chỉnh sửa của annotator), trừ
+            các label mà lần ghi cuối là của batch_align (BATCH_EDITOR).
+        :return: Số label đã ghi.
+        """
+        count = 0
+        with self._transaction() as conn:
+            existing = set() if overwrite else {row[0] for row in conn.execute(
+                "SELECT label_index FROM labels WHERE editor IS NULL OR editor != ?", (BATCH_EDITOR,))}
+            for label_index, data in edited_data.items():
+                label_index = str(label_index)
+                if label_index in existing:
+                    continue
+                self._upsert_label(conn, label_index, data["is_save"])
+                self._replace_rows(conn, label_index, data["data"])
+                count += 1
+        return count
+
+    def set_saved(self, label_index, is_save):
+        with self._transaction() as conn:
+            conn.execute("UPDATE labels SET is_save = ?, editor = ?, updated = ? WHERE label_index = ?",
+                         (int(bool(is_save)), self.editor, time.time(), str(label_index)))
+
+    def load_label(self, label_index):
+        """(bảng dạng list cột, is_save, người sửa, thời điểm) của một label, None nếu label chưa có trong project."""
+        label_index = str(label_index)
+        with self._lock:
+            label = self._conn.execute("SELECT is_save, editor, updated FROM labels WHERE label_index = ?",
+                                       (label_index,)).fetchone()
+            if label is None:
+                return None
+            rows = self._conn.execute("SELECT cells FROM label_rows WHERE label_index = ? ORDER BY row",
+                                      (label_index,)).fetchall()
+        rows = [json.loads(row[0]) for row in rows]
+        num_columns = max((len(row) for row in rows), default=0)
+        columns = [[row[col] if col < len(row) else "" for row in rows] for col in range(num_columns)]
+        return columns, bool(label[0]), label[1], label[2]
+
+    def labels(self):
+        """{label_index: is_save} của các label đã có trong project, theo thứ tự label."""
+        rows = self._query("SELECT label_index, is_save FROM labels ORDER BY sort_key IS NULL, sort_key, label_index")
+        return {label_index: bool(is_save) for label_index, is_save in rows}
+
+    def iter_rows(self, saved_only=True):
+        """
+        Duyệt (label_index, row, cells) theo thứ tự label rồi hàng, đọc dần từ cursor trong một snapshot
+        (người khác vẫn ghi được trong lúc duyệt). Dùng một kết nối chỉ đọc riêng nên không giữ khóa của store:
+        các thao tác khác trên store vẫn chạy được trong lúc duyệt, kể cả khi generator bị bỏ dở.
+        """
+        sql = ("SELECT l.label_index, r.row, r.cells FROM labels l JOIN label_rows r USING (label_index) "
+               + ("WHERE l.is_save = 1 " if saved_only else "")
+               + "ORDER BY l.sort_key IS NULL, l.sort_key, l.label_index, r.row")
+        conn = sqlite3.connect(Path(os.path.abspath(self.path)).as_uri() + "?mode=ro", uri=True,
+                               timeout=BUSY_TIMEOUT, isolation_level=None)
+        try:
+            conn.execute("BEGIN")
+            for label_index, row, cells in conn.execute(sql):
+                yield label_index, row, json.loads(cells)
+        finally:
+            conn.close()
+
+    def export_csv(self, output_file, column_names=None, skip_labels=()):
+        """
+        Xuất các label được đánh dấu lưu ra CSV cùng định dạng align_core.write_csv, đọc dần từng hàng.
+        :param column_names: Tên cột (mặc định: meta "column_names").
+        :return: Số hàng đã ghi.
+        """
+        if column_names is None:
+            column_names = self.get_meta("column_names", [])
+        skip_labels = {str(label_index) for label_index in skip_labels}
+        count = 0
+        with open(output_file, "w", encoding="utf-8-sig") as file:
+            file.write(",".join(["index"] + list(column_names)) + "\n")
+            for label_index, row, cells in self.iter_rows():
+                if label_index in skip_labels or not cells:
+                    continue
+                row_data = [str(item).replace(",", "") for item in [row + 1] + cells]
+                file.write(",".join(row_data) + "\n")
+                count += 1
+        return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export the saved labels of a project store to CSV.")
+    parser.add_argument("project", help="Project file (*.project.sqlite).")
+    parser.add_argument("-o", "--output", default="output.csv", help="Output CSV file.")
+    args = parser.parse_args()
+
+    store = ProjectStore(args.project)
+    start = time.perf_counter()
+    count = store.export_csv(args.output)
+    print(f"Exported {count} rows to '{args.output}' in {time.perf_counter() - start:.2f}s.")
+    store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
+from statistics import median
 from language_helper import (
     percentage_chinese, percentage_similarity, percentage_vietnamese,
-    is_number, clean_sentence, is_uppercase
+    is_number, clean_sentence, is_uppercase, reading_match_score
 )
+from ocr_schema import line_polygon
 
 def only_text(data):
     results = [[]]
@@ -22,7 +24,7 @@ def simple(data):
         lines = results.get("lines", [])
         for index, line in enumerate(lines):
             text = line.get("text", "").strip() # basic config
-            box = line.get("boundingPolygon", [])
+            box = line_polygon(line)
             if not text:
                 continue
             res[0].append(entry.get("page_index", ""))
@@ -39,7 +41,7 @@ def simple_chinese(data):
             text = line.get("text", "")
             if percentage_chinese(text) < 70:
                 continue
-            box = line.get("boundingPolygon", [])
+            box = line_polygon(line)
             if not text:
                 continue
             res[0].append(entry.get("page_index", ""))
@@ -47,7 +49,7 @@ def simple_chinese(data):
             res[2].append(text)
     return res
 
-def only_phien_am(data, med = "inf", leng = "inf", threshold = 2):
+def only_phien_am(data, med = "inf", leng = "inf", threshold = 2, han_lines = None):
     res = [[]]
     for entry in data:
         results = entry.get("result", {})
@@ -59,6 +61,10 @@ def only_phien_am(data, med = "inf", leng = "inf", threshold = 2):
                 continue
             if not is_phien_am and percentage_similarity(text, "phien am") > 70:
                 is_phien_am = True
+            elif not is_phien_am and han_lines and reading_match_score(han_lines[0], text) > 50:
+                # Không có tiêu đề "Phiên âm" nhưng dòng khớp âm Hán-Việt với dòng Hán đầu tiên
+                is_phien_am = True
+                res[0].append(text)
             elif is_phien_am and percentage_vietnamese(text) > 70:
                 if percentage_similarity(text, "dich nghia") > 70:
                     return res
@@ -72,4 +78,31 @@ def only_phien_am(data, med = "inf", leng = "inf", threshold = 2):
                     return res
                 else:
                     res[0].append(text)
-    return res
\ No newline at end of file
+    return res
+
+def label_table(label_datas):
+    """
+    Lọc dữ liệu OCR của một label thành bảng các cột (mỗi phần tử của label_datas là một nguồn OCR).
+    Cột 0: text Hán (simple_chinese), cột 1: phiên âm (only_phien_am). Các cột được pad cho cùng độ dài.
+    """
+    full_table = []
+
+    for col, data in enumerate(label_datas): # Tự thay đổi và tùy chỉnh cho phù hợp ngữ liệu
+        #full_table.extend(only_text(data))
+        if col == 0:
+            full_table.extend(simple_chinese(data))
+        elif col == 1:
+            if len(full_table[0]) > 0:
+                med = median([len(text) for text in full_table[2]])
+                leng = len(full_table[2])
+            else:
+                med = float("inf")
+                leng = float("inf")
+            full_table.extend(only_phien_am(data, med=med, leng=leng, han_lines=full_table[2]))
+
+    # Ensure consistent column lengths
+    max_length = max((len(col) for col in full_table), default=0)
+    for col in full_table:
+        while len(col) < max_length:
+            col.append("")
+    return full_table
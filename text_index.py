@@ -0,0 +1,234 @@
+"""
+Inverted index n-gram trên toàn bộ các dòng OCR đã load, để tìm một câu thơ nằm ở label nào mà không phải
+bấm qua từng label.
+
+Mỗi dòng được cắt thành các term:
+    chữ Hán          bigram của các chữ Hán liền nhau ("床前明月光" -> 床前, 前明, 明月, 月光); một chữ Hán
+                     đứng riêng được giữ nguyên
+    chữ quốc ngữ     bigram của các âm tiết đã chuẩn hóa (chữ thường, bỏ dấu, đ -> d): "Sàng tiền minh" ->
+                     "sang tien", "tien minh"; dòng chỉ có một âm tiết được giữ nguyên
+Một âm tiết hay một chữ Hán quá phổ biến để tìm nên query cần ít nhất hai chữ Hán hoặc hai âm tiết (trừ khi tìm
+dòng chỉ có đúng một chữ/âm tiết).
+Query được cắt theo cùng cách. Mỗi term có trọng số idf; điểm của một dòng là tổng trọng số các term của query
+có trong dòng chia cho tổng trọng số của query, nên dòng OCR sai vài chữ (hoặc query gõ thiếu dấu) vẫn được tìm
+thấy, chỉ xếp sau. Các term được duyệt từ hiếm đến phổ biến; khi phần trọng số còn lại không đủ đạt min_score,
+term phổ biến chỉ còn được tra (bisect) cho các dòng đã là ứng viên thay vì duyệt cả posting list.
+
+Index được thêm dần (add_records) nên có thể dựng trong một thread nền trong lúc JSON đang được load; một trang
+được thêm lại (cùng nguồn, label_name, label và trang, ví dụ từ OCR stream) thay thế bản cũ.
+
+Usage:
+    python text_index.py ocr_results.json [more.json ...] -q "明月光" [-q "sang tien"] [--limit 10]
+"""
+import re
+import json
+import math
+import heapq
+import time
+import argparse
+import threading
+from array import array
+from bisect import bisect_left
+from unicodedata import normalize, category
+
+MIN_SCORE = 0.5  # Tỉ lệ trọng số query tối thiểu một dòng phải khớp
+SEARCH_LIMIT = 50
+
+_HAN_RUN = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+_SYLLABLE = re.compile(r'[a-z0-9]+')
+_FOLD_CACHE_SIZE = 1 << 16
+_folded_words = {}
+
+
+def fold_word(word):
+    """Các âm tiết đã chuẩn hóa của một từ (tách theo khoảng trắng): chữ thường, bỏ dấu, đ -> d."""
+    syllables = _folded_words.get(word)
+    if syllables is None:
+        folded = word.lower()
+        if not folded.isascii():
+            folded = normalize('NFD', folded.replace('đ', 'd'))
+            folded = ''.join(char for char in folded if category(char) != 'Mn')
+        syllables = tuple(_SYLLABLE.findall(folded))
+        if syllables and len(_folded_words) < _FOLD_CACHE_SIZE:
+            _folded_words[word] = syllables
+    return syllables
+
+
+def fold_syllables(text):
+    """Các âm tiết quốc ngữ đã chuẩn hóa của text, theo thứ tự ("Sàng tiền," -> "sang tien")."""
+    return ' '.join(syllable for word in text.split() for syllable in fold_word(word))
+
+
+def line_terms(text):
+    """Tập term của một dòng: bigram chữ Hán và bigram âm tiết quốc ngữ đã chuẩn hóa."""
+    terms = set()
+    for run in _HAN_RUN.findall(text):
+        if len(run) == 1:
+            terms.add(run)
+        else:
+            terms.update(run[i:i + 2] for i in range(len(run) - 1))
+    syllables = [syllable for word in text.split() for syllable in fold_word(word)]
+    if len(syllables) == 1:
+        terms.add(syllables[0])
+    else:
+        terms.update(f"{syllables[i]} {syllables[i + 1]}" for i in range(len(syllables) - 1))
+    return terms
+
+
+class TextIndex:
+    """
+    Inverted index của các dòng OCR. An toàn khi thêm dữ liệu từ một thread và tìm kiếm từ thread khác.
+    Posting list của term chỉ có một dòng được lưu thẳng bằng int (phần lớn bigram chữ Hán chỉ xuất hiện một lần),
+    các term khác bằng array('I') id dòng tăng dần.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._postings = {}  # {term: line id | array('I') of line ids}
+        self._texts = []  # Text của từng dòng, theo line id
+        self._line_pages = array('I')  # Line id -> page id
+        self._pages = []  # Page id -> (label_index, page_index, line id của dòng đầu tiên)
+        self._page_ids = {}  # {(source, label_name, label_index, page_index): page id}
+        self._replaced = set()  # Page id của các trang đã được thêm lại
+
+    def __len__(self):
+        """Số dòng đã index (kể cả dòng của các trang đã bị thay thế)."""
+        return len(self._texts)
+
+    def clear(self):
+        with self._lock:
+            self._reset()
+
+    def add_page(self, source, label_index, page_index, lines, label_name=""):
+        """Index các dòng text của một trang."""
+        label_index, page_index = str(label_index), str(page_index)
+        with self._lock:
+            postings = self._postings
+            key = (source, str(label_name), label_index, page_index)
+            if key in self._page_ids:
+                self._replaced.add(self._page_ids[key])
+            page_id = self._page_ids[key] = len(self._pages)
+            line_id = len(self._texts)
+            self._pages.append((label_index, page_index, line_id))
+            for text in lines:
+                self._texts.append(text)
+                self._line_pages.append(page_id)
+                for term in line_terms(text):
+                    posting = postings.get(term)
+                    if posting is None:
+                        postings[term] = line_id
+                    elif type(posting) is int:
+                        postings[term] = array('I', (posting, line_id))
+                    else:
+                        posting.append(line_id)
+                line_id += 1
+
+    def add_records(self, records, source=""):
+        """Index các record OCR ({"label_index", "page_index", "result": {"lines": [{"text"}]}})."""
+        for record in records:
+            lines = record.get("result", {}).get("lines", [])
+            self.add_page(source, record["label_index"], record["page_index"], [line.get("text", "") for line in lines],
+                          label_name=record.get("label_name", ""))
+
+    def search(self, query, limit=SEARCH_LIMIT, min_score=MIN_SCORE):
+        """
+        Tìm các dòng gần với query.
+        :return: List (label_index, page_index, số thứ tự dòng trong trang, text, điểm 0-1), điểm giảm dần;
+            khi bằng điểm, dòng chứa nguyên query được xếp trước.
+        """
+        terms = line_terms(query)
+        if not terms:
+            return []
+        with self._lock:
+            num_lines = len(self._texts)
+            if not num_lines:
+                return []
+            weighted = []
+            for term in terms:
+                posting = self._postings.get(term)
+                if posting is None:
+                    posting = ()
+                elif type(posting) is int:
+                    posting = (posting,)
+                weighted.append((math.log(1 + num_lines / (len(posting) or 1)), posting))
+            weighted.sort(key=lambda item: len(item[1]))
+            total = sum(weight for weight, _ in weighted)
+            needed = min_score * total
+            remaining = total
+            scores = {}
+            for weight, posting in weighted:
+                if not posting:
+                    # Term không có trong index: chỉ làm tổng trọng số lớn hơn, không tạo ứng viên
+                    remaining -= weight
+                    continue
+                if not scores:
+                    # Posting list ngắn nhất trong các term có mặt tạo tập ứng viên ban đầu
+                    scores = dict.fromkeys(posting, weight)
+                elif remaining >= needed:
+                    # Dòng chưa có điểm vẫn có thể đạt min_score: duyệt cả posting list
+                    get = scores.get
+                    for line_id in posting:
+                        scores[line_id] = get(line_id, 0.0) + weight
+                elif len(scores) < len(posting):
+                    for line_id, score in scores.items():
+                        position = bisect_left(posting, line_id)
+                        if position < len(posting) and posting[position] == line_id:
+                            scores[line_id] = score + weight
+                else:
+                    for line_id in posting:
+                        if line_id in scores:
+                            scores[line_id] += weight
+                remaining -= weight
+
+            # Trong các dòng điểm cao nhất, dòng chứa nguyên query được xếp trước: đúng cả dấu, rồi bỏ dấu
+            query = query.strip().lower()
+            folded_query = fold_syllables(query)
+            candidates = heapq.nsmallest(
+                limit * 4,
+                ((-score, line_id) for line_id, score in scores.items()
+                 if score >= needed and self._line_pages[line_id] not in self._replaced)
+            )
+            ranked = sorted((negative_score, self._match_rank(line_id, query, folded_query), line_id)
+                            for negative_score, line_id in candidates)
+            hits = []
+            for negative_score, _, line_id in ranked[:limit]:
+                label_index, page_index, first_line = self._pages[self._line_pages[line_id]]
+                hits.append((label_index, page_index, line_id - first_line, self._texts[line_id],
+                             -negative_score / total))
+        return hits
+
+    def _match_rank(self, line_id, query, folded_query):
+        text = self._texts[line_id]
+        if query in text.lower():
+            return 0
+        if folded_query and folded_query in fold_syllables(text):
+            return 1
+        return 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search OCR lines with an n-gram inverted index.")
+    parser.add_argument("inputs", nargs="+", help="OCR JSON files.")
+    parser.add_argument("-q", "--query", action="append", required=True, help="Query (repeatable).")
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--min-score", type=float, default=MIN_SCORE)
+    args = parser.parse_args()
+
+    index = TextIndex()
+    start = time.perf_counter()
+    for path in args.inputs:
+        with open(path, "r", encoding="utf-8") as file:
+            index.add_records(json.load(file), source=path)
+    print(f"Indexed {len(index)} lines in {time.perf_counter() - start:.2f} s")
+    for query in args.query:
+        start = time.perf_counter()
+        hits = index.search(query, limit=args.limit, min_score=args.min_score)
+        print(f"\n{query!r}: {len(hits)} hits in {(time.perf_counter() - start) * 1000:.1f} ms")
+        for label_index, page_index, line, text, score in hits:
+            print(f"  {score:.2f}  label {label_index}, page {page_index}, line {line + 1}: {text}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+"""
+Cache thumbnail dùng chung cho label_GUI và align_GUI.
+
+Thumbnail được lưu trong một file SQLite (mặc định ~/.cache/nlp_minitools/thumbnails.sqlite, đổi bằng
+biến môi trường NLP_MINITOOLS_THUMB_CACHE), khóa theo (đường dẫn ảnh gốc, mtime, chiều rộng).
+Khi tổng dung lượng vượt giới hạn, các thumbnail lâu không dùng nhất bị xóa (LRU). Thời điểm dùng của các lần
+đọc trúng cache được gom lại và ghi một lần (khi put, close hoặc sau ACCESS_FLUSH lần) thay vì commit mỗi lần đọc.
+"""
+import os
+import time
+import atexit
+import sqlite3
+import threading
+from perf_stats import span
+from page_pack import PDF_EXTENSION, split_ref, page_ref, read_page, resolve_ref
+
+CACHE_ENV = "NLP_MINITOOLS_THUMB_CACHE"
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "nlp_minitools", "thumbnails.sqlite")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+THUMBNAIL_FORMAT = "JPG"
+THUMBNAIL_QUALITY = 85
+ACCESS_FLUSH = 256  # Số lần đọc trúng cache tối đa trước khi ghi last_access xuống đĩa
+
+
+class ThumbnailCache:
+    """
+    Cache thumbnail trên đĩa (SQLite, WAL) có giới hạn dung lượng theo LRU. An toàn khi dùng từ nhiều thread.
+    """
+    def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.path = path or os.environ.get(CACHE_ENV) or DEFAULT_CACHE_PATH
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._accessed = {}  # {key: thời điểm đọc} chưa ghi xuống đĩa
+        self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS thumbnails ("
+            " source TEXT NOT NULL, mtime_ns INTEGER NOT NULL, width INTEGER NOT NULL,"
+            " data BLOB NOT NULL, size INTEGER NOT NULL, last_access REAL NOT NULL,"
+            " PRIMARY KEY (source, mtime_ns, width))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS thumbnails_last_access ON thumbnails (last_access)")
+        self._conn.commit()
+        self._total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM thumbnails").fetchone()[0]
+
+    @staticmethod
+    def _key(source, width):
+        # Trang trong file .pack ("book.pack#12") dùng mtime của file pack; record manifest dùng ảnh gốc
+        path, name = split_ref(resolve_ref(source))
+        path = os.path.abspath(path)
+        mtime = os.stat(path).st_mtime_ns
+        return (page_ref(path, name) if name is not None else path), mtime, int(width)
+
+    def get(self, source, width):
+        """Trả về bytes của thumbnail đã cache, hoặc None nếu chưa có (hoặc ảnh gốc đã thay đổi)."""
+        key = self._key(source, width)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM thumbnails WHERE source = ? AND mtime_ns = ? AND width = ?", key
+            ).fetchone()
+            if row is None:
+                return None
+            self._accessed[key] = time.time()
+            if len(self._accessed) >= ACCESS_FLUSH:
+                self._flush_access()
+                self._conn.commit()
+        return row[0]
+
+    def _flush_access(self):
+        # Ghi last_access đã gom của các lần đọc (gọi khi đang giữ self._lock)
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE thumbnails SET last_access = ? WHERE source = ? AND mtime_ns = ? AND width = ?",
+                [(accessed,) + key for key, accessed in self._accessed.items()]
+            )
+            self._accessed.clear()
+
+    def put(self, source, width, data):
+        """Lưu thumbnail (bytes đã encode) và xóa bớt các thumbnail cũ nếu vượt giới hạn dung lượng."""
+        key = self._key(source, width)
+        with self._lock:
+            # Ghi last_access trước để việc xóa theo LRU dùng đúng thời điểm dùng gần nhất
+            self._accessed.pop(key, None)
+            self._flush_access()
+            # Xóa các phiên bản cũ của cùng ảnh/chiều rộng (ảnh gốc đã bị sửa)
+            old = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM thumbnails WHERE source = ? AND width = ?", (key[0], key[2])
+            ).fetchone()[0]
+            self._conn.execute("DELETE FROM thumbnails WHERE source = ? AND width = ?", (key[0], key[2]))
+            self._conn.execute(
+                "INSERT INTO thumbnails (source, mtime_ns, width, data, size, last_access) VALUES (?, ?, ?, ?, ?, ?)",
+                key + (sqlite3.Binary(data), len(data), time.time())
+            )
+            self._total += len(data) - old
+            if self._total > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        # Xóa theo thứ tự last_access tăng dần đến khi còn 90% giới hạn
+        target = self.max_bytes * 0.9
+        rows = self._conn.execute("SELECT rowid, size FROM thumbnails ORDER BY last_access").fetchall()
+        removed = []
+        for rowid, size in rows:
+            if self._total <= target:
+                break
+            removed.append((rowid,))
+            self._total -= size
+        self._conn.executemany("DELETE FROM thumbnails WHERE rowid = ?", removed)
+
+    def close(self):
+        with self._lock:
+            if self._accessed:
+                self._flush_access()
+                self._conn.commit()
+            self._conn.close()
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_default_cache():
+    """Cache dùng chung trong process (tạo lần đầu khi cần)."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ThumbnailCache()
+            atexit.register(_default_cache.close)
+    return _default_cache
+
+
+def cached_thumbnail(path, width, cache=None):
+    """
+    Trả về QImage thumbnail (cạnh dài nhất = width) của ảnh (đường dẫn file hoặc "book.pack#12"), lấy từ cache
+    hoặc decode rồi lưu vào cache. Trang PDF ("book.pdf#12") được render thẳng ở kích thước thumbnail.
+    Dùng QImage (không phải QPixmap) nên gọi được từ thread nền.
+    """
+    from PyQt5.QtCore import Qt, QBuffer, QByteArray, QIODevice
+    from PyQt5.QtGui import QImage
+
+    cache = cache or get_default_cache()
+    try:
+        data = cache.get(path, width)
+    except (OSError, sqlite3.Error) as e:
+        print(f"Error reading thumbnail cache for {path}: {e}")
+        data = None
+    if data is not None:
+        with span("thumb_cache.hit_decode"):
+            image = QImage.fromData(data)
+        if not image.isNull():
+            return image
+
+    pack_path, name = split_ref(resolve_ref(path))
+    with span("thumb_cache.decode"):
+        try:
+            if name is not None and pack_path.lower().endswith(PDF_EXTENSION):
+                from pdf_pages import render_fit
+                image_width, image_height, stride, samples = render_fit(pack_path, name, width)
+                image = QImage(samples, image_width, image_height, stride, QImage.Format_RGB888).copy()
+            else:
+                image = QImage.fromData(read_page(path))  # Nhận thẳng memoryview của trang trong pack
+        except (OSError, KeyError, ValueError, RuntimeError) as e:
+            print(f"Error reading image {path}: {e}")
+            return QImage()
+    if image.isNull():
+        return image
+    with span("thumb_cache.scale"):
+        image = image.scaled(width, width, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+    buffer = QByteArray()
+    device = QBuffer(buffer)
+    device.open(QIODevice.WriteOnly)
+    image.save(device, THUMBNAIL_FORMAT, THUMBNAIL_QUALITY)
+    device.close()
+    try:
+        cache.put(path, width, bytes(buffer))
+    except (OSError, sqlite3.Error) as e:
+        print(f"Error writing thumbnail cache for {path}: {e}")
+    return image